@@ -0,0 +1,178 @@
+"""
+Shared authentication dependencies
+- Bearer token → admin or student principal
+- Resolved principals are cached per token signature (TTL + LRU), so a repeat
+  call skips both JWT decoding and the account SELECT
+- Entries never outlive the token's own expiry
+- Deactivating or deleting an account drops its entries once the change commits
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from fastapi import Depends, Header, HTTPException, status
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import decode_token
+from app.db.database import get_async_db, get_db
+from app.db.models import Admin, Student
+
+ADMIN = "admin"
+STUDENT = "student"
+
+_PENDING_INVALIDATIONS_KEY = "pending_principal_invalidations"
+
+principal_cache = TTLCache(
+    "principals", settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+
+@dataclass(frozen=True)
+class AdminPrincipal:
+    """Snapshot of the authenticated admin"""
+    id: int
+    email: str
+    name: str
+    role: str
+    kind: str = ADMIN
+
+
+@dataclass(frozen=True)
+class StudentPrincipal:
+    """Snapshot of the authenticated student"""
+    id: int
+    register_no: str
+    name: str
+    email: Optional[str]
+    batch_id: int
+    kind: str = STUDENT
+
+
+def _bearer_token(authorization: Optional[str]) -> str:
+    if not authorization:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing authorization header"
+        )
+    return authorization.replace("Bearer ", "")
+
+
+def _cache_key(token: str, kind: str) -> tuple:
+    # The signature segment identifies the token; the role keeps admin and
+    # student lookups apart should the same token reach both dependencies
+    return kind, token.rsplit(".", 1)[-1]
+
+
+def _decode(token: str, kind: str) -> tuple:
+    """(account id, seconds until the token expires)"""
+    try:
+        payload = decode_token(token)
+        if not payload or payload.get("role") != kind:
+            raise ValueError("wrong role")
+        account_id = int(payload.get("sub"))
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials"
+        )
+    expires = payload.get("exp")
+    return account_id, (expires - time.time()) if expires else None
+
+
+def _remember(key: tuple, principal, expires_in: Optional[float]):
+    principal_cache.set(key, principal, expires_in)
+    return principal
+
+
+def _inactive(kind: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"{kind.title()} account is inactive")
+
+
+def get_current_admin(authorization: str = Header(None), db: Session = Depends(get_db)) -> AdminPrincipal:
+    """Get current logged-in admin from token"""
+    token = _bearer_token(authorization)
+    key = _cache_key(token, ADMIN)
+    principal = principal_cache.get(key)
+    if principal is not None:
+        return principal
+
+    admin_id, expires_in = _decode(token, ADMIN)
+    admin = db.get(Admin, admin_id)
+    if not admin:
+        raise HTTPException(status_code=404, detail="Admin not found")
+    if admin.is_active is False:
+        raise _inactive(ADMIN)
+    return _remember(key, AdminPrincipal(admin.id, admin.email, admin.name, admin.role), expires_in)
+
+
+async def get_current_student(authorization: Optional[str] = Header(None),
+                              db: AsyncSession = Depends(get_async_db)) -> StudentPrincipal:
+    """Get current logged-in student from token"""
+    token = _bearer_token(authorization)
+    key = _cache_key(token, STUDENT)
+    principal = principal_cache.get(key)
+    if principal is not None:
+        return principal
+
+    student_id, expires_in = _decode(token, STUDENT)
+    student = await db.get(Student, student_id)
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    if student.is_active is False:
+        raise _inactive(STUDENT)
+    return _remember(
+        key,
+        StudentPrincipal(student.id, student.register_no, student.name, student.email, student.batch_id),
+        expires_in,
+    )
+
+
+def invalidate_principals(kind: str, ids: Optional[Iterable[int]] = None) -> int:
+    """Drop cached principals of one kind; all of them when `ids` is None"""
+    if ids is None:
+        return principal_cache.discard_where(lambda p: p.kind == kind)
+    ids = set(ids)
+    return principal_cache.discard_where(lambda p: p.kind == kind and p.id in ids)
+
+
+def invalidate_principals_after_commit(db: Session, kind: str, ids: Optional[Iterable[int]] = None) -> None:
+    """invalidate_principals() once the session's transaction commits
+
+    For set-based writes (bulk UPDATE/DELETE, upserts) that the ORM hook below cannot see.
+    """
+    pending = db.info.setdefault(_PENDING_INVALIDATIONS_KEY, {})
+    if ids is None or pending.get(kind, ()) is None:
+        pending[kind] = None
+    else:
+        pending.setdefault(kind, set()).update(ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_account_changes(session, flush_context):
+    """Queue invalidation for accounts deleted, deactivated or edited through the ORM"""
+    changed = [(obj, False) for obj in session.dirty] + [(obj, True) for obj in session.deleted]
+    for obj, deleted in changed:
+        if isinstance(obj, Admin):
+            kind = ADMIN
+        elif isinstance(obj, Student):
+            kind = STUDENT
+        else:
+            continue
+        if deleted or inspect(obj).modified:
+            invalidate_principals_after_commit(session, kind, [obj.id])
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_invalidations(session):
+    for kind, ids in session.info.pop(_PENDING_INVALIDATIONS_KEY, {}).items():
+        invalidate_principals(kind, ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidations(session):
+    session.info.pop(_PENDING_INVALIDATIONS_KEY, None)
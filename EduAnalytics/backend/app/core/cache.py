@@ -0,0 +1,140 @@
+"""
+In-process caches
+- VersionedCache: values are rebuilt after a write bumps the version
+- TTLCache: bounded LRU whose entries also expire after a time-to-live
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_PENDING_BUMPS_KEY = "pending_cache_bumps"
+
+
+class VersionedCache:
+    """Cache of loader results that is dropped wholesale whenever the data is written
+
+    Writers call bump() after committing, or bump_after_commit(db) to have the
+    session do it once the transaction commits. A load that raced with a bump
+    is returned to its caller but not stored. Readers can also pass a cheap
+    fingerprint of the source tables to check_stamp(), which catches writes
+    committed by other processes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._values: Dict[Hashable, Any] = {}
+        self._stamp: Optional[Hashable] = None
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                return self._values[key]
+            self.misses += 1
+            version = self.version
+        value = loader()
+        with self._lock:
+            if self.version == version:
+                self._values[key] = value
+        return value
+
+    def bump(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._values.clear()
+
+    def check_stamp(self, stamp: Hashable) -> None:
+        """bump() when the source data's fingerprint differs from the last one seen"""
+        with self._lock:
+            if stamp == self._stamp:
+                return
+            self._stamp = stamp
+            self.version += 1
+            self._values.clear()
+
+    def bump_after_commit(self, db: Session) -> None:
+        """Bump once the session's current transaction commits (never on rollback)"""
+        db.info.setdefault(_PENDING_BUMPS_KEY, set()).add(self)
+
+    def stats(self) -> dict:
+        return {"name": self.name, "version": self.version, "entries": len(self._values),
+                "hits": self.hits, "misses": self.misses}
+
+
+class TTLCache:
+    """Least-recently-used cache of at most `maxsize` entries, each valid for `ttl` seconds"""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached value, or None when absent or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value; `ttl` may shorten (never extend) the default lifetime"""
+        lifetime = self.ttl if ttl is None else min(ttl, self.ttl)
+        if lifetime <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + lifetime, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop every entry whose value matches; returns how many were dropped"""
+        with self._lock:
+            doomed = [key for key, (_, value) in self._entries.items() if predicate(value)]
+            for key in doomed:
+                del self._entries[key]
+        return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"name": self.name, "entries": len(self._entries), "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl, "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions}
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_pending_caches(session):
+    for cache in session.info.pop(_PENDING_BUMPS_KEY, ()):
+        cache.bump()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_bumps(session):
+    session.info.pop(_PENDING_BUMPS_KEY, None)
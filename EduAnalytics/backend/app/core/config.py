@@ -21,11 +21,46 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # bcrypt cost factor (each +1 doubles hashing time) and hashing processes (0 = one per core)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+    
+    # Student login: one structured log line per attempt, and failed attempts
+    # allowed within the window per register number and per client address
+    # (higher, since a campus shares one address); 0 disables a limit
+    AUTH_LOG_ENABLED: bool = os.getenv("AUTH_LOG_ENABLED", "True").lower() == "true"
+    LOGIN_MAX_FAILED_ATTEMPTS: int = int(os.getenv("LOGIN_MAX_FAILED_ATTEMPTS", "5"))
+    LOGIN_MAX_FAILED_PER_CLIENT: int = int(os.getenv("LOGIN_MAX_FAILED_PER_CLIENT", "100"))
+    LOGIN_FAILURE_WINDOW_SECONDS: int = int(os.getenv("LOGIN_FAILURE_WINDOW_SECONDS", "300"))
+    
+    # Authenticated principals cached per token (entries / seconds)
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    
+    # Student dashboard/marks payloads cached by ETag (entries / seconds)
+    STUDENT_RESPONSE_CACHE_SIZE: int = int(os.getenv("STUDENT_RESPONSE_CACHE_SIZE", "20000"))
+    STUDENT_RESPONSE_CACHE_TTL_SECONDS: int = int(os.getenv("STUDENT_RESPONSE_CACHE_TTL_SECONDS", "3600"))
+    
+    # CSV upload - rows written and committed per chunk
+    CSV_UPLOAD_CHUNK_ROWS: int = int(os.getenv("CSV_UPLOAD_CHUNK_ROWS", "5000"))
+    # Background upload jobs running at the same time
+    CSV_UPLOAD_WORKERS: int = int(os.getenv("CSV_UPLOAD_WORKERS", "4"))
+    
+    # Batch marks export - rows fetched (yield_per) and encoded per chunk
+    EXPORT_CHUNK_ROWS: int = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+    
+    # SQL query count/time per request (response headers + metrics endpoint)
+    QUERY_METRICS_ENABLED: bool = os.getenv("QUERY_METRICS_ENABLED", "True").lower() == "true"
     
     # Firebase
     FIREBASE_PROJECT_ID: str = os.getenv("FIREBASE_PROJECT_ID", "")
     FIREBASE_PRIVATE_KEY: str = os.getenv("FIREBASE_PRIVATE_KEY", "")
     FIREBASE_CLIENT_EMAIL: str = os.getenv("FIREBASE_CLIENT_EMAIL", "")
+    # ID-token signing keys: local JWKS file instead of Google's endpoint (offline/testing),
+    # longest time keys are kept before a refresh, and verified tokens kept in memory
+    FIREBASE_JWKS_FILE: str = os.getenv("FIREBASE_JWKS_FILE", "")
+    FIREBASE_JWKS_REFRESH_SECONDS: int = int(os.getenv("FIREBASE_JWKS_REFRESH_SECONDS", "21600"))
+    FIREBASE_TOKEN_CACHE_SIZE: int = int(os.getenv("FIREBASE_TOKEN_CACHE_SIZE", "1000"))
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,32 @@
+"""
+Conditional GET helpers
+- Strong ETags built from version counters, never from the response body
+- If-None-Match matching per RFC 9110 (weak comparison, lists, "*")
+"""
+
+import hashlib
+from typing import Optional
+
+from fastapi import Response
+
+# Browsers keep the body but must revalidate with If-None-Match every time
+REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag for a set of version parts (opaque, so no ids leak into headers)"""
+    digest = hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()[:24]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE})
@@ -0,0 +1,92 @@
+"""
+In-memory failed-login limiter
+- Counts failed attempts per key (a register number, a client address) in a fixed window
+- A key that reaches the limit is locked out until its window ends, so brute-force
+  bursts are rejected before they reach the database
+- Per process; a multi-worker deployment allows up to workers × limit attempts
+"""
+
+import threading
+import time
+from typing import Dict, Hashable, Iterable, List
+
+
+class LoginAttemptLimiter:
+    """Lock a key out after `max_failures` failed attempts within `window` seconds"""
+
+    def __init__(self, max_failures: int, window: float, max_keys: int = 100_000):
+        self.max_failures = max_failures
+        self.window = window
+        self.max_keys = max_keys
+        self.rejected = 0
+        self._failures: Dict[Hashable, List[float]] = {}  # key -> [count, window start]
+        self._lock = threading.Lock()
+
+    def retry_after(self, keys: Iterable[Hashable]) -> float:
+        """Seconds until the most restricted key may try again (0 when none is locked)"""
+        if self.max_failures <= 0:
+            return 0.0
+        now = time.monotonic()
+        wait = 0.0
+        with self._lock:
+            for key in keys:
+                entry = self._failures.get(key)
+                if entry is None:
+                    continue
+                remaining = entry[1] + self.window - now
+                if remaining <= 0:
+                    del self._failures[key]
+                elif entry[0] >= self.max_failures:
+                    wait = max(wait, remaining)
+            if wait:
+                self.rejected += 1
+        return wait
+
+    def begin_attempt(self, key: Hashable) -> float:
+        """Count an attempt as failed up front (reset() on success)
+
+        Returns the seconds to wait when the key is already locked, in which case
+        nothing is counted. Counting before the check runs stops a burst of
+        concurrent attempts from all slipping past the limit.
+        """
+        wait = self.retry_after([key])
+        if not wait:
+            self.record_failure([key])
+        return wait
+
+    def record_failure(self, keys: Iterable[Hashable]) -> None:
+        if self.max_failures <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._failures) >= self.max_keys:
+                self._prune(now)
+            for key in keys:
+                entry = self._failures.get(key)
+                if entry is None or entry[1] + self.window <= now:
+                    self._failures[key] = [1, now]
+                else:
+                    entry[0] += 1
+
+    def reset(self, keys: Iterable[Hashable]) -> None:
+        """Forget failures after a successful login"""
+        with self._lock:
+            for key in keys:
+                self._failures.pop(key, None)
+
+    def _prune(self, now: float) -> None:
+        expired = [key for key, (_, start) in self._failures.items() if start + self.window <= now]
+        for key in expired:
+            del self._failures[key]
+        # Still full: drop the oldest windows rather than grow without bound
+        overflow = len(self._failures) - self.max_keys + 1
+        if overflow > 0:
+            for key, _ in sorted(self._failures.items(), key=lambda item: item[1][1])[:overflow]:
+                del self._failures[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            locked = sum(1 for count, _ in self._failures.values() if count >= self.max_failures)
+            return {"tracked_keys": len(self._failures), "locked_keys": locked,
+                    "rejected": self.rejected, "max_failures": self.max_failures,
+                    "window_seconds": self.window}
@@ -1,14 +1,24 @@
 """
 Security utilities for JWT and password hashing
+- bcrypt work runs in a dedicated process pool so it neither blocks the event
+  loop nor holds a request thread's share of the GIL
 """
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional, Sequence
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_pool_lock = threading.Lock()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password"""
@@ -18,6 +28,51 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+def _password_pool_size() -> int:
+    return settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+
+def _password_pool() -> ProcessPoolExecutor:
+    """Process pool for bcrypt, started on first use"""
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            # spawn, not fork: the server process runs threads (upload jobs, DB pools).
+            # Workers re-import __main__, so scripts must guard their entry point.
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=_password_pool_size(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _hash_pool
+
+def hash_password(password: str) -> str:
+    """get_password_hash() in the worker pool; for sync routes and scripts"""
+    return _password_pool().submit(get_password_hash, password).result()
+
+def hash_passwords(passwords: Sequence[str]) -> List[str]:
+    """Hash many passwords in parallel across the worker pool, preserving order"""
+    if not passwords:
+        return []
+    chunksize = max(1, len(passwords) // (_password_pool_size() * 4))
+    return list(_password_pool().map(get_password_hash, passwords, chunksize=chunksize))
+
+def check_password(plain_password: str, hashed_password: str) -> bool:
+    """verify_password() in the worker pool; for sync routes and scripts"""
+    return _password_pool().submit(verify_password, plain_password, hashed_password).result()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password() in the worker pool without blocking the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(
+        _password_pool(), verify_password, plain_password, hashed_password
+    )
+
+def shutdown_password_pool() -> None:
+    """Stop the hashing workers (application shutdown)"""
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(cancel_futures=True)
+            _hash_pool = None
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -0,0 +1,36 @@
+"""
+Bulk write helpers shared by the ingestion and admin bulk paths
+- Dialect-aware INSERT ... ON CONFLICT for SQLite and PostgreSQL
+- Chunking so IN (...) lists and multi-row VALUES stay under driver limits
+"""
+
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+from sqlalchemy.orm import Session
+
+# SQLite builds before 3.32 cap bound parameters at 999 per statement,
+# so keep every IN (...) list and VALUES batch comfortably below that.
+BULK_CHUNK_SIZE = 500
+
+
+def chunked(items: Iterable, size: int = BULK_CHUNK_SIZE) -> Iterator[List]:
+    """Yield lists of at most `size` items from any iterable"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def dialect_insert(db: Session, table):
+    """Return an INSERT construct that supports ON CONFLICT for the session's database"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Bulk upserts are not supported on {dialect}")
+    return insert(table)
@@ -1,12 +1,19 @@
 """
 Database configuration and session management
+- Sync engine/SessionLocal for admin routes, scripts and background jobs
+- Async engine/AsyncSessionLocal (aiosqlite / asyncpg) for hot read routes
+- init_db() creates missing tables and brings existing ones up to the models
+  (added columns and indexes), so older databases start without manual steps
 """
 
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, inspect, text, update
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import NullPool
 from app.core.config import settings
-from app.db.models import Base
+from app.db.models import Base, Mark, computed_mark_expressions
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,7 +27,9 @@ if "sqlite" in SQLALCHEMY_DATABASE_URL:
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL,
         echo=settings.DEBUG,
-        connect_args={"check_same_thread": False},
+        # Background upload jobs write from worker threads; wait for the
+        # write lock instead of failing with "database is locked"
+        connect_args={"check_same_thread": False, "timeout": 30},
     )
 else:
     engine = create_engine(
@@ -30,6 +39,45 @@ else:
         pool_recycle=3600,
     )
 
+# Async drivers for the same database
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its async counterpart"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+if "sqlite" in SQLALCHEMY_DATABASE_URL:
+    async_engine = create_async_engine(
+        get_async_database_url(SQLALCHEMY_DATABASE_URL),
+        echo=settings.DEBUG,
+        connect_args={"timeout": 30},
+    )
+else:
+    async_engine = create_async_engine(
+        get_async_database_url(SQLALCHEMY_DATABASE_URL),
+        echo=settings.DEBUG,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+    )
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        """SQLite ignores ON DELETE CASCADE unless foreign keys are switched on per connection"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
 # Create session factory
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -37,10 +85,67 @@ SessionLocal = sessionmaker(
     bind=engine,
 )
 
+# Async session factory; objects stay usable after commit since lazy
+# loading is not available on async sessions
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+# Mark columns computed from the CA and semester marks; filled in when added
+DERIVED_MARK_COLUMNS = {"ca_average", "ca_passed", "computed_grade", "is_passed"}
+# Covered by the composite (semester_id, is_passed) / (subject_id, computed_grade) indexes
+OBSOLETE_INDEXES = ("idx_mark_semester", "idx_mark_subject")
+
+
+def _column_ddl(connection, column) -> str:
+    """Column definition for ALTER TABLE ... ADD COLUMN, foreign key included"""
+    ddl = str(CreateColumn(column).compile(dialect=connection.dialect))
+    for foreign_key in column.foreign_keys:
+        target = foreign_key.column
+        ddl += f" REFERENCES {target.table.name} ({target.name})"
+        if foreign_key.ondelete:
+            ddl += f" ON DELETE {foreign_key.ondelete}"
+    return ddl
+
+
+def upgrade_schema(connection) -> dict:
+    """Add the model columns and indexes an existing database is missing
+
+    Does what the scripts/migrate_*.py scripts do, in model order, so every
+    column exists before startup code touches it. Returns {table: [columns added]}.
+    """
+    inspector = inspect(connection)
+    added = {}
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {_column_ddl(connection, column)}"))
+                added.setdefault(table.name, []).append(column.name)
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+    for index in OBSOLETE_INDEXES:
+        connection.execute(text(f"DROP INDEX IF EXISTS {index}"))
+
+    if DERIVED_MARK_COLUMNS & set(added.get(Mark.__tablename__, ())):
+        marks = Mark.__table__
+        connection.execute(update(marks).values(
+            **computed_mark_expressions(marks.c.ca1, marks.c.ca2, marks.c.ca3, marks.c.semester_marks)
+        ))
+    return added
+
 
 def init_db():
-    """Initialize database - create all tables"""
+    """Initialize database - create missing tables and upgrade existing ones"""
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        added = upgrade_schema(connection)
+    for table, columns in added.items():
+        logger.info(f"➕ Added {table} columns: {', '.join(columns)}")
     logger.info("✅ Database initialized successfully")
 
 
@@ -51,3 +156,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency for getting an async database session in FastAPI routes"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -9,10 +9,20 @@ SQLAlchemy Models for EduAnalytics
 
 from datetime import datetime
 from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, Enum, UniqueConstraint, Index
+from sqlalchemy import and_, case, cast, event, func, or_
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 import enum
 
+import numpy as np
+
+# Grading rules shared by computed_mark_values() and its SQL and array twins
+from app.utils.grade_converter import (
+    CA_PASS_MARK, FAIL_GRADE, GRADE_BANDS, MIN_CA_EXAMS,
+    get_grade_from_marks, grade_indices_from_marks, grades_from_marks,
+)
+
 Base = declarative_base()
 
 
@@ -22,6 +32,8 @@ class Batch(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     batch_year = Column(String(4), unique=True, nullable=False, index=True)  # e.g., "2024"
+    # Bumped whenever marks of any student in the batch change (ranks move); part of dashboard ETags
+    marks_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -70,17 +82,23 @@ class Student(Base):
     email = Column(String(100), unique=True, nullable=False, index=True)
     date_of_birth = Column(String(20), nullable=False)  # Stored as "DD-MM-YYYY" for login
     batch_id = Column(Integer, ForeignKey("batches.id"), nullable=False)
+    password_hash = Column(String(255), nullable=True)  # Optional bcrypt password (accounts created by admins)
+    # Bumped whenever the student's marks change; part of dashboard/marks ETags
+    marks_version = Column(Integer, nullable=False, default=0, server_default="0")
     is_active = Column(Boolean, default=True)
+    # CSV upload that created this student (NULL for manually created rows)
+    upload_id = Column(Integer, ForeignKey("csv_upload_logs.id", ondelete="CASCADE"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     batch = relationship("Batch", back_populates="students")
-    marks = relationship("Mark", back_populates="student", cascade="all, delete-orphan")
+    marks = relationship("Mark", back_populates="student", cascade="all, delete-orphan", passive_deletes=True)
     
     __table_args__ = (
         Index('idx_student_batch', 'batch_id'),
         Index('idx_student_register_no', 'register_no'),
+        Index('idx_student_upload', 'upload_id'),
     )
     
     def __repr__(self):
@@ -138,9 +156,11 @@ class Mark(Base):
     __tablename__ = "marks"
     
     id = Column(Integer, primary_key=True, index=True)
-    student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
     subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False)
     semester_id = Column(Integer, ForeignKey("semesters.id"), nullable=False)
+    # CSV upload that created this mark (NULL for marks entered by hand)
+    upload_id = Column(Integer, ForeignKey("csv_upload_logs.id", ondelete="CASCADE"), nullable=True)
     
     # CA marks (Continuous Assessment)
     ca1 = Column(Float, nullable=True)  # CA1 marks (0-100)
@@ -151,11 +171,19 @@ class Mark(Base):
     semester_marks = Column(Float, nullable=True)  # Semester exam marks (0-100)
     
     # Semester Grade (After grading - optional)
-    sem_grade = Column(String(2), nullable=True)  # O, A+, A, B+, B, C, RA
+    sem_grade = Column(String(2), nullable=True)  # O, A+, A, B+, B, C, RA as entered (CSV SEM_Grade / semester publish)
     
     # Flag to indicate if semester results are published
     sem_published = Column(Boolean, default=False)  # True when SEM grades are entered
     
+    # Derived from the marks above and stored so they can be indexed and filtered.
+    # Kept in step by the before_insert/before_update hooks below; bulk writes
+    # that bypass the ORM must set them with computed_mark_values()
+    ca_average = Column(Float, nullable=True)  # NULL with fewer than MIN_CA_EXAMS CAs
+    ca_passed = Column(Boolean, nullable=False, default=False, server_default="0")
+    computed_grade = Column(String(2), nullable=True)  # Grade band of semester_marks
+    is_passed = Column(Boolean, nullable=False, default=False, server_default="0")
+    
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -168,28 +196,23 @@ class Mark(Base):
     __table_args__ = (
         UniqueConstraint('student_id', 'subject_id', 'semester_id', name='unique_student_subject_semester'),
         Index('idx_mark_student', 'student_id'),
-        Index('idx_mark_subject', 'subject_id'),
-        Index('idx_mark_semester', 'semester_id'),
+        # Also serve plain semester_id / subject_id lookups (leftmost column)
+        Index('idx_mark_semester_passed', 'semester_id', 'is_passed'),
+        Index('idx_mark_subject_grade', 'subject_id', 'computed_grade'),
+        Index('idx_mark_upload', 'upload_id'),
     )
     
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.refresh_computed()
+    
     def __repr__(self):
         return f"<Mark student_id={self.student_id} subject_id={self.subject_id}>"
     
-    @property
-    def ca_average(self):
-        """
-        Calculate CA average based on number of exams conducted.
-        Handles 2 or 3 CA exams:
-        - 3 CAs: (CA1 + CA2 + CA3) / 3
-        - 2 CAs: (CA1 + CA2) / 2
-        Returns None if insufficient data
-        """
-        ca_scores = [self.ca1, self.ca2, self.ca3]
-        non_null_scores = [score for score in ca_scores if score is not None]
-        
-        if len(non_null_scores) >= 2:  # At least 2 CAs required
-            return sum(non_null_scores) / len(non_null_scores)
-        return None
+    def refresh_computed(self):
+        """Recompute the stored ca_average, ca_passed, computed_grade and is_passed"""
+        for key, value in computed_mark_values(self.ca1, self.ca2, self.ca3, self.semester_marks).items():
+            setattr(self, key, value)
     
     @property
     def ca_total(self):
@@ -198,72 +221,159 @@ class Mark(Base):
         non_null_scores = [score for score in ca_scores if score is not None]
         return sum(non_null_scores) if non_null_scores else 0
     
-    @property
+    @hybrid_property
     def ca_status(self):
         """CA Pass/Fail Status - based on average >= 30"""
-        avg = self.ca_average
-        if avg is None:
-            return "Failed"
-        return "Passed" if avg >= 30 else "Failed"
+        return "Passed" if self.ca_passed else "Failed"
     
-    @property
-    def sem_grade(self):
-        """
-        Semester Grade based on marks:
-        91-100 → O (Outstanding)
-        81-90 → A+ (Excellent)
-        71-80 → A (Very Good)
-        61-70 → B+ (Good)
-        56-60 → B (Average)
-        50-55 → C (Satisfactory)
-        <50 → RA (Re-Appear/Failed)
-        """
-        if self.semester_marks is None or self.semester_marks <= 0:
-            return None
-        
-        marks = self.semester_marks
-        if marks >= 91:
-            return "O"
-        elif marks >= 81:
-            return "A+"
-        elif marks >= 71:
-            return "A"
-        elif marks >= 61:
-            return "B+"
-        elif marks >= 56:
-            return "B"
-        elif marks >= 50:
-            return "C"
-        else:
-            return "RA"
+    @ca_status.expression
+    def ca_status(cls):
+        return case((cls.ca_passed, "Passed"), else_="Failed")
     
     @property
     def sem_status(self):
         """Semester Status - only active when semester marks released"""
-        if self.semester_marks is None or self.semester_marks <= 0:
+        grade = self.computed_grade
+        if grade is None:
             return "-"
-        
-        grade = self.sem_grade
-        if grade == "RA":
+        if grade == FAIL_GRADE:
             return f"{grade} (Failed)"
         return grade
+
+
+def compute_ca_average(ca1, ca2, ca3):
+    """
+    Calculate CA average based on number of exams conducted.
+    Handles 2 or 3 CA exams:
+    - 3 CAs: (CA1 + CA2 + CA3) / 3
+    - 2 CAs: (CA1 + CA2) / 2
+    Returns None if insufficient data
+    """
+    non_null_scores = [score for score in (ca1, ca2, ca3) if score is not None]
+    if len(non_null_scores) >= MIN_CA_EXAMS:  # At least 2 CAs required
+        return sum(non_null_scores) / len(non_null_scores)
+    return None
+
+
+def compute_grade(semester_marks):
+    """Semester grade band (GRADE_BANDS); None when semester marks are missing or not above 0"""
+    if semester_marks is None or semester_marks <= 0:
+        return None
+    return get_grade_from_marks(semester_marks)
+
+
+def computed_mark_values(ca1, ca2, ca3, semester_marks) -> dict:
+    """
+    Stored derived columns of a mark. Pass/Fail logic:
+    - CA average >= 30 (mandatory - calculated from available CA exams)
+    - If semester exists: semester grade != RA
+    - If no semester: CA passing is sufficient
+    """
+    average = compute_ca_average(ca1, ca2, ca3)
+    grade = compute_grade(semester_marks)
+    ca_passed = average is not None and average >= CA_PASS_MARK
+    return {
+        "ca_average": average,
+        "ca_passed": ca_passed,
+        "computed_grade": grade,
+        "is_passed": ca_passed and grade != FAIL_GRADE,
+    }
+
+
+def computed_mark_expressions(ca1, ca2, ca3, semester_marks) -> dict:
+    """SQL twin of computed_mark_values() over column expressions, for set-based UPDATEs"""
+    entered = (
+        case((ca1.is_not(None), 1), else_=0)
+        + case((ca2.is_not(None), 1), else_=0)
+        + case((ca3.is_not(None), 1), else_=0)
+    )
+    total = func.coalesce(ca1, 0.0) + func.coalesce(ca2, 0.0) + func.coalesce(ca3, 0.0)
+    average = case((entered >= MIN_CA_EXAMS, total / cast(entered, Float)), else_=None)
+    bands = [(semester_marks >= lowest, grade) for lowest, grade in GRADE_BANDS]
+    grade = case(*bands, (semester_marks > 0, FAIL_GRADE), else_=None)
+    # A NULL average fails the comparison and falls through to FALSE
+    ca_passed = case((average >= CA_PASS_MARK, True), else_=False)
+    sem_ok = or_(semester_marks.is_(None), semester_marks <= 0, semester_marks >= GRADE_BANDS[-1][0])
+    return {
+        "ca_average": average,
+        "ca_passed": ca_passed,
+        "computed_grade": grade,
+        "is_passed": case((and_(average >= CA_PASS_MARK, sem_ok), True), else_=False),
+    }
+
+
+def computed_mark_arrays(ca1, ca2, ca3, semester_marks) -> dict:
+    """Array twin of computed_mark_values() for bulk writes: float columns in (NaN = NULL), arrays out
+
+    ca_average is NaN and computed_grade None where the scalar version gives None.
+    """
+    cas = np.stack([ca1, ca2, ca3]).astype(np.float64)
+    semester_marks = np.asarray(semester_marks, dtype=np.float64)
+    entered = np.count_nonzero(~np.isnan(cas), axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        average = np.where(entered >= MIN_CA_EXAMS, np.nansum(cas, axis=0) / entered, np.nan)
+        graded = semester_marks > 0
+        ca_passed = average >= CA_PASS_MARK
+    grades = grades_from_marks(np.where(graded, semester_marks, np.nan))
+    failed_grade = graded & (grade_indices_from_marks(semester_marks) == 0)
+    return {
+        "ca_average": average,
+        "ca_passed": ca_passed,
+        "computed_grade": grades,
+        "is_passed": ca_passed & ~failed_grade,
+    }
+
+
+@event.listens_for(Mark, "before_insert")
+@event.listens_for(Mark, "before_update")
+def _store_computed_mark_values(mapper, connection, target):
+    target.refresh_computed()
+
+
+class StudentAggregate(Base):
+    """Per-student, per-semester rollup of Mark rows - maintained on every mark write"""
+    __tablename__ = "student_aggregates"
     
-    @property
-    def is_passed(self):
-        """
-        Pass/Fail logic:
-        - CA average >= 30 (mandatory - calculated from available CA exams)
-        - If semester exists: semester grade != RA
-        - If no semester: CA passing is sufficient
-        """
-        avg = self.ca_average
-        if avg is None or avg < 30:
-            return False
-        
-        if self.semester_marks is not None and self.semester_marks > 0:
-            return self.sem_grade != "RA"
-        
-        return True
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
+    semester_id = Column(Integer, ForeignKey("semesters.id", ondelete="CASCADE"), nullable=False)
+    batch_id = Column(Integer, ForeignKey("batches.id", ondelete="CASCADE"), nullable=False)  # Copied from the student for batch-wide ranking
+    
+    total_subjects = Column(Integer, nullable=False, default=0)
+    passed_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    
+    # Sums and counts of entered CA marks, so semesters can be combined exactly
+    ca1_sum = Column(Float, nullable=False, default=0.0)
+    ca1_count = Column(Integer, nullable=False, default=0)
+    ca2_sum = Column(Float, nullable=False, default=0.0)
+    ca2_count = Column(Integer, nullable=False, default=0)
+    ca3_sum = Column(Float, nullable=False, default=0.0)
+    ca3_count = Column(Integer, nullable=False, default=0)
+    ca1_average = Column(Float, nullable=True)
+    ca2_average = Column(Float, nullable=True)
+    ca3_average = Column(Float, nullable=True)
+    ca_overall = Column(Float, nullable=True)  # Mean of every CA mark entered
+    
+    # Mark.ca_average summed over marks that have one (class performance / comparisons)
+    ca_average_sum = Column(Float, nullable=False, default=0.0)
+    ca_average_count = Column(Integer, nullable=False, default=0)
+    
+    semester_sum = Column(Float, nullable=False, default=0.0)
+    semester_count = Column(Integer, nullable=False, default=0)
+    semester_average = Column(Float, nullable=True)
+    
+    sem_published = Column(Boolean, default=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('student_id', 'semester_id', name='unique_student_semester_aggregate'),
+        Index('idx_aggregate_batch', 'batch_id'),
+        Index('idx_aggregate_student', 'student_id'),
+    )
+    
+    def __repr__(self):
+        return f"<StudentAggregate student_id={self.student_id} semester_id={self.semester_id}>"
 
 
 class RoleEnum(str, enum.Enum):
@@ -315,3 +425,31 @@ class CSVUploadLog(Base):
     
     def __repr__(self):
         return f"<CSVUploadLog {self.filename}>"
+
+
+class CSVUploadJob(Base):
+    """Progress of a background CSV upload, shared by every worker process"""
+    __tablename__ = "csv_upload_jobs"
+    
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    admin_id = Column(Integer, ForeignKey("admins.id"), nullable=False)
+    filename = Column(String(255), nullable=False)
+    status = Column(String(20), default="queued", nullable=False)  # queued, running, completed, failed
+    total_bytes = Column(Integer, default=0)
+    bytes_processed = Column(Integer, default=0)
+    rows_processed = Column(Integer, default=0)
+    success_count = Column(Integer, default=0)
+    error_count = Column(Integer, default=0)
+    errors = Column(Text, nullable=True)  # JSON list of the first row errors
+    error = Column(Text, nullable=True)  # Why the job aborted
+    upload_log_id = Column(Integer, nullable=True)  # No FK: undoing an upload deletes its log
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('idx_csv_job_admin_created', 'admin_id', 'created_at'),
+    )
+    
+    def __repr__(self):
+        return f"<CSVUploadJob {self.id} {self.status}>"
@@ -0,0 +1,133 @@
+"""
+Per-request SQL instrumentation
+- before/after_cursor_execute hooks on every Engine (sync and async) time each statement
+- Statements are charged to the QueryStats of the current request via a context variable
+- Per-route totals are kept in memory for the metrics endpoint
+- capture_queries() measures any block of code, for tests and benchmarks
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Longest statement text kept for "slowest statement" reports
+STATEMENT_PREVIEW_CHARS = 300
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+
+class QueryStats:
+    """SQL statements run while handling one request (or one captured block)"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed >= self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "X-DB-Query-Count": str(self.count),
+            "X-DB-Time-Ms": f"{self.total_time * 1000:.2f}",
+            "X-DB-Slowest-Ms": f"{self.slowest_time * 1000:.2f}",
+        }
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    start_times = conn.info.get("query_start_times")
+    if stats is None or not start_times:
+        return
+    stats.record(statement[:STATEMENT_PREVIEW_CHARS], time.perf_counter() - start_times.pop())
+
+
+def begin_request() -> QueryStats:
+    """Start charging statements in the current context to a fresh QueryStats"""
+    stats = QueryStats()
+    _current_stats.set(stats)
+    return stats
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    """Count the statements run inside the block"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+class RouteMetrics:
+    """Running query totals per route"""
+
+    def __init__(self):
+        self._routes: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def add(self, route: str, stats: QueryStats) -> None:
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self._routes[route] = {
+                    "requests": 0,
+                    "queries": 0,
+                    "max_queries": 0,
+                    "db_time": 0.0,
+                    "slowest_time": 0.0,
+                    "slowest_statement": None,
+                }
+            entry["requests"] += 1
+            entry["queries"] += stats.count
+            entry["max_queries"] = max(entry["max_queries"], stats.count)
+            entry["db_time"] += stats.total_time
+            if stats.slowest_time > entry["slowest_time"]:
+                entry["slowest_time"] = stats.slowest_time
+                entry["slowest_statement"] = stats.slowest_statement
+
+    def snapshot(self) -> list:
+        with self._lock:
+            routes = [(route, dict(entry)) for route, entry in self._routes.items()]
+        return sorted(
+            (
+                {
+                    "route": route,
+                    "requests": entry["requests"],
+                    "avg_queries": round(entry["queries"] / entry["requests"], 2),
+                    "max_queries": entry["max_queries"],
+                    "avg_db_time_ms": round(entry["db_time"] / entry["requests"] * 1000, 2),
+                    "slowest_ms": round(entry["slowest_time"] * 1000, 2),
+                    "slowest_statement": entry["slowest_statement"],
+                }
+                for route, entry in routes
+            ),
+            key=lambda item: item["avg_db_time_ms"],
+            reverse=True,
+        )
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+route_metrics = RouteMetrics()
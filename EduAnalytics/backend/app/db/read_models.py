@@ -0,0 +1,50 @@
+"""
+Column sets for read-only listings
+- Core selects over these return plain Row tuples: no identity map, no
+  attribute instrumentation, no lazy-load checks
+- rows_as_dicts() turns them into JSON-ready dicts by position
+"""
+
+from typing import Iterable, List, Sequence
+
+from sqlalchemy import func
+
+from app.db.models import Mark, Semester, Student, Subject
+
+STUDENT_ROW_FIELDS = ("id", "register_no", "name", "email", "batch_id", "is_active")
+STUDENT_ROW_COLUMNS = (
+    Student.id, Student.register_no, Student.name, Student.email, Student.batch_id, Student.is_active,
+)
+
+# Grade shown for a mark: as entered when there is one, else the band of semester_marks
+SHOWN_SEM_GRADE = func.coalesce(Mark.sem_grade, Mark.computed_grade)
+
+# Marks edit grid; select from Mark with Subject and Semester outer-joined
+EDIT_MARK_COLUMNS = (
+    Mark.id,
+    Mark.subject_id,
+    func.coalesce(Subject.name, "Unknown"),
+    func.coalesce(Semester.semester_number, 1),
+    Mark.ca1,
+    Mark.ca2,
+    Mark.ca3,
+    Mark.semester_marks,
+    SHOWN_SEM_GRADE,
+)
+
+# Student marks page; select from Mark with Subject outer-joined
+STUDENT_MARK_FIELDS = ("subject_name", "ca1", "ca2", "ca3", "ca_average", "semester_marks", "passed")
+STUDENT_MARK_COLUMNS = (
+    func.coalesce(Subject.name, "Unknown"),
+    Mark.ca1,
+    Mark.ca2,
+    Mark.ca3,
+    Mark.ca_average,
+    Mark.semester_marks,
+    Mark.is_passed,
+)
+
+
+def rows_as_dicts(fields: Sequence[str], rows: Iterable) -> List[dict]:
+    """Zip each row with `fields`; extra trailing columns are ignored"""
+    return [dict(zip(fields, row)) for row in rows]
@@ -1,10 +1,12 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes import auth, student, admin, comparison, batch_subjects
-from app.db.database import init_db
-
-# Initialize database tables on startup
-init_db()
+from app.core.config import settings
+from app.core.security import shutdown_password_pool
+from app.db.database import init_db, SessionLocal
+from app.db.query_metrics import begin_request, route_metrics
+from app.services.aggregates import ensure_student_aggregates
+from app.services.auth_service import firebase_verifier
 
 app = FastAPI(
     title="EduAnalytics API",
@@ -22,6 +24,52 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+if settings.QUERY_METRICS_ENABLED:
+    @app.middleware("http")
+    async def record_query_metrics(request: Request, call_next):
+        """Count the SQL statements behind each request and report them in headers
+        
+        Headers go out with the first byte, so for streamed bodies they only
+        cover the statements run before it; the per-route totals are recorded
+        once the body has been sent and include every statement.
+        """
+        stats = begin_request()
+        response = await call_next(request)
+        response.headers.update(stats.headers())
+        route = request.scope.get("route")
+        if route is not None:
+            body = response.body_iterator
+            
+            async def body_then_record():
+                try:
+                    async for chunk in body:
+                        yield chunk
+                finally:
+                    route_metrics.add(f"{request.method} {route.path}", stats)
+            
+            response.body_iterator = body_then_record()
+        return response
+
+@app.on_event("startup")
+def prepare_database():
+    """Create missing tables and fill student_aggregates for databases created before it existed"""
+    init_db()
+    with SessionLocal() as db:
+        ensure_student_aggregates(db)
+
+@app.on_event("startup")
+def load_firebase_keys():
+    """Fetch Firebase signing keys before the first login and keep them fresh"""
+    if firebase_verifier is not None:
+        firebase_verifier.keys.start()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    """Stop the bcrypt worker processes and the signing-key refresher"""
+    shutdown_password_pool()
+    if firebase_verifier is not None:
+        firebase_verifier.keys.stop()
+
 # Include routers AFTER middleware
 app.include_router(auth.router)
 app.include_router(student.router)
@@ -1,16 +1,35 @@
 """
 Admin routes - Manage students, marks, CSV upload, etc.
 """
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Header
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import delete, exists, func, select
+from sqlalchemy.orm import Session, joinedload
 from app.db.database import get_db
-from app.db.models import Student, Mark, Admin, Batch, Semester, Subject, CSVUploadLog
-from app.core.security import decode_token
-from app.schemas.schemas import StudentCreate, StudentResponse, MarkCreate, MarkResponse, MarkUpdate
-from app.core.security import get_password_hash
+from app.db.models import Student, Mark, Batch, Semester, Subject, CSVUploadLog, StudentAggregate, computed_mark_values
+from app.core.auth import STUDENT, AdminPrincipal, get_current_admin, invalidate_principals_after_commit, principal_cache
+from app.schemas.schemas import StudentCreate, StudentResponse, BulkStudentCreate, BulkStudentCreateResponse, MarkCreate, MarkResponse, MarkUpdate, MarkGridSave, MarkGridSaveResponse, SemesterPublish, SemesterPublishResponse
+from app.core.security import hash_password, hash_passwords
+from app.core.config import settings
+from app.services.csv_ingest import (
+    ingest_csv_rows,
+    iter_text_lines,
+    start_upload_log,
+    finish_upload_log,
+    fail_upload_log
+)
+from app.services.upload_jobs import job_to_dict, upload_jobs
+from app.services import export
+from app.services.semester_publish import publish_semester_results
+from app.services.aggregates import refresh_student_aggregates, mark_batches_changed
+from app.services.auth_service import firebase_verifier
+from app.db.bulk import chunked, dialect_insert
+from app.db.read_models import EDIT_MARK_COLUMNS, STUDENT_ROW_COLUMNS, STUDENT_ROW_FIELDS, rows_as_dicts
+from app.db.query_metrics import route_metrics
 from typing import Optional, List
 import csv
 import io
+import time
 from datetime import datetime
 
 router = APIRouter(prefix="/api/v1/admin", tags=["Admin"])
@@ -20,44 +39,10 @@ async def test_endpoint():
     """Test endpoint - no authentication required"""
     return {"status": "ok", "message": "Admin routes working"}
 
-def validate_dob_format(dob: str) -> bool:
-    """Validate date of birth format DD-MM-YYYY"""
-    try:
-        datetime.strptime(dob.strip(), "%d-%m-%Y")
-        return True
-    except ValueError:
-        return False
-
-def get_current_admin(authorization: str = Header(None), db: Session = Depends(get_db)):
-    """Get current logged-in admin from token"""
-    if not authorization:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing authorization header"
-        )
-    
-    try:
-        token = authorization.replace("Bearer ", "")
-        payload = decode_token(token)
-        if not payload or payload.get("role") != "admin":
-            raise HTTPException(status_code=401, detail="Invalid token")
-        admin_id = int(payload.get("sub"))
-    except:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials"
-        )
-    
-    admin = db.query(Admin).filter(Admin.id == admin_id).first()
-    if not admin:
-        raise HTTPException(status_code=404, detail="Admin not found")
-    
-    return admin
-
 @router.post("/students", response_model=StudentResponse)
-async def create_student(
+def create_student(
     student_data: StudentCreate,
-    admin: Admin = Depends(get_current_admin),
+    admin: AdminPrincipal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Create a new student"""
@@ -66,13 +51,14 @@ async def create_student(
     if existing:
         raise HTTPException(status_code=400, detail="Register number already exists")
     
-    # Hash password
-    password_hash = get_password_hash(student_data.password)
+    # Hash password in the worker pool (this thread just waits; the event loop keeps serving)
+    password_hash = hash_password(student_data.password) if student_data.password else None
     
     student = Student(
         register_no=student_data.register_no,
         name=student_data.name,
         email=student_data.email,
+        date_of_birth=student_data.date_of_birth,
         password_hash=password_hash,
         batch_id=student_data.batch_id
     )
@@ -83,39 +69,124 @@ async def create_student(
     
     return student
 
-@router.get("/students")
-async def list_students(
-    batch_id: Optional[int] = None,
-    admin: Admin = Depends(get_current_admin),
+@router.post("/students/bulk", response_model=BulkStudentCreateResponse)
+def create_students_bulk(
+    payload: BulkStudentCreate,
+    admin: AdminPrincipal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """List all students or filter by batch"""
-    query = db.query(Student)
+    """Create many student accounts: passwords hashed in parallel, rows inserted in batches
     
-    if batch_id:
-        query = query.filter(Student.batch_id == batch_id)
+    Register numbers or emails that already exist (or repeat within the request)
+    are skipped rather than failing the whole request. Students given a
+    password log in with it only; their date of birth no longer works.
+    """
+    batch_ids = {s.batch_id for s in payload.students}
+    found_batches = set(db.scalars(select(Batch.id).where(Batch.id.in_(batch_ids))).all())
+    missing = sorted(batch_ids - found_batches)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Batches not found: {missing}")
     
-    students = query.all()
+    # Drop conflicts before hashing so no bcrypt work is spent on rows that cannot be inserted
+    register_nos = [s.register_no for s in payload.students]
+    emails = [s.email for s in payload.students]
+    taken_register_nos, taken_emails = set(), set()
+    for chunk in chunked(register_nos):
+        taken_register_nos.update(db.scalars(select(Student.register_no).where(Student.register_no.in_(chunk))).all())
+    for chunk in chunked(emails):
+        taken_emails.update(db.scalars(select(Student.email).where(Student.email.in_(chunk))).all())
     
-    return {
-        "total": len(students),
-        "students": [
+    accepted, skipped = [], []
+    for s in payload.students:
+        if s.register_no in taken_register_nos or s.email in taken_emails:
+            skipped.append(s.register_no)
+            continue
+        taken_register_nos.add(s.register_no)
+        taken_emails.add(s.email)
+        accepted.append(s)
+    
+    hashing_started = time.perf_counter()
+    with_password = [s for s in accepted if s.password]
+    hashes = dict(zip(
+        (s.register_no for s in with_password),
+        hash_passwords([s.password for s in with_password])
+    ))
+    hashing_ms = (time.perf_counter() - hashing_started) * 1000
+    
+    now = datetime.utcnow()
+    created = 0
+    # ON CONFLICT DO NOTHING covers accounts created concurrently since the check above
+    stmt = dialect_insert(db, Student.__table__).on_conflict_do_nothing().returning(Student.register_no)
+    for chunk in chunked(accepted):
+        inserted = set(db.scalars(stmt, [
             {
-                "id": s.id,
                 "register_no": s.register_no,
                 "name": s.name,
                 "email": s.email,
+                "date_of_birth": s.date_of_birth,
                 "batch_id": s.batch_id,
-                "is_active": s.is_active
+                "password_hash": hashes.get(s.register_no),
+                "is_active": True,
+                "created_at": now,
+                "updated_at": now,
             }
-            for s in students
-        ]
+            for s in chunk
+        ]).all())
+        created += len(inserted)
+        skipped.extend(s.register_no for s in chunk if s.register_no not in inserted)
+    db.commit()
+    
+    logger = __import__('logging').getLogger(__name__)
+    logger.info(f"👥 Bulk student creation by admin {admin.id}: {created} created, {len(skipped)} skipped, hashing {hashing_ms:.0f}ms")
+    return {
+        "requested": len(payload.students),
+        "created": created,
+        "skipped": len(skipped),
+        "skipped_register_nos": skipped,
+        "hashing_ms": round(hashing_ms, 2),
     }
 
+@router.get("/students", response_class=ORJSONResponse)
+def list_students(
+    batch_id: Optional[int] = None,
+    admin: AdminPrincipal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """List all students or filter by batch"""
+    query = select(*STUDENT_ROW_COLUMNS)
+    
+    if batch_id:
+        query = query.where(Student.batch_id == batch_id)
+    
+    rows = db.execute(query).all()
+    
+    return ORJSONResponse({
+        "total": len(rows),
+        "students": rows_as_dicts(STUDENT_ROW_FIELDS, rows)
+    })
+
+@router.patch("/students/{student_id}/active")
+def set_student_active(
+    student_id: int,
+    is_active: bool = Query(..., description="false blocks the student's existing tokens immediately"),
+    admin: AdminPrincipal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Activate or deactivate a student account"""
+    student = db.get(Student, student_id)
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    
+    # The commit drops the student's cached principals (see app.core.auth)
+    student.is_active = is_active
+    db.commit()
+    
+    return {"id": student.id, "register_no": student.register_no, "is_active": student.is_active}
+
 @router.post("/marks", response_model=MarkResponse)
-async def create_mark(
+def create_mark(
     mark_data: MarkCreate,
-    admin: Admin = Depends(get_current_admin),
+    admin: AdminPrincipal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Create or update a mark for a student"""
@@ -132,6 +203,8 @@ async def create_mark(
         existing.ca2 = mark_data.ca2
         existing.ca3 = mark_data.ca3
         existing.semester = mark_data.semester
+        db.flush()
+        refresh_student_aggregates(db, [existing.student_id])
         db.commit()
         db.refresh(existing)
         return existing
@@ -148,19 +221,21 @@ async def create_mark(
     )
     
     db.add(mark)
+    db.flush()
+    refresh_student_aggregates(db, [mark.student_id])
     db.commit()
     db.refresh(mark)
     
     return mark
 
 @router.get("/marks/student/{student_id}")
-async def get_student_marks(
+def get_student_marks(
     student_id: int,
-    admin: Admin = Depends(get_current_admin),
+    admin: AdminPrincipal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Get all marks for a specific student"""
-    marks = db.query(Mark).filter(Mark.student_id == student_id).all()
+    marks = db.query(Mark).options(joinedload(Mark.subject)).filter(Mark.student_id == student_id).all()
     
     return {
         "student_id": student_id,
@@ -180,9 +255,11 @@ async def get_student_marks(
     }
 
 @router.post("/csv-upload")
-async def upload_csv(
+def upload_csv(
     file: UploadFile = File(...),
-    admin: Admin = Depends(get_current_admin),
+    chunk_size: Optional[int] = Query(None, ge=1, description="Rows committed per chunk (defaults to CSV_UPLOAD_CHUNK_ROWS)"),
+    background: bool = Query(False, description="Queue the upload and return a job id immediately"),
+    admin: AdminPrincipal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """
@@ -197,155 +274,45 @@ async def upload_csv(
     - Date_of_Birth format: DD-MM-YYYY (e.g., 15-03-2005)
     
     CA Pass Requirement: Average of CA marks >= 30 out of 60
+    
+    Rows are committed in chunks of `chunk_size`; a chunk that fails is
+    reported in `errors` without rolling back chunks already saved.
+    
+    With `background=true` the file is queued and a job id is returned at
+    once; poll `/csv-upload/jobs/{job_id}` for progress. Progress is kept in
+    the database, so any worker can answer the poll.
     """
     logger = __import__('logging').getLogger(__name__)
     logger.info(f"📤 CSV UPLOAD STARTED: {file.filename} by admin {admin.id}")
+    if background:
+        job = upload_jobs.submit(db, admin.id, file.filename, file.file, chunk_size or settings.CSV_UPLOAD_CHUNK_ROWS)
+        return {
+            "job_id": job.id,
+            "filename": file.filename,
+            "status": job.status
+        }
+    upload_log = start_upload_log(db, admin.id, file.filename)
     try:
-        contents = await file.read()
-        csv_reader = csv.DictReader(io.StringIO(contents.decode('utf-8')))
-        
-        success_count = 0
-        error_messages = []
-        upload_log_id = None
+        # Stream the spooled upload row by row instead of reading it into memory
+        csv_reader = csv.DictReader(iter_text_lines(file.file))
         
-        for row_num, row in enumerate(csv_reader, start=2):
-            try:
-                # Parse and validate required fields
-                register_no = row.get('Register_No', '').strip()
-                student_name = row.get('Student_Name', '').strip()
-                email = row.get('Email', '').strip()
-                dob = row.get('Date_of_Birth', '').strip()
-                batch_year = row.get('Batch_Year', '').strip()
-                semester_num = row.get('Semester', '1').strip()
-                subject_name = row.get('Subject_Name', '').strip()
-                
-                if not all([register_no, student_name, email, dob, batch_year, subject_name]):
-                    error_messages.append(f"Row {row_num}: Missing required fields")
-                    continue
-                
-                # Validate DOB format (DD-MM-YYYY)
-                if not validate_dob_format(dob):
-                    error_messages.append(f"Row {row_num}: Invalid date format. Use DD-MM-YYYY (e.g., 15-03-2005)")
-                    continue
-                
-                # Find or create batch
-                batch = db.query(Batch).filter(Batch.batch_year == batch_year).first()
-                if not batch:
-                    batch = Batch(batch_year=batch_year)
-                    db.add(batch)
-                    db.flush()
-                
-                # Find or create student with DOB instead of password
-                student = db.query(Student).filter(
-                    Student.register_no == register_no
-                ).first()
-                
-                if not student:
-                    # Create new student (NO password hash - use DOB directly for login)
-                    student = Student(
-                        register_no=register_no,
-                        name=student_name,
-                        email=email,
-                        date_of_birth=dob,
-                        batch_id=batch.id
-                    )
-                    db.add(student)
-                    db.flush()
-                else:
-                    # Update existing student's DOB and batch
-                    student.date_of_birth = dob
-                    student.batch_id = batch.id
-                
-                # Find or create subject
-                subject = db.query(Subject).filter(
-                    Subject.name == subject_name
-                ).first()
-                
-                if not subject:
-                    subject = Subject(name=subject_name, code=subject_name[:10].upper())
-                    db.add(subject)
-                    db.flush()
-                
-                # Find or create semester
-                semester = db.query(Semester).filter(
-                    Semester.batch_id == batch.id,
-                    Semester.semester_number == int(semester_num)
-                ).first()
-                
-                if not semester:
-                    semester = Semester(
-                        batch_id=batch.id,
-                        semester_number=int(semester_num),
-                        academic_year=f"{batch_year}-{int(batch_year)+1}"
-                    )
-                    db.add(semester)
-                    db.flush()
-                
-                # Create or update mark
-                mark = db.query(Mark).filter(
-                    Mark.student_id == student.id,
-                    Mark.subject_id == subject.id,
-                    Mark.semester_id == semester.id
-                ).first()
-                
-                if not mark:
-                    mark = Mark(
-                        student_id=student.id,
-                        subject_id=subject.id,
-                        semester_id=semester.id
-                    )
-                    db.add(mark)
-                
-                # Parse CA marks (REQUIRED)
-                try:
-                    mark.ca1 = float(row.get('CA1', 0)) if row.get('CA1') else None
-                    mark.ca2 = float(row.get('CA2', 0)) if row.get('CA2') else None
-                    mark.ca3 = float(row.get('CA3', 0)) if row.get('CA3') else None
-                except ValueError as e:
-                    error_messages.append(f"Row {row_num}: Invalid CA marks format - {str(e)}")
-                    continue
-                
-                # Parse Semester marks (OPTIONAL - for initial data only, grades entered later)
-                try:
-                    sem_marks_str = row.get('Semester_Marks', '').strip()
-                    mark.semester_marks = float(sem_marks_str) if sem_marks_str else None
-                except ValueError:
-                    mark.semester_marks = None
-                
-                # Parse SEM Grade (OPTIONAL - only when results published)
-                sem_grade = row.get('SEM_Grade', '').strip().upper() if row.get('SEM_Grade') else None
-                if sem_grade and sem_grade != '':
-                    valid_grades = ['O', 'A+', 'A', 'B+', 'B', 'C', 'RA']
-                    if sem_grade not in valid_grades:
-                        error_messages.append(f"Row {row_num}: Invalid SEM_Grade '{sem_grade}'. Must be one of: {', '.join(valid_grades)}")
-                        continue
-                    mark.sem_grade = sem_grade
-                
-                # FIX: Set sem_published to True if semester marks exist (regardless of SEM_Grade)
-                mark.sem_published = mark.semester_marks is not None and mark.semester_marks > 0
-                
-                success_count += 1
-                
-            except Exception as e:
-                print(f"[UPLOAD ERROR] Row {row_num}: {type(e).__name__}: {str(e)}")
-                error_messages.append(f"Row {row_num}: {str(e)}")
+        # Each chunk is resolved, written in bulk and committed on its own
+        result = ingest_csv_rows(
+            db,
+            csv_reader,
+            chunk_rows=chunk_size or settings.CSV_UPLOAD_CHUNK_ROWS,
+            upload_id=upload_log.id
+        )
+        success_count = result.success_count
+        error_messages = result.error_messages
         
-        # CRITICAL FIX: Ensure all pending changes are flushed before commit
-        db.flush()
-        # COMMIT ONCE at the end of all rows
-        db.commit()
+        logger.info(
+            f"📥 CSV UPLOAD FINISHED: {file.filename} - {result.total_rows} rows in "
+            f"{result.elapsed:.2f}s ({result.rows_per_second:.0f} rows/s)"
+        )
         
         # Log upload
-        upload_log = CSVUploadLog(
-            admin_id=admin.id,
-            filename=file.filename,
-            uploaded_records=success_count,
-            success=len(error_messages) == 0,
-            error_message="; ".join(error_messages) if error_messages else None
-        )
-        db.add(upload_log)
-        db.commit()
-        upload_log_id = upload_log.id
+        upload_log_id = finish_upload_log(db, upload_log, result).id
         
         return {
             "filename": file.filename,
@@ -359,15 +326,38 @@ async def upload_csv(
         
     except Exception as e:
         db.rollback()
+        fail_upload_log(db, upload_log, str(e))
         return {
             "filename": file.filename,
             "error": str(e),
             "status": "failed"
         }
 
+@router.get("/csv-upload/jobs")
+def list_upload_jobs(
+    admin: AdminPrincipal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """List this admin's background CSV upload jobs (most recent first)"""
+    return {
+        "jobs": [job_to_dict(job) for job in upload_jobs.list_for_admin(db, admin.id)]
+    }
+
+@router.get("/csv-upload/jobs/{job_id}")
+def get_upload_job(
+    job_id: str,
+    admin: AdminPrincipal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Progress of a background CSV upload: rows processed, rows/s, errors and ETA"""
+    job = upload_jobs.get(db, job_id)
+    if not job or job.admin_id != admin.id:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return job_to_dict(job)
+
 @router.get("/upload-history")
-async def get_upload_history(
-    admin: Admin = Depends(get_current_admin),
+def get_upload_history(
+    admin: AdminPrincipal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Get CSV upload history"""
@@ -388,21 +378,23 @@ async def get_upload_history(
     }
 
 @router.delete("/delete-last-upload")
-async def delete_last_upload(
+def delete_last_upload(
     batch_year: Optional[str] = None,
-    admin: Admin = Depends(get_current_admin),
+    admin: AdminPrincipal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """
     Delete the last uploaded batch data (students and marks from most recent upload)
     Returns the count of deleted records
     
+    Without batch_year, removes the students and marks created by this admin's
+    latest upload (tracked through their upload_id) together with its log.
+    
     Query Parameters:
         batch_year (optional): Filter by specific batch year (e.g., "2025" or "2023")
                              If not provided, deletes from the latest upload regardless of batch
     """
     try:
-        # If batch_year is provided, delete all students from that batch
         if batch_year:
             # Find the batch
             batch = db.query(Batch).filter(Batch.batch_year == batch_year).first()
@@ -414,13 +406,48 @@ async def delete_last_upload(
                     "deleted_marks": 0
                 }
             
-            # Get all students in this batch
-            students_to_delete = db.query(Student).filter(Student.batch_id == batch.id).all()
+            batch_students = select(Student.id).where(Student.batch_id == batch.id)
+            upload_ids = select(Student.upload_id).where(
+                Student.batch_id == batch.id,
+                Student.upload_id.isnot(None)
+            ).distinct().scalar_subquery()
+            touched_uploads = [
+                row[0] for row in db.execute(
+                    select(CSVUploadLog.id).where(
+                        CSVUploadLog.admin_id == admin.id,
+                        CSVUploadLog.id.in_(upload_ids)
+                    )
+                ).all()
+            ]
+            
+            # Set-based deletes: aggregates and marks first (foreign keys), then the students
+            mark_batches_changed(db, [batch.id])
+            db.execute(
+                delete(StudentAggregate).where(StudentAggregate.student_id.in_(batch_students))
+            )
+            deleted_marks = db.execute(
+                delete(Mark).where(Mark.student_id.in_(batch_students))
+            ).rowcount
+            invalidate_principals_after_commit(db, STUDENT)
+            deleted_students = db.execute(
+                delete(Student).where(Student.batch_id == batch.id)
+            ).rowcount
+            
+            # Drop this admin's upload logs that no longer own any rows; logs
+            # shared with other batches are kept (deleting them would cascade)
+            if touched_uploads:
+                db.execute(
+                    delete(CSVUploadLog).where(
+                        CSVUploadLog.id.in_(touched_uploads),
+                        ~exists().where(Student.upload_id == CSVUploadLog.id),
+                        ~exists().where(Mark.upload_id == CSVUploadLog.id)
+                    )
+                )
         else:
             # Get the most recent upload for this admin
             latest_upload = db.query(CSVUploadLog).filter(
                 CSVUploadLog.admin_id == admin.id
-            ).order_by(CSVUploadLog.created_at.desc()).first()
+            ).order_by(CSVUploadLog.created_at.desc(), CSVUploadLog.id.desc()).first()
             
             if not latest_upload:
                 return {
@@ -430,41 +457,33 @@ async def delete_last_upload(
                     "deleted_marks": 0
                 }
             
-            upload_time = latest_upload.created_at
-            filename = latest_upload.filename
+            upload_id = latest_upload.id
             
-            # Find all students created after this upload time
-            students_to_delete = db.query(Student).filter(
-                Student.created_at >= upload_time
+            # Students kept by the undo whose marks change need fresh aggregates
+            affected_students = db.scalars(
+                select(Mark.student_id).where(Mark.upload_id == upload_id).distinct()
             ).all()
-        
-        deleted_marks = 0
-        deleted_students = 0
-        
-        # Delete marks for these students first (foreign key constraint)
-        for student in students_to_delete:
-            marks = db.query(Mark).filter(Mark.student_id == student.id).all()
-            for mark in marks:
-                db.delete(mark)
-                deleted_marks += 1
+            mark_batches_changed(db, db.scalars(
+                select(Student.batch_id).where(Student.upload_id == upload_id).distinct()
+            ).all())
             
-            # Delete the student
-            db.delete(student)
-            deleted_students += 1
-        
-        # Delete upload logs for this batch if batch_year was provided
-        if batch_year and deleted_students > 0:
-            db.query(CSVUploadLog).filter(
-                CSVUploadLog.admin_id == admin.id,
-                CSVUploadLog.filename.contains(batch_year) | CSVUploadLog.filename.contains('students')
-            ).delete()
-        elif not batch_year and deleted_students > 0:
-            # Delete only the latest upload log if no batch_year specified
-            latest_upload = db.query(CSVUploadLog).filter(
-                CSVUploadLog.admin_id == admin.id
-            ).order_by(CSVUploadLog.created_at.desc()).first()
-            if latest_upload:
-                db.delete(latest_upload)
+            # Every row created by the upload carries its id, so the undo is a
+            # handful of indexed deletes. The foreign keys also cascade, but the
+            # explicit statements give exact counts and work on older databases.
+            deleted_marks = db.execute(
+                delete(Mark).where(Mark.upload_id == upload_id)
+            ).rowcount
+            deleted_marks += db.execute(
+                delete(Mark).where(Mark.student_id.in_(
+                    select(Student.id).where(Student.upload_id == upload_id)
+                ))
+            ).rowcount
+            invalidate_principals_after_commit(db, STUDENT)
+            deleted_students = db.execute(
+                delete(Student).where(Student.upload_id == upload_id)
+            ).rowcount
+            db.execute(delete(CSVUploadLog).where(CSVUploadLog.id == upload_id))
+            refresh_student_aggregates(db, affected_students)
         
         db.commit()
         
@@ -488,40 +507,52 @@ async def delete_last_upload(
 # MARKS EDIT ENDPOINTS (Dashboard Edit Feature)
 # ==========================================
 
-@router.get("/students/{student_id}/marks")
-async def get_student_marks_for_edit(
+@router.get("/students/{student_id}/marks", response_class=ORJSONResponse)
+def get_student_marks_for_edit(
     student_id: int,
     db: Session = Depends(get_db)
 ):
     """Get all marks for a student (for editing dashboard)"""
     try:
-        student = db.query(Student).filter(Student.id == student_id).first()
+        student = db.execute(
+            select(Student.id, Student.register_no, Student.name, Student.email, Batch.batch_year)
+            .outerjoin(Batch, Batch.id == Student.batch_id)
+            .where(Student.id == student_id)
+        ).first()
         if not student:
             raise HTTPException(status_code=404, detail="Student not found")
         
-        marks = db.query(Mark).filter(Mark.student_id == student_id).all()
+        marks = db.execute(
+            select(*EDIT_MARK_COLUMNS)
+            .outerjoin(Subject, Subject.id == Mark.subject_id)
+            .outerjoin(Semester, Semester.id == Mark.semester_id)
+            .where(Mark.student_id == student_id)
+            .order_by(Mark.id)
+        ).all()
         
-        return {
+        return ORJSONResponse({
             "student_id": student.id,
             "register_no": student.register_no,
             "name": student.name,
             "email": student.email,
-            "batch_year": student.batch.batch_year if student.batch else None,
+            "batch_year": student.batch_year,
             "marks": [
                 {
-                    "mark_id": m.id,
-                    "subject_id": m.subject_id,
-                    "subject_name": m.subject.name if m.subject else "Unknown",
-                    "semester": m.semester.semester_number if m.semester else 1,
-                    "ca1": float(m.ca1) if m.ca1 else None,
-                    "ca2": float(m.ca2) if m.ca2 else None,
-                    "ca3": float(m.ca3) if m.ca3 else None,
-                    "semester_marks": float(m.semester_marks) if m.semester_marks else None,
-                    "sem_grade": m.sem_grade if hasattr(m, 'sem_grade') else None
+                    "mark_id": mark_id,
+                    "subject_id": subject_id,
+                    "subject_name": subject_name,
+                    "semester": semester,
+                    "ca1": float(ca1) if ca1 else None,
+                    "ca2": float(ca2) if ca2 else None,
+                    "ca3": float(ca3) if ca3 else None,
+                    "semester_marks": float(semester_marks) if semester_marks else None,
+                    "sem_grade": sem_grade
                 }
-                for m in marks
+                for mark_id, subject_id, subject_name, semester, ca1, ca2, ca3, semester_marks, sem_grade in marks
             ]
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         print(f"Error in get_student_marks_for_edit: {str(e)}")
@@ -529,10 +560,10 @@ async def get_student_marks_for_edit(
         raise HTTPException(status_code=500, detail=f"Error fetching marks: {str(e)}")
 
 @router.put("/marks/{mark_id}")
-async def update_mark(
+def update_mark(
     mark_id: int,
     mark_data: MarkUpdate,
-    admin: Admin = Depends(get_current_admin),
+    admin: AdminPrincipal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Update individual mark (Dashboard edit feature)
@@ -558,11 +589,14 @@ async def update_mark(
         mark.ca3 = mark_data.ca3
     if mark_data.semester is not None:
         mark.semester_marks = mark_data.semester
+        mark.sem_grade = None  # An entered grade no longer matches the new marks
     
     # FIX: Set sem_published flag when semester marks exist
     mark.sem_published = mark.semester_marks is not None and mark.semester_marks > 0
     
     try:
+        db.flush()
+        refresh_student_aggregates(db, [mark.student_id])
         db.commit()
         db.refresh(mark)
         return {
@@ -577,56 +611,290 @@ async def update_mark(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error updating mark: {str(e)}")
 
-@router.get("/all-students")
-async def get_all_students(
-    batch_year: Optional[str] = None,
+@router.patch("/marks", response_model=MarkGridSaveResponse)
+def save_marks_grid(
+    payload: MarkGridSave,
+    admin: AdminPrincipal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """Get all students (with optional batch filter) - for edit dashboard"""
-    query = db.query(Student)
+    """Save the edited rows of the marks grid in one request and one transaction
     
-    if batch_year:
-        query = query.join(Batch).filter(Batch.batch_year == batch_year)
+    Request body (same fields as PUT /marks/{mark_id}, plus the mark id):
+    {
+      "marks": [
+        {"id": 12, "ca1": 54, "semester": 78},
+        {"id": 13, "ca3": 40}
+      ]
+    }
     
-    students = query.order_by(Student.register_no).all()
+    Rows whose mark does not exist (or repeat within the request) are reported
+    as errors; every other row is applied. Results come back in request order.
+    """
+    mark_ids = [row.id for row in payload.marks]
+    current = {}
+    for chunk in chunked(set(mark_ids)):
+        current.update((row.id, row) for row in db.execute(
+            select(Mark.id, Mark.student_id, Mark.ca1, Mark.ca2, Mark.ca3, Mark.semester_marks, Mark.sem_grade)
+            .where(Mark.id.in_(chunk))
+        ))
+    
+    now = datetime.utcnow()
+    results, mappings, student_ids, seen = [], [], set(), set()
+    for row in payload.marks:
+        if row.id not in current:
+            results.append({"mark_id": row.id, "status": "error", "error": "Mark not found"})
+            continue
+        if row.id in seen:
+            results.append({"mark_id": row.id, "status": "error", "error": "Mark repeated in request"})
+            continue
+        seen.add(row.id)
+        mark = current[row.id]
+        # Same rules as update_mark: omitted (None) fields keep their value
+        ca1 = mark.ca1 if row.ca1 is None else row.ca1
+        ca2 = mark.ca2 if row.ca2 is None else row.ca2
+        ca3 = mark.ca3 if row.ca3 is None else row.ca3
+        semester_marks = mark.semester_marks if row.semester is None else row.semester
+        # An entered grade no longer matches new semester marks
+        sem_grade = mark.sem_grade if row.semester is None else None
+        # Bulk mappings skip the Mark hooks, so the derived columns are set here
+        derived = computed_mark_values(ca1, ca2, ca3, semester_marks)
+        mappings.append({
+            "id": row.id,
+            "ca1": ca1,
+            "ca2": ca2,
+            "ca3": ca3,
+            "semester_marks": semester_marks,
+            "sem_grade": sem_grade,
+            "sem_published": semester_marks is not None and semester_marks > 0,
+            **derived,
+            "updated_at": now,
+        })
+        student_ids.add(mark.student_id)
+        results.append({
+            "mark_id": row.id, "status": "updated", "ca1": ca1, "ca2": ca2, "ca3": ca3,
+            "semester_marks": semester_marks, "sem_grade": sem_grade or derived["computed_grade"],
+            "computed_grade": derived["computed_grade"],
+            "is_passed": derived["is_passed"]
+        })
+    
+    if mappings:
+        try:
+            db.bulk_update_mappings(Mark, mappings)
+            refresh_student_aggregates(db, student_ids)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"Error saving marks: {str(e)}")
     
+    logger = __import__('logging').getLogger(__name__)
+    logger.info(f"✏️ Marks grid saved by admin {admin.id}: {len(mappings)} updated, {len(results) - len(mappings)} failed")
     return {
-        "total": len(students),
-        "students": [
-            {
-                "student_id": s.id,
-                "register_no": s.register_no,
-                "name": s.name,
-                "email": s.email,
-                "batch_year": s.batch.batch_year if s.batch else None,
-                "total_subjects": len(s.marks) if s.marks else 0
-            }
-            for s in students
-        ]
+        "requested": len(payload.marks),
+        "updated": len(mappings),
+        "failed": len(results) - len(mappings),
+        "results": results,
+    }
+
+# Columns that /all-students and /batches can project with ?fields=
+STUDENT_LIST_FIELDS = ("student_id", "register_no", "name", "email", "batch_year", "total_subjects")
+BATCH_LIST_FIELDS = ("id", "batch_year", "total_students")
+
+def _parse_fields(fields: Optional[str], allowed: tuple) -> tuple:
+    """Validate a comma-separated ?fields= list; all fields when omitted"""
+    if not fields:
+        return allowed
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in allowed]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown) or '(none given)'}. Allowed: {', '.join(allowed)}"
+        )
+    return requested
+
+@router.get("/all-students", response_class=ORJSONResponse)
+def get_all_students(
+    batch_year: Optional[str] = None,
+    after_register_no: Optional[str] = Query(None, description="Keyset cursor: return students after this register number"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Page size (all students when omitted)"),
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(STUDENT_LIST_FIELDS)}"),
+    db: Session = Depends(get_db)
+):
+    """Get all students (with optional batch filter) - for edit dashboard
+    
+    Mark counts come from one GROUP BY subquery joined to the listing.
+    Pages are ordered by register number; pass the returned
+    `next_after_register_no` to fetch the next page.
+    """
+    selected = _parse_fields(fields, STUDENT_LIST_FIELDS)
+    
+    mark_counts = (
+        select(Mark.student_id, func.count().label("total_subjects"))
+        .group_by(Mark.student_id)
+        .subquery()
+    )
+    columns = {
+        "student_id": Student.id,
+        "register_no": Student.register_no,
+        "name": Student.name,
+        "email": Student.email,
+        "batch_year": Batch.batch_year,
+        "total_subjects": func.coalesce(mark_counts.c.total_subjects, 0),
     }
+    # Columns in `selected` order so rows zip straight into dicts; the
+    # register number trails as the page cursor when not requested
+    query = select(*(columns[f].label(f) for f in selected))
+    if "register_no" not in selected:
+        query = query.add_columns(Student.register_no.label("register_no"))
+    query = query.select_from(Student)
+    
+    if "batch_year" in selected or batch_year:
+        query = query.outerjoin(Batch, Batch.id == Student.batch_id)
+    if "total_subjects" in selected:
+        query = query.outerjoin(mark_counts, mark_counts.c.student_id == Student.id)
+    
+    if batch_year:
+        query = query.where(Batch.batch_year == batch_year)
+    filtered = query
+    if after_register_no is not None:
+        query = query.where(Student.register_no > after_register_no)
+    query = query.order_by(Student.register_no)
+    if limit:
+        # One extra row tells whether another page follows
+        query = query.limit(limit + 1)
+    
+    rows = db.execute(query).all()
+    has_more = bool(limit) and len(rows) > limit
+    rows = rows[:limit] if limit else rows
+    
+    if limit or after_register_no is not None:
+        total = db.scalar(select(func.count()).select_from(filtered.subquery()))
+    else:
+        total = len(rows)
+    
+    return ORJSONResponse({
+        "total": total,
+        "students": rows_as_dicts(selected, rows),
+        "next_after_register_no": rows[-1].register_no if has_more else None
+    })
 
 @router.get("/batches")
-async def get_all_batches(
+def get_all_batches(
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(BATCH_LIST_FIELDS)}"),
     db: Session = Depends(get_db)
 ):
-    """Get all batches for filtering"""
-    batches = db.query(Batch).order_by(Batch.batch_year.desc()).all()
+    """Get all batches for filtering (student counts from one GROUP BY subquery)"""
+    selected = _parse_fields(fields, BATCH_LIST_FIELDS)
+    
+    student_counts = (
+        select(Student.batch_id, func.count().label("total_students"))
+        .group_by(Student.batch_id)
+        .subquery()
+    )
+    columns = {
+        "id": Batch.id,
+        "batch_year": Batch.batch_year,
+        "total_students": func.coalesce(student_counts.c.total_students, 0),
+    }
+    query = select(*(columns[f].label(f) for f in selected)).select_from(Batch)
+    if "total_students" in selected:
+        query = query.outerjoin(student_counts, student_counts.c.batch_id == Batch.id)
+    rows = db.execute(query.order_by(Batch.batch_year.desc())).all()
     
     return {
-        "batches": [
-            {
-                "id": b.id,
-                "batch_year": b.batch_year,
-                "total_students": len(b.students) if b.students else 0
-            }
-            for b in batches
-        ]
+        "batches": [dict(row._mapping) for row in rows]
     }
 
+@router.get("/export/batch/{batch_id}")
+def export_batch_marks(
+    batch_id: int,
+    semester: Optional[int] = Query(None, ge=1, description="Semester number; all semesters when omitted"),
+    format: str = Query(export.CSV, pattern=f"^({export.CSV}|{export.NDJSON}|{export.PARQUET})$"),
+    admin: AdminPrincipal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream every mark of a batch (or one of its semesters) as CSV, NDJSON or Parquet
+    
+    CSV files use the upload columns, so an export can be re-uploaded through
+    /csv-upload. SEM_Grade holds only grades that were entered; the trailing
+    Grade column (entered or computed) is ignored on upload. Rows are fetched and sent in chunks of EXPORT_CHUNK_ROWS, so
+    memory stays flat however large the batch is.
+    """
+    batch = db.get(Batch, batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if semester is not None and not db.scalar(
+        select(exists().where(Semester.batch_id == batch_id, Semester.semester_number == semester))
+    ):
+        raise HTTPException(status_code=404, detail="Semester not found")
+    if format == export.PARQUET and not export.parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires the pyarrow package")
+    
+    filename = f"batch_{batch.batch_year}" + (f"_sem{semester}" if semester else "") + f".{format}"
+    return StreamingResponse(
+        export.stream_export(format, batch_id, semester, settings.EXPORT_CHUNK_ROWS),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/batches/{batch_id}/semesters/{semester_number}/publish", response_model=SemesterPublishResponse)
+def publish_semester(
+    batch_id: int,
+    semester_number: int,
+    payload: SemesterPublish,
+    admin: AdminPrincipal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Publish the semester results of a batch in one transaction
+    
+    Request body (semester marks 0-100, or a grade stored as its midpoint):
+    {
+      "results": {
+        "REG001": {"Mathematics": 78, "Physics": "A+"}
+      }
+    }
+    
+    Every entry must match an existing mark of the semester; otherwise nothing
+    is written and the mismatches are returned.
+    """
+    semester = db.scalar(
+        select(Semester).where(Semester.batch_id == batch_id, Semester.semester_number == semester_number)
+    )
+    if not semester:
+        raise HTTPException(status_code=404, detail="Semester not found for this batch")
+    
+    try:
+        result = publish_semester_results(db, semester, payload.results)
+        if result.errors:
+            db.rollback()
+            raise HTTPException(status_code=400, detail={
+                "message": f"{len(result.errors)} results could not be published; nothing was written",
+                "errors": result.errors[:50]
+            })
+        db.commit()
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error publishing results: {str(e)}")
+    
+    logger = __import__('logging').getLogger(__name__)
+    logger.info(f"📢 Semester {semester_number} of batch {batch_id} published by admin {admin.id}: {result.updated} results")
+    return SemesterPublishResponse(
+        batch_id=batch_id,
+        semester=semester_number,
+        students=result.students,
+        updated=result.updated,
+        published=result.published,
+        elapsed_ms=round(result.elapsed_ms, 1)
+    )
+
 @router.delete("/marks/{mark_id}")
-async def delete_mark(
+def delete_mark(
     mark_id: int,
-    admin: Admin = Depends(get_current_admin),
+    admin: AdminPrincipal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Delete a specific mark - Used for batch-wide subject deletion"""
@@ -636,6 +904,8 @@ async def delete_mark(
     
     try:
         db.delete(mark)
+        db.flush()
+        refresh_student_aggregates(db, [mark.student_id])
         db.commit()
         return {
             "message": "Mark deleted successfully",
@@ -646,3 +916,27 @@ async def delete_mark(
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting mark: {str(e)}")
+
+@router.get("/metrics/queries")
+def get_query_metrics(
+    reset: bool = Query(False, description="Clear the counters after reading them"),
+    admin: AdminPrincipal = Depends(get_current_admin)
+):
+    """SQL statements per route: average/max count, DB time and slowest statement"""
+    routes = route_metrics.snapshot()
+    if reset:
+        route_metrics.reset()
+    return {
+        "enabled": settings.QUERY_METRICS_ENABLED,
+        "routes": routes
+    }
+
+@router.get("/metrics/auth-cache")
+def get_auth_cache_metrics(
+    admin: AdminPrincipal = Depends(get_current_admin)
+):
+    """Hits, misses and size of the authenticated-principal and Firebase token caches"""
+    return {
+        "principals": principal_cache.stats(),
+        "firebase": firebase_verifier.stats() if firebase_verifier is not None else None
+    }
@@ -1,32 +1,59 @@
 """
 Authentication routes - Student and Admin login
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.rate_limit import LoginAttemptLimiter
+from app.db.database import get_async_db
+from app.db.models import Admin
 from app.schemas.schemas import StudentLogin, TokenResponse, GoogleAuthRequest
-from app.services.auth_service import authenticate_student, create_student_token, create_admin_token, verify_google_token
+from app.services.auth_service import authenticate_student_async, create_student_token, create_admin_token, verify_google_token
 from datetime import datetime
+import math
 
 router = APIRouter(prefix="/api/v1/auth", tags=["Authentication"])
 
+register_no_limiter = LoginAttemptLimiter(settings.LOGIN_MAX_FAILED_ATTEMPTS, settings.LOGIN_FAILURE_WINDOW_SECONDS)
+client_limiter = LoginAttemptLimiter(settings.LOGIN_MAX_FAILED_PER_CLIENT, settings.LOGIN_FAILURE_WINDOW_SECONDS)
+
 @router.post("/student/login", response_model=TokenResponse)
-async def student_login(credentials: StudentLogin, db: Session = Depends(get_db)):
+async def student_login(credentials: StudentLogin, request: Request, db: AsyncSession = Depends(get_async_db)):
     """
-    Student login with register number and date of birth
+    Student login with register number and date of birth (or password)
     
     Returns JWT token for authenticated student
     
     Request body:
         - register_no: Student register number (e.g., "CS2024001")
         - date_of_birth: Date of birth in DD-MM-YYYY format (e.g., "15-03-2005")
+        - password: Instead of date_of_birth, for accounts created with a
+          password (these accept only the password); verified in the bcrypt
+          worker pool
     """
-    student = authenticate_student(db, credentials.register_no, credentials.date_of_birth)
+    # Too many recent failures for this register number or client: answer without touching the database
+    client = request.client.host if request.client else None
+    retry_after = client_limiter.retry_after([client]) or register_no_limiter.begin_attempt(credentials.register_no)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts, try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+    
+    student = await authenticate_student_async(
+        db, credentials.register_no, credentials.date_of_birth, credentials.password
+    )
     if not student:
+        client_limiter.record_failure([client])
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid register number or date of birth"
+            detail="Invalid register number or password" if credentials.password is not None
+            else "Invalid register number or date of birth"
         )
+    register_no_limiter.reset([credentials.register_no])
     
     if not student.is_active:
         raise HTTPException(
@@ -49,14 +76,14 @@ async def health_check():
     return {"status": "healthy", "service": "auth"}
 
 @router.post("/admin/google-login", response_model=TokenResponse)
-async def admin_google_login(request: GoogleAuthRequest, db: Session = Depends(get_db)):
+async def admin_google_login(request: GoogleAuthRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Admin login with Google OAuth (Firebase)
     
     Returns JWT token for authenticated admin
     """
-    # Verify Firebase ID token
-    firebase_user = verify_google_token(request.id_token)
+    # Verify Firebase ID token (may fetch Google's keys, so keep it off the event loop)
+    firebase_user = await run_in_threadpool(verify_google_token, request.id_token)
     if not firebase_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -75,8 +102,7 @@ async def admin_google_login(request: GoogleAuthRequest, db: Session = Depends(g
         )
     
     # Check if admin exists
-    from app.db.models import Admin
-    admin = db.query(Admin).filter(Admin.email == email).first()
+    admin = await db.scalar(select(Admin).where(Admin.email == email))
     
     if not admin:
         # Create new admin with Google account
@@ -89,14 +115,14 @@ async def admin_google_login(request: GoogleAuthRequest, db: Session = Depends(g
             last_login=datetime.utcnow()
         )
         db.add(admin)
-        db.commit()
-        db.refresh(admin)
+        await db.commit()
+        await db.refresh(admin)
     else:
         # Update existing admin
         if not admin.firebase_uid:
             admin.firebase_uid = firebase_uid
         admin.last_login = datetime.utcnow()
-        db.commit()
+        await db.commit()
     
     if not admin.is_active:
         raise HTTPException(
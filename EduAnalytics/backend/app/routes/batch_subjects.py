@@ -8,91 +8,36 @@ Batch-Semester Subject Management Routes
 - Get all available subjects
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from datetime import datetime
 
-from app.db.models import Batch, Semester, Subject, BatchSubject, Admin
+from app.db.models import Batch, Semester, Subject, BatchSubject
 from app.db.database import get_db
-from app.core.security import decode_token
+from app.core.auth import AdminPrincipal, get_current_admin
+from app.services.aggregates import bump_subject_marks_versions
+from app.services.curriculum import assign_subjects, curriculum_cache, get_curriculum_tree, resolve_semesters
 from app.schemas.batch_subject import (
     BatchSubjectCreate,
     BatchSubjectResponse,
+    BulkSubjectAssignment,
+    BulkSubjectAssignmentResponse,
     BatchWithSemestersResponse,
     SubjectResponse,
     SubjectEditRequest
 )
 
-def get_current_admin(authorization: str = Header(None), db: Session = Depends(get_db)):
-    """Get current logged-in admin from token"""
-    if not authorization:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing authorization header"
-        )
-    
-    try:
-        token = authorization.replace("Bearer ", "")
-        payload = decode_token(token)
-        if not payload or payload.get("role") != "admin":
-            raise HTTPException(status_code=401, detail="Invalid token")
-        admin_id = int(payload.get("sub"))
-    except:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials"
-        )
-    
-    admin = db.query(Admin).filter(Admin.id == admin_id).first()
-    if not admin:
-        raise HTTPException(status_code=401, detail="Admin not found")
-    return admin
-
 router = APIRouter(prefix="/api/v1/admin/batch-subjects", tags=["Admin - Batch Subjects"])
 
 
 @router.get("/batches", response_model=List[BatchWithSemestersResponse])
 def get_all_batches_with_semesters(
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    current_admin: AdminPrincipal = Depends(get_current_admin)
 ):
-    """Get all batches with their semesters and subjects"""
-    batches = db.query(Batch).all()
-    
-    result = []
-    for batch in batches:
-        semesters_data = []
-        for sem in batch.semesters:
-            subjects = [
-                {
-                    "id": bs.subject.id,
-                    "name": bs.subject.name,
-                    "code": bs.subject.code,
-                    "batch_subject_id": bs.id
-                }
-                for bs in db.query(BatchSubject).filter(
-                    BatchSubject.batch_id == batch.id,
-                    BatchSubject.semester_id == sem.id
-                ).all()
-            ]
-            semesters_data.append({
-                "id": sem.id,
-                "semester_number": sem.semester_number,
-                "academic_year": sem.academic_year,
-                "subjects": subjects
-            })
-        
-        batch_data = {
-            "id": batch.id,
-            "batch_year": batch.batch_year,
-            "semesters": semesters_data,
-            "created_at": batch.created_at,
-            "updated_at": batch.updated_at
-        }
-        result.append(batch_data)
-    
-    return result
+    """Get all batches with their semesters and subjects (one query, cached until the next curriculum write)"""
+    return get_curriculum_tree(db)
 
 
 @router.get("/batch/{batch_id}/semester/{semester_id}")
@@ -100,7 +45,7 @@ def get_batch_semester_subjects(
     batch_id: int,
     semester_id: int,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    current_admin: AdminPrincipal = Depends(get_current_admin)
 ):
     """Get specific batch-semester with all its subjects"""
     batch = db.query(Batch).filter(Batch.id == batch_id).first()
@@ -121,7 +66,7 @@ def get_batch_semester_subjects(
             "code": bs.subject.code,
             "batch_subject_id": bs.id
         }
-        for bs in db.query(BatchSubject).filter(
+        for bs in db.query(BatchSubject).options(joinedload(BatchSubject.subject)).filter(
             BatchSubject.batch_id == batch_id,
             BatchSubject.semester_id == semester_id
         ).all()
@@ -141,7 +86,7 @@ def get_batch_semester_subjects(
 @router.get("/subjects/available", response_model=List[SubjectResponse])
 def get_all_subjects(
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    current_admin: AdminPrincipal = Depends(get_current_admin)
 ):
     """Get all available subjects in the system"""
     subjects = db.query(Subject).all()
@@ -161,7 +106,7 @@ def add_subject_to_batch_semester(
     semester_id: int = Query(None),
     subject_id: int = Query(...),
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    current_admin: AdminPrincipal = Depends(get_current_admin)
 ):
     """Add a subject to a batch (and all its semesters if no specific semester given)"""
     # Verify batch exists
@@ -225,6 +170,7 @@ def add_subject_to_batch_semester(
                 added_count += 1
     
     db.commit()
+    curriculum_cache.bump()
     
     return {
         "success": True,
@@ -234,11 +180,72 @@ def add_subject_to_batch_semester(
     }
 
 
+@router.post("/bulk-assign", response_model=BulkSubjectAssignmentResponse)
+def bulk_assign_subjects(
+    request: BulkSubjectAssignment,
+    db: Session = Depends(get_db),
+    current_admin: AdminPrincipal = Depends(get_current_admin)
+):
+    """Assign subjects to many batch-semesters in one round trip
+    
+    Every combination of batch_ids × semester_numbers × subject_ids is
+    inserted with a single INSERT ... ON CONFLICT DO NOTHING; mappings that
+    already exist are counted as skipped. Missing semesters are created
+    (academic year derived from the batch year) unless
+    create_missing_semesters is false, in which case they are reported.
+    """
+    batch_ids = list(dict.fromkeys(request.batch_ids))
+    semester_numbers = list(dict.fromkeys(request.semester_numbers))
+    subject_ids = list(dict.fromkeys(request.subject_ids))
+    
+    batch_years = dict(db.query(Batch.id, Batch.batch_year).filter(Batch.id.in_(batch_ids)).all())
+    missing_batches = [b for b in batch_ids if b not in batch_years]
+    if missing_batches:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Batches not found: {missing_batches}")
+    
+    found_subjects = {s for (s,) in db.query(Subject.id).filter(Subject.id.in_(subject_ids)).all()}
+    missing_subjects = [s for s in subject_ids if s not in found_subjects]
+    if missing_subjects:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Subjects not found: {missing_subjects}")
+    
+    wanted = {(b, n): batch_years[b] for b in batch_ids for n in semester_numbers}
+    semester_ids = {
+        (batch_id, number): sem_id
+        for sem_id, batch_id, number in db.query(Semester.id, Semester.batch_id, Semester.semester_number).filter(
+            Semester.batch_id.in_(batch_ids),
+            Semester.semester_number.in_(semester_numbers)
+        ).all()
+    }
+    semesters_created = 0
+    missing = {key: year for key, year in wanted.items() if key not in semester_ids}
+    if missing and request.create_missing_semesters:
+        created = resolve_semesters(db, missing)
+        semester_ids.update(created)
+        semesters_created = len(created)
+    missing_semesters = [
+        {"batch_id": b, "semester_number": n} for (b, n) in wanted if (b, n) not in semester_ids
+    ]
+    
+    targets = [(b, semester_ids[(b, n)]) for (b, n) in wanted if (b, n) in semester_ids]
+    inserted = assign_subjects(db, targets, subject_ids)
+    db.commit()
+    
+    requested = len(targets) * len(subject_ids)
+    return {
+        "success": True,
+        "requested": requested,
+        "inserted": inserted,
+        "skipped": requested - inserted,
+        "semesters_created": semesters_created,
+        "missing_semesters": missing_semesters
+    }
+
+
 @router.delete("/remove-subject/{batch_subject_id}", response_model=dict)
 def remove_subject_from_batch_semester(
     batch_subject_id: int,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    current_admin: AdminPrincipal = Depends(get_current_admin)
 ):
     """Remove a subject from a batch-semester"""
     batch_subject = db.query(BatchSubject).filter(
@@ -254,6 +261,7 @@ def remove_subject_from_batch_semester(
     
     db.delete(batch_subject)
     db.commit()
+    curriculum_cache.bump()
     
     return {
         "success": True,
@@ -266,7 +274,7 @@ def create_new_subject(
     subject_name: str = Query(...),
     subject_code: str = Query(...),
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    current_admin: AdminPrincipal = Depends(get_current_admin)
 ):
     """Create a new subject in the system"""
     # Check if subject already exists
@@ -284,6 +292,7 @@ def create_new_subject(
     
     db.add(new_subject)
     db.commit()
+    curriculum_cache.bump()
     db.refresh(new_subject)
     
     return {
@@ -298,7 +307,7 @@ def update_subject(
     subject_id: int,
     request: SubjectEditRequest,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    current_admin: AdminPrincipal = Depends(get_current_admin)
 ):
     """Edit/Rename a subject"""
     subject = db.query(Subject).filter(Subject.id == subject_id).first()
@@ -319,11 +328,15 @@ def update_subject(
     
     # Update fields
     if request.name:
+        if request.name != subject.name:
+            # Students see subject names in their marks; invalidate those responses
+            bump_subject_marks_versions(db, subject.id)
         subject.name = request.name
     if request.code:
         subject.code = request.code
     
     db.commit()
+    curriculum_cache.bump()
     db.refresh(subject)
     
     return {
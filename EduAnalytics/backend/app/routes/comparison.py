@@ -2,15 +2,18 @@
 Comparison routes - Compare students and batches
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.db.models import Student, Mark, Admin
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
+from app.db.models import Batch, Student, Mark, Admin, Semester, Subject
 from app.core.security import decode_token
+from app.services import analytics
+from app.services.aggregates import get_student_totals
 from typing import Optional
 
 router = APIRouter(prefix="/api/v1/compare", tags=["Comparisons"])
 
-def get_current_user(authorization: Optional[str] = None, db: Session = Depends(get_db)):
+def get_current_user(authorization: Optional[str] = None):
     """Get current logged-in user from token"""
     if not authorization:
         raise HTTPException(
@@ -35,34 +38,29 @@ async def compare_students(
     student1_id: int,
     student2_id: int,
     user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Compare two students' performance"""
-    student1 = db.query(Student).filter(Student.id == student1_id).first()
-    student2 = db.query(Student).filter(Student.id == student2_id).first()
+    student1 = await db.get(Student, student1_id)
+    student2 = await db.get(Student, student2_id)
     
     if not student1 or not student2:
         raise HTTPException(status_code=404, detail="One or both students not found")
     
-    marks1 = db.query(Mark).filter(Mark.student_id == student1_id).all()
-    marks2 = db.query(Mark).filter(Mark.student_id == student2_id).all()
-    
-    def calculate_stats(marks):
-        if not marks:
+    async def calculate_stats(student_id):
+        totals = await db.run_sync(get_student_totals, student_id)
+        if not totals:
             return {"avg_ca": 0, "avg_sem": 0, "passed": 0, "total": 0}
         
-        ca_values = [m.ca_average for m in marks if m.ca_average]
-        sem_values = [m.semester for m in marks if m.semester]
-        
         return {
-            "avg_ca": sum(ca_values) / len(ca_values) if ca_values else 0,
-            "avg_sem": sum(sem_values) / len(sem_values) if sem_values else 0,
-            "passed": sum(1 for m in marks if m.is_passed),
-            "total": len(marks)
+            "avg_ca": totals["mean_ca_average"],
+            "avg_sem": totals["sem_avg"],
+            "passed": totals["passed_count"],
+            "total": totals["total_subjects"]
         }
     
-    stats1 = calculate_stats(marks1)
-    stats2 = calculate_stats(marks2)
+    stats1 = await calculate_stats(student1_id)
+    stats2 = await calculate_stats(student2_id)
     
     return {
         "student1": {
@@ -90,48 +88,30 @@ async def compare_batches(
     batch1_id: int,
     batch2_id: int,
     user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Compare two batches' overall performance"""
-    from app.db.models import Batch
-    
-    batch1 = db.query(Batch).filter(Batch.id == batch1_id).first()
-    batch2 = db.query(Batch).filter(Batch.id == batch2_id).first()
+    batch1 = await db.get(Batch, batch1_id)
+    batch2 = await db.get(Batch, batch2_id)
     
     if not batch1 or not batch2:
         raise HTTPException(status_code=404, detail="One or both batches not found")
     
-    def get_batch_stats(batch_id):
-        students = db.query(Student).filter(Student.batch_id == batch_id).all()
-        all_marks = []
-        
-        for student in students:
-            marks = db.query(Mark).filter(Mark.student_id == student.id).all()
-            all_marks.extend(marks)
-        
-        if not all_marks:
-            return {"avg_ca": 0, "avg_sem": 0, "passed": 0, "total": 0, "students": len(students)}
-        
-        # Calculate CA average: (CA1 + CA2 + CA3) / 3
-        ca_values = []
-        for m in all_marks:
-            if m.ca1 and m.ca2 and m.ca3:
-                ca_avg = (m.ca1 + m.ca2 + m.ca3) / 3
-                ca_values.append(ca_avg)
+    async def get_batch_stats(batch_id):
+        student_count = await db.scalar(select(func.count()).select_from(Student).where(Student.batch_id == batch_id))
+        marks = await db.run_sync(analytics.load_marks, batch_id=batch_id)
         
-        sem_values = [m.semester_marks for m in all_marks if m.semester_marks]
-        passed = sum(1 for m in all_marks if m.semester_marks and m.semester_marks >= 40)  # 40 is typically pass mark
+        if not len(marks):
+            return {"avg_ca": 0, "avg_sem": 0, "passed": 0, "total": 0, "students": student_count, "stats": None}
         
         return {
-            "avg_ca": sum(ca_values) / len(ca_values) if ca_values else 0,
-            "avg_sem": sum(sem_values) / len(sem_values) if sem_values else 0,
-            "passed": passed,
-            "total": len(all_marks),
-            "students": len(students)
+            **analytics.legacy_batch_stats(marks),
+            "students": student_count,
+            "stats": analytics.summarize(marks)
         }
     
-    stats1 = get_batch_stats(batch1_id)
-    stats2 = get_batch_stats(batch2_id)
+    stats1 = await get_batch_stats(batch1_id)
+    stats2 = await get_batch_stats(batch2_id)
     
     return {
         "batch1": {
@@ -151,3 +131,75 @@ async def compare_batches(
             "better_batch": "batch1" if stats1["avg_ca"] > stats2["avg_ca"] else "batch2" if stats2["avg_ca"] > stats1["avg_ca"] else "equal"
         }
     }
+
+
+@router.get("/batch-subjects/{batch_id}")
+async def get_batch_subject_stats(
+    batch_id: int,
+    semester_id: Optional[int] = None,
+    user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Per-subject statistics (spread, quartiles, pass rate, grades) for one batch"""
+    batch = await db.get(Batch, batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    marks = await db.run_sync(analytics.load_marks, batch_id=batch_id, semester_id=semester_id)
+    per_subject = analytics.summarize_by(marks, "subject_id")
+    subjects = {
+        s.id: s for s in await db.scalars(select(Subject).where(Subject.id.in_(list(per_subject))))
+    } if per_subject else {}
+    
+    return {
+        "batch_id": batch.id,
+        "batch_year": batch.batch_year,
+        "semester_id": semester_id,
+        "overall": analytics.summarize(marks),
+        "subjects": [
+            {
+                "subject_id": subject_id,
+                "subject_code": subjects[subject_id].code if subject_id in subjects else None,
+                "subject_name": subjects[subject_id].name if subject_id in subjects else None,
+                **stats
+            }
+            for subject_id, stats in per_subject.items()
+        ]
+    }
+
+@router.get("/subject/{subject_id}")
+async def get_subject_stats(
+    subject_id: int,
+    batch_id: Optional[int] = None,
+    user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Statistics for one subject, overall and broken down by batch and semester"""
+    subject = await db.get(Subject, subject_id)
+    if not subject:
+        raise HTTPException(status_code=404, detail="Subject not found")
+    
+    marks = await db.run_sync(analytics.load_marks, batch_id=batch_id, subject_id=subject_id)
+    per_batch = analytics.summarize_by(marks, "batch_id")
+    per_semester = analytics.summarize_by(marks, "semester_id")
+    batch_years = dict((await db.execute(
+        select(Batch.id, Batch.batch_year).where(Batch.id.in_(list(per_batch)))
+    )).all()) if per_batch else {}
+    semester_numbers = dict((await db.execute(
+        select(Semester.id, Semester.semester_number).where(Semester.id.in_(list(per_semester)))
+    )).all()) if per_semester else {}
+    
+    return {
+        "subject_id": subject.id,
+        "subject_code": subject.code,
+        "subject_name": subject.name,
+        "overall": analytics.summarize(marks),
+        "batches": [
+            {"batch_id": key, "batch_year": batch_years.get(key), **stats}
+            for key, stats in per_batch.items()
+        ],
+        "semesters": [
+            {"semester_id": key, "semester_number": semester_numbers.get(key), **stats}
+            for key, stats in per_semester.items()
+        ]
+    }
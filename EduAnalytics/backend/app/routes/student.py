@@ -1,64 +1,94 @@
 """
 Student routes - Dashboard, analytics, marks, etc.
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Header
-from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.db.models import Student, Mark, Batch
-from app.core.security import decode_token
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.db.database import get_async_db
+from app.db.models import Student, Mark, Batch, Subject
+from app.db.read_models import STUDENT_MARK_COLUMNS, STUDENT_MARK_FIELDS, rows_as_dicts
+from app.core.auth import StudentPrincipal, get_current_student
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.etag import REVALIDATE, etag_matches, make_etag, not_modified
 from app.schemas.schemas import StudentDetailResponse, StudentDashboardResponse, ClassPerformanceResponse
+from app.services.aggregates import get_student_standing, get_student_totals
+from app.services.percentile_index import percentile_index
 from typing import Optional
 
 router = APIRouter(prefix="/api/v1/student", tags=["Student"])
 
-def get_current_student(authorization: Optional[str] = Header(None), db: Session = Depends(get_db)):
-    """Get current logged-in student from token"""
-    if not authorization:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing authorization header"
-        )
-    
-    try:
-        token = authorization.replace("Bearer ", "")
-        payload = decode_token(token)
-        if not payload or payload.get("role") != "student":
-            raise HTTPException(status_code=401, detail="Invalid token")
-        student_id = int(payload.get("sub"))
-    except:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials"
-        )
-    
-    student = db.query(Student).filter(Student.id == student_id).first()
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
-    
-    return student
+# Dashboard and marks payloads by ETag; a marks write changes the ETag, so
+# entries never need invalidating and just age out of the LRU
+student_response_cache = TTLCache(
+    "student_responses", settings.STUDENT_RESPONSE_CACHE_SIZE, settings.STUDENT_RESPONSE_CACHE_TTL_SECONDS
+)
+
 
 @router.get("/profile", response_model=StudentDetailResponse)
-async def get_student_profile(student: Student = Depends(get_current_student)):
+async def get_student_profile(
+    student: StudentPrincipal = Depends(get_current_student),
+    db: AsyncSession = Depends(get_async_db)
+):
     """Get current student profile"""
-    return student
+    # Async sessions cannot lazy-load, so fetch the marks up front
+    return await db.scalar(
+        select(Student)
+        .where(Student.id == student.id)
+        .options(selectinload(Student.marks).selectinload(Mark.semester))
+    )
+
+async def _marks_versions(db: AsyncSession, student: StudentPrincipal) -> tuple:
+    """(student marks_version, batch marks_version): one primary-key lookup, no marks scan"""
+    versions = (await db.execute(
+        select(Student.marks_version, Batch.marks_version)
+        .join(Batch, Batch.id == Student.batch_id)
+        .where(Student.id == student.id)
+    )).first()
+    return tuple(versions) if versions else (None, None)
+
+async def _cached_payload(request: Request, etag: str, build):
+    """None when the client already has `etag` (answer 304); else the payload, from the LRU when possible"""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return None
+    payload = student_response_cache.get(etag)
+    if payload is None:
+        payload = await build()
+        student_response_cache.set(etag, payload)
+    return payload
 
 @router.get("/dashboard", response_model=StudentDashboardResponse)
 async def get_dashboard(
-    student: Student = Depends(get_current_student),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    student: StudentPrincipal = Depends(get_current_student),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get student dashboard with marks and performance"""
-    # Get all marks for this student
-    marks = db.query(Mark).filter(Mark.student_id == student.id).all()
-    
+    """Get student dashboard with marks and performance
+    
+    The rank depends on the whole batch, so the ETag covers both the student's
+    and the batch's marks version.
+    """
+    student_version, batch_version = await _marks_versions(db, student)
+    etag = make_etag("dashboard", student.id, student.register_no, student.batch_id, student_version, batch_version)
+    payload = await _cached_payload(request, etag, lambda: _build_dashboard(db, student))
+    if payload is None:
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = REVALIDATE
+    return payload
+
+async def _build_dashboard(db: AsyncSession, student: StudentPrincipal) -> dict:
     # Get batch year
-    batch = db.query(Batch).filter(Batch.id == student.batch_id).first()
+    batch = await db.get(Batch, student.batch_id)
     batch_year = batch.batch_year if batch else "N/A"
     
-    # Check if semester results are published (any mark has sem_published = True)
-    sem_published = any(m.sem_published for m in marks) if marks else False
+    # Rollup of the student's marks plus batch rank, read from student_aggregates
+    standing = await db.run_sync(get_student_standing, student.id, student.batch_id)
     
-    if not marks:
+    if not standing:
         return {
             "student_id": student.id,
             "name": student.name,
@@ -75,50 +105,19 @@ async def get_dashboard(
         }
     
     # Calculate statistics
-    total_subjects = len(marks)
-    subjects_passed = sum(1 for m in marks if m.is_passed)
-    subjects_failed = total_subjects - subjects_passed
-    
-    # Calculate CA averages per component
-    ca1_values = [m.ca1 for m in marks if m.ca1 is not None]
-    ca2_values = [m.ca2 for m in marks if m.ca2 is not None]
-    ca3_values = [m.ca3 for m in marks if m.ca3 is not None]
-    
-    ca1_avg = sum(ca1_values) / len(ca1_values) if ca1_values else 0.0
-    ca2_avg = sum(ca2_values) / len(ca2_values) if ca2_values else 0.0
-    ca3_avg = sum(ca3_values) / len(ca3_values) if ca3_values else 0.0
-    
-    # Overall CA average
-    all_ca_values = ca1_values + ca2_values + ca3_values
-    ca_overall = sum(all_ca_values) / len(all_ca_values) if all_ca_values else 0.0
+    total_subjects = standing.total_subjects
+    subjects_passed = standing.passed_count
+    subjects_failed = standing.failed_count
     
-    # Semester average
-    sem_values = [m.semester_marks for m in marks if m.semester_marks is not None]
-    sem_avg = sum(sem_values) / len(sem_values) if sem_values else 0.0
-    
-    # Overall average (50% CA + 50% Semester)
-    overall_avg = (ca_overall * 0.5 + sem_avg * 0.5) if (ca_overall or sem_avg) else 0.0
+    # Check if semester results are published (any mark has sem_published = True)
+    sem_published = bool(standing.sem_published)
     
-    # Calculate rank (students with higher overall average rank higher)
-    all_students = db.query(Student).filter(Student.batch_id == student.batch_id).all()
-    rank = 1
-    for other_student in all_students:
-        if other_student.id == student.id:
-            continue
-        other_marks = db.query(Mark).filter(Mark.student_id == other_student.id).all()
-        if other_marks:
-            other_ca1 = [m.ca1 for m in other_marks if m.ca1 is not None]
-            other_ca2 = [m.ca2 for m in other_marks if m.ca2 is not None]
-            other_ca3 = [m.ca3 for m in other_marks if m.ca3 is not None]
-            other_all_ca = other_ca1 + other_ca2 + other_ca3
-            other_ca_overall = sum(other_all_ca) / len(other_all_ca) if other_all_ca else 0.0
-            
-            other_sem = [m.semester_marks for m in other_marks if m.semester_marks is not None]
-            other_sem_avg = sum(other_sem) / len(other_sem) if other_sem else 0.0
-            
-            other_overall = (other_ca_overall * 0.5 + other_sem_avg * 0.5)
-            if other_overall > overall_avg:
-                rank += 1
+    ca1_avg = standing.ca1_avg or 0.0
+    ca2_avg = standing.ca2_avg or 0.0
+    ca3_avg = standing.ca3_avg or 0.0
+    sem_avg = standing.sem_avg
+    overall_avg = standing.overall
+    rank = standing.rank
     
     return {
         "student_id": student.id,
@@ -139,40 +138,41 @@ async def get_dashboard(
         "sem_published": sem_published
     }
 
-@router.get("/marks")
+@router.get("/marks", response_class=ORJSONResponse)
 async def get_all_marks(
-    student: Student = Depends(get_current_student),
-    db: Session = Depends(get_db)
+    request: Request,
+    student: StudentPrincipal = Depends(get_current_student),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all marks for current student"""
-    marks = db.query(Mark).filter(Mark.student_id == student.id).all()
+    student_version, _ = await _marks_versions(db, student)
+    etag = make_etag("marks", student.id, student.register_no, student_version)
+    payload = await _cached_payload(request, etag, lambda: _build_marks(db, student))
+    if payload is None:
+        return not_modified(etag)
+    return ORJSONResponse(payload, headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
+async def _build_marks(db: AsyncSession, student: StudentPrincipal) -> dict:
+    marks = (await db.execute(
+        select(*STUDENT_MARK_COLUMNS)
+        .outerjoin(Subject, Subject.id == Mark.subject_id)
+        .where(Mark.student_id == student.id)
+    )).all()
     
     return {
         "student_id": student.id,
-        "marks": [
-            {
-                "subject_name": m.subject.name if m.subject else "Unknown",
-                "ca1": m.ca1,
-                "ca2": m.ca2,
-                "ca3": m.ca3,
-                "ca_average": m.ca_average,
-                "semester_marks": m.semester_marks,
-                "passed": m.is_passed
-            }
-            for m in marks
-        ]
+        "marks": rows_as_dicts(STUDENT_MARK_FIELDS, marks)
     }
 
 @router.get("/class-performance")
 async def get_class_performance(
-    student: Student = Depends(get_current_student),
-    db: Session = Depends(get_db)
+    student: StudentPrincipal = Depends(get_current_student),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get student's performance compared to class"""
-    # Get all marks for this student
-    my_marks = db.query(Mark).filter(Mark.student_id == student.id).all()
+    my_totals = await db.run_sync(get_student_totals, student.id)
     
-    if not my_marks:
+    if not my_totals:
         return {
             "student_id": student.id,
             "my_average": 0.0,
@@ -180,20 +180,13 @@ async def get_class_performance(
             "percentile": 0.0
         }
     
-    my_ca_avg = sum([m.ca_average for m in my_marks if m.ca_average]) / len([m for m in my_marks if m.ca_average]) if any(m.ca_average for m in my_marks) else 0
-    
-    # Get all students' averages in same batch
-    batch_students = db.query(Student).filter(Student.batch_id == student.batch_id).all()
-    all_averages = []
+    my_ca_avg = my_totals["mean_ca_average"]
     
-    for bs in batch_students:
-        bs_marks = db.query(Mark).filter(Mark.student_id == bs.id).all()
-        if bs_marks:
-            bs_avg = sum([m.ca_average for m in bs_marks if m.ca_average]) / len([m for m in bs_marks if m.ca_average]) if any(m.ca_average for m in bs_marks) else 0
-            all_averages.append(bs_avg)
+    # Sorted CA averages of the batch, cached in-process until its marks change
+    batch_averages = await db.run_sync(percentile_index.get, student.batch_id)
     
-    class_avg = sum(all_averages) / len(all_averages) if all_averages else 0
-    percentile = (sum(1 for a in all_averages if a <= my_ca_avg) / len(all_averages) * 100) if all_averages else 0
+    class_avg = batch_averages.class_average
+    percentile = batch_averages.percentile(my_ca_avg)
     
     return {
         "student_id": student.id,
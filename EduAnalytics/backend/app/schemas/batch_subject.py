@@ -2,7 +2,7 @@
 Pydantic schemas for Batch-Semester Subject Management
 """
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
@@ -45,6 +45,24 @@ class BatchSubjectCreate(BaseModel):
     subject_id: int
 
 
+class BulkSubjectAssignment(BaseModel):
+    """Assign every subject to every semester number of every batch"""
+    batch_ids: List[int] = Field(..., min_length=1)
+    semester_numbers: List[int] = Field(..., min_length=1)
+    subject_ids: List[int] = Field(..., min_length=1)
+    create_missing_semesters: bool = True
+
+
+class BulkSubjectAssignmentResponse(BaseModel):
+    """Outcome of a bulk assignment"""
+    success: bool
+    requested: int
+    inserted: int
+    skipped: int
+    semesters_created: int
+    missing_semesters: List[dict] = []
+
+
 class BatchSubjectResponse(BaseModel):
     """Batch-Subject mapping response"""
     id: int
@@ -2,9 +2,12 @@
 Pydantic schemas for API request/response validation
 """
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, model_validator
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List, Union
+
+from app.db.models import compute_ca_average, compute_grade, computed_mark_values
+from app.utils.grade_converter import FAIL_GRADE, get_ca_pass_status
 
 
 # ========================================
@@ -72,11 +75,34 @@ class StudentCreate(BaseModel):
     name: str = Field(..., min_length=2, max_length=100)
     email: EmailStr
     batch_id: int
+    date_of_birth: str = Field(..., description="DD-MM-YYYY, used for login")
+    password: Optional[str] = Field(None, min_length=8, max_length=72, description="Optional password (bcrypt hashed); once set, login requires it instead of date_of_birth")
+
+
+class BulkStudentCreate(BaseModel):
+    """Create many student accounts in one request"""
+    students: List[StudentCreate] = Field(..., min_length=1, max_length=20000)
+
+
+class BulkStudentCreateResponse(BaseModel):
+    """Outcome of a bulk account creation"""
+    requested: int
+    created: int
+    skipped: int
+    skipped_register_nos: List[str] = []
+    hashing_ms: float
 
 
 class StudentLogin(BaseModel):
     register_no: str = Field(..., description="Student register number")
-    date_of_birth: str = Field(..., description="Date of birth in DD-MM-YYYY format (e.g., 15-03-2005)")
+    date_of_birth: Optional[str] = Field(None, description="Date of birth in DD-MM-YYYY format (e.g., 15-03-2005)")
+    password: Optional[str] = Field(None, max_length=72, description="Password, for accounts created with one (they do not accept date_of_birth)")
+
+    @model_validator(mode="after")
+    def require_credential(self):
+        if self.date_of_birth is None and self.password is None:
+            raise ValueError("date_of_birth or password is required")
+        return self
 
 
 class GoogleAuthRequest(BaseModel):
@@ -121,6 +147,37 @@ class MarkUpdate(BaseModel):
     semester: Optional[float] = Field(None, ge=0, le=100)
 
 
+class MarkGridUpdate(MarkUpdate):
+    """One edited cell row of the marks grid: omitted fields stay unchanged"""
+    id: int
+
+
+class MarkGridSave(BaseModel):
+    """Edited rows of the marks grid, saved in one request"""
+    marks: List[MarkGridUpdate] = Field(..., min_length=1, max_length=5000)
+
+
+class MarkGridRowResult(BaseModel):
+    mark_id: int
+    status: str  # "updated" or "error"
+    error: Optional[str] = None
+    ca1: Optional[float] = None
+    ca2: Optional[float] = None
+    ca3: Optional[float] = None
+    semester_marks: Optional[float] = None
+    sem_grade: Optional[str] = None  # As shown in the grid: entered grade, else computed_grade
+    computed_grade: Optional[str] = None
+    is_passed: Optional[bool] = None
+
+
+class MarkGridSaveResponse(BaseModel):
+    """Outcome of a grid save, one result per submitted row in request order"""
+    requested: int
+    updated: int
+    failed: int
+    results: List[MarkGridRowResult]
+
+
 class MarkResponse(BaseModel):
     id: int
     student_id: int
@@ -138,19 +195,8 @@ class MarkResponse(BaseModel):
 
     @property
     def ca_average(self):
-        """
-        Calculate CA average based on number of exams conducted.
-        Handles 2 or 3 CA exams:
-        - 3 CAs: (CA1 + CA2 + CA3) / 3
-        - 2 CAs: (CA1 + CA2) / 2
-        Returns None if insufficient data
-        """
-        ca_scores = [self.ca1, self.ca2, self.ca3]
-        non_null_scores = [score for score in ca_scores if score is not None]
-        
-        if len(non_null_scores) >= 2:  # At least 2 CAs required
-            return sum(non_null_scores) / len(non_null_scores)
-        return None
+        """CA average of the entered CAs; None with fewer than 2 (see compute_ca_average)"""
+        return compute_ca_average(self.ca1, self.ca2, self.ca3)
 
     @property
     def ca_total(self):
@@ -162,67 +208,42 @@ class MarkResponse(BaseModel):
     @property
     def ca_status(self):
         """CA Pass/Fail Status - based on average >= 30"""
-        avg = self.ca_average
-        if avg is None:
-            return "Failed"
-        return "Passed" if avg >= 30 else "Failed"
+        return "Passed" if get_ca_pass_status(self.ca_average) else "Failed"
 
     @property
     def sem_grade(self):
-        """
-        Semester Grade based on marks:
-        91-100 → O (Outstanding)
-        81-90 → A+ (Excellent)
-        71-80 → A (Very Good)
-        61-70 → B+ (Good)
-        56-60 → B (Average)
-        50-55 → C (Satisfactory)
-        <50 → RA (Re-Appear/Failed)
-        """
-        if self.semester is None or self.semester <= 0:
-            return None
-        
-        marks = self.semester
-        if marks >= 91:
-            return "O"
-        elif marks >= 81:
-            return "A+"
-        elif marks >= 71:
-            return "A"
-        elif marks >= 61:
-            return "B+"
-        elif marks >= 56:
-            return "B"
-        elif marks >= 50:
-            return "C"
-        else:
-            return "RA"
+        """Semester grade band of the semester marks (GRADE_BANDS); None when not above 0"""
+        return compute_grade(self.semester)
 
     @property
     def sem_status(self):
         """Semester Status - only active when semester marks released"""
-        if self.semester is None or self.semester <= 0:
-            return "-"
-        
         grade = self.sem_grade
-        if grade == "RA":
+        if grade is None:
+            return "-"
+        if grade == FAIL_GRADE:
             return f"{grade} (Failed)"
         return grade
 
     @property
     def is_passed(self):
-        """
-        Pass/Fail logic:
-        - CA average >= 30 (mandatory - calculated from available CA exams)
-        - If semester exists: semester grade != RA
-        - If no semester: CA passing is sufficient
-        """
-        avg = self.ca_average
-        if avg is None or avg < 30:
-            return False
-        if self.semester is not None and self.semester > 0:
-            return self.sem_grade != "RA"
-        return True
+        """Same rule as the stored Mark.is_passed (see computed_mark_values)"""
+        return computed_mark_values(self.ca1, self.ca2, self.ca3, self.semester)["is_passed"]
+
+
+class SemesterPublish(BaseModel):
+    """Semester results of one batch: register_no -> subject name -> semester marks (0-100) or grade"""
+    results: Dict[str, Dict[str, Union[float, str]]] = Field(..., min_length=1)
+
+
+class SemesterPublishResponse(BaseModel):
+    """Outcome of a semester publish"""
+    batch_id: int
+    semester: int
+    students: int
+    updated: int
+    published: int
+    elapsed_ms: float
 
 
 # ========================================
@@ -0,0 +1,276 @@
+"""
+Materialized per-student aggregates
+- student_aggregates holds one rollup row per student per semester
+- refresh_student_aggregates() must be called by every path that writes marks
+- rebuild_student_aggregates() recomputes the whole table for recovery
+- Read helpers combine the rollups instead of scanning raw Mark rows
+- Batches whose rollups changed are announced to listeners after commit
+- students.marks_version / batches.marks_version are bumped in the same
+  transaction, for ETags that change exactly when the data does
+"""
+
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Float, Integer, bindparam, case, cast, delete, event, func, select, update
+from sqlalchemy.orm import Session
+
+from app.db.bulk import chunked
+from app.db.models import Batch, Mark, Student, StudentAggregate
+
+logger = logging.getLogger(__name__)
+
+# Callbacks run with the set of changed batch ids once a transaction commits
+batch_change_listeners: List[Callable[[set], None]] = []
+
+_CHANGED_BATCHES_KEY = "changed_batch_ids"
+
+
+def mark_batches_changed(db: Session, batch_ids: Iterable[int]) -> None:
+    """Queue batch ids for the listeners; they are notified only if the session commits"""
+    db.info.setdefault(_CHANGED_BATCHES_KEY, set()).update(b for b in batch_ids if b is not None)
+
+
+def bump_marks_versions(db: Session, student_ids: Iterable[int]) -> None:
+    """Advance students.marks_version so cached responses and ETags for them go stale"""
+    for chunk in chunked({sid for sid in student_ids if sid is not None}):
+        db.execute(
+            update(Student)
+            .where(Student.id.in_(chunk))
+            .values(marks_version=Student.marks_version + 1, updated_at=Student.updated_at)
+        )
+
+
+def bump_subject_marks_versions(db: Session, subject_id: int) -> None:
+    """bump_marks_versions() for every student with a mark in the subject (e.g. after a rename)"""
+    db.execute(
+        update(Student)
+        .where(Student.id.in_(select(Mark.student_id).where(Mark.subject_id == subject_id)))
+        .values(marks_version=Student.marks_version + 1, updated_at=Student.updated_at)
+    )
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_batch_versions(session):
+    """Advance batches.marks_version for the batches queued by mark_batches_changed()"""
+    changed = session.info.get(_CHANGED_BATCHES_KEY)
+    if changed:
+        for chunk in chunked(changed):
+            session.execute(
+                update(Batch)
+                .where(Batch.id.in_(chunk))
+                .values(marks_version=Batch.marks_version + 1, updated_at=Batch.updated_at)
+            )
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_batch_listeners(session):
+    changed = session.info.pop(_CHANGED_BATCHES_KEY, None)
+    if changed:
+        for listener in batch_change_listeners:
+            listener(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_batch_changes(session):
+    session.info.pop(_CHANGED_BATCHES_KEY, None)
+
+
+def _finish_rollup(rollup: dict, now: datetime) -> dict:
+    def avg(total, count):
+        return total / count if count else None
+
+    rollup["ca1_average"] = avg(rollup["ca1_sum"], rollup["ca1_count"])
+    rollup["ca2_average"] = avg(rollup["ca2_sum"], rollup["ca2_count"])
+    rollup["ca3_average"] = avg(rollup["ca3_sum"], rollup["ca3_count"])
+    rollup["ca_overall"] = avg(
+        rollup["ca1_sum"] + rollup["ca2_sum"] + rollup["ca3_sum"],
+        rollup["ca1_count"] + rollup["ca2_count"] + rollup["ca3_count"],
+    )
+    rollup["semester_average"] = avg(rollup["semester_sum"], rollup["semester_count"])
+    rollup["updated_at"] = now
+    return rollup
+
+
+def _compute_rollups(db: Session, student_ids) -> Dict[Tuple[int, int], dict]:
+    """Aggregate the marks of the given students per (student, semester)
+
+    Pass/fail and the CA average are stored on each mark, so the
+    whole rollup is one GROUP BY in the database.
+    """
+    ca_average = Mark.ca_average
+    # Only non-zero averages count towards the mean, as in the Python rollup
+    counted_average = case((ca_average != 0, ca_average), else_=None)
+    passed = cast(Mark.is_passed, Integer)
+
+    rows = db.execute(
+        select(
+            Mark.student_id.label("student_id"),
+            Mark.semester_id.label("semester_id"),
+            Student.batch_id.label("batch_id"),
+            func.count().label("total_subjects"),
+            func.sum(passed).label("passed_count"),
+            func.sum(1 - passed).label("failed_count"),
+            func.coalesce(func.sum(Mark.ca1), 0.0).label("ca1_sum"),
+            func.count(Mark.ca1).label("ca1_count"),
+            func.coalesce(func.sum(Mark.ca2), 0.0).label("ca2_sum"),
+            func.count(Mark.ca2).label("ca2_count"),
+            func.coalesce(func.sum(Mark.ca3), 0.0).label("ca3_sum"),
+            func.count(Mark.ca3).label("ca3_count"),
+            func.coalesce(func.sum(counted_average), 0.0).label("ca_average_sum"),
+            func.count(counted_average).label("ca_average_count"),
+            func.coalesce(func.sum(Mark.semester_marks), 0.0).label("semester_sum"),
+            func.count(Mark.semester_marks).label("semester_count"),
+            func.max(cast(func.coalesce(Mark.sem_published, False), Integer)).label("sem_published"),
+        )
+        .join(Student, Student.id == Mark.student_id)
+        .where(Mark.student_id.in_(student_ids))
+        .group_by(Mark.student_id, Mark.semester_id, Student.batch_id)
+    ).all()
+
+    rollups = {}
+    for row in rows:
+        rollup = dict(row._mapping)
+        rollup["sem_published"] = bool(rollup["sem_published"])
+        rollups[(row.student_id, row.semester_id)] = rollup
+    return rollups
+
+
+def refresh_student_aggregates(db: Session, student_ids: Iterable[int]) -> None:
+    """Recompute the aggregate rows of the given students from their marks
+
+    Call after any insert, update or delete of Mark rows, inside the same
+    transaction. Only the listed students are touched.
+    """
+    student_ids = {sid for sid in student_ids if sid is not None}
+    if not student_ids:
+        return
+
+    bump_marks_versions(db, student_ids)
+    now = datetime.utcnow()
+    for chunk in chunked(student_ids):
+        # Batches the students were in before and after the change both move
+        mark_batches_changed(db, db.scalars(
+            select(StudentAggregate.batch_id).where(StudentAggregate.student_id.in_(chunk)).distinct()
+        ).all())
+        db.execute(delete(StudentAggregate).where(StudentAggregate.student_id.in_(chunk)))
+        rollups = _compute_rollups(db, chunk)
+        mark_batches_changed(db, {rollup["batch_id"] for rollup in rollups.values()})
+        if rollups:
+            db.execute(
+                StudentAggregate.__table__.insert(),
+                [_finish_rollup(rollup, now) for rollup in rollups.values()]
+            )
+
+
+def rebuild_student_aggregates(db: Session) -> int:
+    """Throw away and recompute every aggregate row; returns rows written"""
+    mark_batches_changed(db, db.scalars(select(StudentAggregate.batch_id).distinct()).all())
+    db.execute(delete(StudentAggregate))
+    student_ids = db.scalars(select(Mark.student_id).distinct()).all()
+    refresh_student_aggregates(db, student_ids)
+    db.commit()
+    count = db.scalar(select(func.count()).select_from(StudentAggregate))
+    logger.info(f"Rebuilt student aggregates: {count} rows for {len(student_ids)} students")
+    return count
+
+
+def ensure_student_aggregates(db: Session) -> None:
+    """Populate the table on first start against a database that already has marks"""
+    has_aggregates = db.scalar(select(StudentAggregate.id).limit(1)) is not None
+    has_marks = db.scalar(select(Mark.id).limit(1)) is not None
+    if has_marks and not has_aggregates:
+        rebuild_student_aggregates(db)
+
+
+def _ratio(numerator, denominator, default=None):
+    return case((denominator > 0, cast(numerator, Float) / denominator), else_=default)
+
+
+def _batch_standings():
+    """Per-student rollup across semesters plus rank for one batch (bound as :batch_id)
+
+    overall = 50% CA average (over every CA entered) + 50% semester average.
+    RANK() matches the old "1 + students strictly ahead" loop: ties share a
+    rank and students without marks are not ranked.
+    """
+    agg = StudentAggregate
+    ca_sum = func.sum(agg.ca1_sum) + func.sum(agg.ca2_sum) + func.sum(agg.ca3_sum)
+    ca_count = func.sum(agg.ca1_count) + func.sum(agg.ca2_count) + func.sum(agg.ca3_count)
+    ca_overall = _ratio(ca_sum, ca_count, 0.0)
+    sem_avg = _ratio(func.sum(agg.semester_sum), func.sum(agg.semester_count), 0.0)
+
+    per_student = (
+        select(
+            agg.student_id.label("student_id"),
+            agg.batch_id.label("batch_id"),
+            func.sum(agg.total_subjects).label("total_subjects"),
+            func.sum(agg.passed_count).label("passed_count"),
+            func.sum(agg.failed_count).label("failed_count"),
+            func.max(cast(agg.sem_published, Integer)).label("sem_published"),
+            _ratio(func.sum(agg.ca1_sum), func.sum(agg.ca1_count)).label("ca1_avg"),
+            _ratio(func.sum(agg.ca2_sum), func.sum(agg.ca2_count)).label("ca2_avg"),
+            _ratio(func.sum(agg.ca3_sum), func.sum(agg.ca3_count)).label("ca3_avg"),
+            _ratio(func.sum(agg.ca_average_sum), func.sum(agg.ca_average_count), 0.0).label("mean_ca_average"),
+            ca_overall.label("ca_overall"),
+            sem_avg.label("sem_avg"),
+            (ca_overall * 0.5 + sem_avg * 0.5).label("overall"),
+        )
+        .where(agg.batch_id == bindparam("batch_id"))
+        .group_by(agg.student_id, agg.batch_id)
+        .subquery()
+    )
+
+    return select(
+        per_student,
+        func.rank().over(
+            partition_by=per_student.c.batch_id,
+            order_by=per_student.c.overall.desc()
+        ).label("rank"),
+    ).subquery()
+
+
+standings = _batch_standings()
+
+
+def get_student_standing(db: Session, student_id: int, batch_id: int):
+    """Combined rollup and batch rank for one student, or None without marks"""
+    return db.execute(
+        select(standings).where(standings.c.student_id == student_id),
+        {"batch_id": batch_id}
+    ).first()
+
+
+# Averages read back for comparisons are rounded so that students with the
+# same marks compare equal whatever order the database summed them in
+COMPARE_DIGITS = 9
+
+
+def get_student_totals(db: Session, student_id: int) -> Optional[dict]:
+    """Combined rollup for one student without ranking, or None without marks"""
+    agg = StudentAggregate
+    row = db.execute(
+        select(
+            func.sum(agg.total_subjects).label("total_subjects"),
+            func.sum(agg.passed_count).label("passed_count"),
+            _ratio(func.sum(agg.ca_average_sum), func.sum(agg.ca_average_count), 0.0).label("mean_ca_average"),
+            _ratio(func.sum(agg.semester_sum), func.sum(agg.semester_count), 0.0).label("sem_avg"),
+        ).where(agg.student_id == student_id)
+    ).one()
+    if not row.total_subjects:
+        return None
+    totals = dict(row._mapping)
+    totals["mean_ca_average"] = round(totals["mean_ca_average"], COMPARE_DIGITS)
+    return totals
+
+
+def get_batch_ca_averages(db: Session, batch_id: int) -> list:
+    """Mean Mark.ca_average of every student with marks in the batch"""
+    agg = StudentAggregate
+    averages = db.scalars(
+        select(_ratio(func.sum(agg.ca_average_sum), func.sum(agg.ca_average_count), 0.0))
+        .where(agg.batch_id == batch_id)
+        .group_by(agg.student_id)
+    ).all()
+    return [round(value, COMPARE_DIGITS) for value in averages]
@@ -1,17 +1,24 @@
 """
 Authentication service
 """
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.db.models import Student, Admin
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.config import settings
+from app.core.security import check_password, create_access_token, verify_password_async
+from app.services.firebase_tokens import FirebaseTokenVerifier, JWKSKeyStore
 from datetime import timedelta
 from typing import Optional
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # Firebase Admin SDK (optional - only if you have credentials)
 try:
     import firebase_admin
-    from firebase_admin import credentials, auth as firebase_auth
+    from firebase_admin import credentials
     
     # Initialize Firebase Admin SDK if credentials are available
     firebase_cred_path = os.getenv("FIREBASE_CREDENTIALS_PATH")
@@ -26,38 +33,81 @@ except ImportError:
 except Exception:
     FIREBASE_ENABLED = False
 
-def authenticate_student(db: Session, register_no: str, dob: str):
-    """Authenticate student with register number and date of birth
+# Only the columns the login check and the token response need
+STUDENT_LOGIN_COLUMNS = (Student.id, Student.register_no, Student.email, Student.date_of_birth,
+                         Student.is_active, Student.password_hash)
+
+def _student_login_query(register_no: str):
+    return select(*STUDENT_LOGIN_COLUMNS).where(Student.register_no == register_no)
+
+def authenticate_student(db: Session, register_no: str, dob: Optional[str] = None, password: Optional[str] = None):
+    """Authenticate student with register number and date of birth (or password)
     
     Args:
         db: Database session
         register_no: Student register number (e.g., "CS2025001")
         dob: Date of birth in format "DD-MM-YYYY" (e.g., "12-01-2006")
+        password: Checked instead of dob; accounts created with a password
+            (admin API) accept only the password
     
     Returns:
-        Student object if authentication successful, None otherwise
+        Row (id, register_no, email, date_of_birth, is_active, password_hash)
+        if authentication successful, None otherwise
     """
-    student = db.query(Student).filter(Student.register_no == register_no).first()
-    
-    if not student:
-        print(f"[AUTH DEBUG] Student not found: {register_no}")
+    student = db.execute(_student_login_query(register_no)).first()
+    password_ok = None
+    if password is not None and student is not None and student.password_hash:
+        password_ok = check_password(password, student.password_hash)
+    return _check_student_login(student, register_no, dob, password, password_ok)
+
+async def authenticate_student_async(db: AsyncSession, register_no: str, dob: Optional[str] = None,
+                                     password: Optional[str] = None):
+    """authenticate_student() for async sessions; bcrypt runs in the worker pool"""
+    student = (await db.execute(_student_login_query(register_no))).first()
+    password_ok = None
+    if password is not None and student is not None and student.password_hash:
+        password_ok = await verify_password_async(password, student.password_hash)
+    return _check_student_login(student, register_no, dob, password, password_ok)
+
+def _check_student_login(student, register_no: str, dob: Optional[str], password: Optional[str],
+                         password_ok: Optional[bool]):
+    """Return the student row if its credential matches
+
+    Accounts with a password_hash log in with the password only; the others
+    with their date of birth.
+    """
+    if student is None:
+        _log_login(register_no, "unknown_register_no")
         return None
     
-    # Simple direct string comparison - both should be DD-MM-YYYY
-    student_dob = (student.date_of_birth or "").strip()
-    dob_input = (dob or "").strip()
+    if password is not None:
+        if password_ok:
+            _log_login(register_no, "success")
+            return student
+        _log_login(register_no, "password_mismatch" if student.password_hash else "no_password")
+        return None
     
-    print(f"[AUTH DEBUG] Comparing:")
-    print(f"  Input DOB: '{dob_input}' (len={len(dob_input)})")
-    print(f"  DB DOB:    '{student_dob}' (len={len(student_dob)})")
+    # A date of birth is not a secret; it must not bypass a password
+    if student.password_hash:
+        _log_login(register_no, "password_required")
+        return None
     
-    if student_dob == dob_input:
-        print(f"[AUTH DEBUG] ✓ Authentication successful for {register_no}")
+    # Simple direct string comparison - both should be DD-MM-YYYY
+    if (student.date_of_birth or "").strip() == (dob or "").strip():
+        _log_login(register_no, "success")
         return student
     
-    print(f"[AUTH DEBUG] ✗ DOB mismatch for {register_no}")
+    _log_login(register_no, "dob_mismatch")
     return None
 
+def _log_login(register_no: str, outcome: str) -> None:
+    """One structured line per login attempt (AUTH_LOG_ENABLED)"""
+    if settings.AUTH_LOG_ENABLED:
+        logger.info(
+            "student_login outcome=%s register_no=%s", outcome, register_no,
+            extra={"event": "student_login", "outcome": outcome, "register_no": register_no},
+        )
+
 def create_student_token(student_id: int, register_no: str) -> str:
     """Create JWT token for student"""
     access_token_expires = timedelta(days=7)
@@ -76,13 +126,31 @@ def create_admin_token(admin_id: int, email: str) -> str:
     )
     return token
 
+def _build_firebase_verifier() -> Optional[FirebaseTokenVerifier]:
+    """Local verifier for the configured Firebase project (None when there is no project)"""
+    project_id = settings.FIREBASE_PROJECT_ID
+    if not project_id and FIREBASE_ENABLED:
+        project_id = firebase_admin.get_app().project_id
+    if not project_id:
+        return None
+    keys = JWKSKeyStore(
+        path=settings.FIREBASE_JWKS_FILE or None,
+        refresh_seconds=settings.FIREBASE_JWKS_REFRESH_SECONDS,
+    )
+    return FirebaseTokenVerifier(project_id, keys, settings.FIREBASE_TOKEN_CACHE_SIZE)
+
+firebase_verifier = _build_firebase_verifier()
+
 def verify_google_token(id_token: str) -> Optional[dict]:
     """
     Verify Google Firebase ID token
     
+    Signing keys and already-verified tokens are cached in memory
+    (see app.services.firebase_tokens), so no request waits on Google.
+    
     Returns user info if valid, None otherwise
     """
-    if not FIREBASE_ENABLED:
+    if firebase_verifier is None:
         # For development: return mock data if Firebase is not configured
         # In production, you should raise an error here
         print("⚠️ Warning: Firebase is not configured. Using mock authentication.")
@@ -92,20 +160,15 @@ def verify_google_token(id_token: str) -> Optional[dict]:
             "name": "Test User"
         }
     
-    try:
-        # Verify the Firebase ID token
-        decoded_token = firebase_auth.verify_id_token(id_token)
-        
-        # Extract user information
-        user_info = {
-            "uid": decoded_token.get("uid"),
-            "email": decoded_token.get("email"),
-            "name": decoded_token.get("name", decoded_token.get("email", "").split("@")[0]),
-            "picture": decoded_token.get("picture"),
-            "email_verified": decoded_token.get("email_verified", False)
-        }
-        
-        return user_info
-    except Exception as e:
-        print(f"Firebase token verification failed: {e}")
+    decoded_token = firebase_verifier.verify(id_token)
+    if not decoded_token:
         return None
+    
+    # Extract user information
+    return {
+        "uid": decoded_token.get("uid"),
+        "email": decoded_token.get("email"),
+        "name": decoded_token.get("name", (decoded_token.get("email") or "").split("@")[0]),
+        "picture": decoded_token.get("picture"),
+        "email_verified": decoded_token.get("email_verified", False)
+    }
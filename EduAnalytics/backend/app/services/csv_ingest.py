@@ -0,0 +1,476 @@
+"""
+CSV ingestion engine for marks uploads
+- Stream the upload and parse rows without holding the whole file in memory
+- Resolve batches, subjects, semesters and students with IN (...) prefetches
+- Write students and marks with bulk INSERT ... ON CONFLICT DO UPDATE
+- Optionally commit in chunks of N rows so one bad chunk cannot undo the rest
+"""
+
+import codecs
+import csv
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.auth import STUDENT, invalidate_principals_after_commit
+from app.db.bulk import chunked, dialect_insert
+from app.db.models import Batch, CSVUploadLog, Mark, Semester, Student, Subject, computed_mark_arrays
+from app.services.aggregates import refresh_student_aggregates
+from app.services.curriculum import curriculum_cache, resolve_semesters
+from app.utils.grade_converter import GRADES, get_numeric_from_grade
+
+logger = logging.getLogger(__name__)
+
+VALID_SEM_GRADES = GRADES
+
+# Upload columns in file order; SEM_Grade is optional
+CSV_COLUMNS = (
+    'Register_No', 'Student_Name', 'Email', 'Batch_Year', 'Semester', 'Subject_Name',
+    'CA1', 'CA2', 'CA3', 'Semester_Marks', 'Date_of_Birth', 'SEM_Grade',
+)
+
+READ_CHUNK_BYTES = 64 * 1024
+
+
+def iter_text_lines(fileobj: BinaryIO, encoding: str = "utf-8-sig",
+                    chunk_bytes: int = READ_CHUNK_BYTES) -> Iterator[str]:
+    """Decode a binary file incrementally and yield lines with their endings
+
+    Only a single read chunk plus one partial line is held at a time, so the
+    memory used does not depend on the size of the upload. The default
+    encoding also strips the BOM that spreadsheet exports prepend.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+    while True:
+        data = fileobj.read(chunk_bytes)
+        pending += decoder.decode(data, final=not data)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+        if not data:
+            break
+    if pending:
+        yield pending
+
+
+def validate_dob_format(dob: str) -> bool:
+    """Validate date of birth format DD-MM-YYYY"""
+    try:
+        datetime.strptime(dob.strip(), "%d-%m-%Y")
+        return True
+    except ValueError:
+        return False
+
+
+@dataclass
+class ParsedRow:
+    """One validated CSV row"""
+    row_num: int
+    register_no: str
+    name: str
+    email: str
+    date_of_birth: str
+    batch_year: str
+    semester_number: int
+    subject_name: str
+    ca1: Optional[float]
+    ca2: Optional[float]
+    ca3: Optional[float]
+    semester_marks: Optional[float]
+    sem_grade: Optional[str] = None
+
+
+@dataclass
+class IngestResult:
+    """Outcome of an ingestion run"""
+    success_count: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def error_messages(self) -> List[str]:
+        return [message for _, message in sorted(self.errors, key=lambda e: e[0])]
+
+    @property
+    def total_rows(self) -> int:
+        return self.success_count + len(self.errors)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.total_rows / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def parse_row(row: dict, row_num: int) -> Tuple[Optional[ParsedRow], Optional[str]]:
+    """Validate a raw csv.DictReader row, returning (parsed, error)"""
+    register_no = (row.get('Register_No') or '').strip()
+    student_name = (row.get('Student_Name') or '').strip()
+    email = (row.get('Email') or '').strip()
+    dob = (row.get('Date_of_Birth') or '').strip()
+    batch_year = (row.get('Batch_Year') or '').strip()
+    semester_num = (row.get('Semester') or '1').strip()
+    subject_name = (row.get('Subject_Name') or '').strip()
+
+    if not all([register_no, student_name, email, dob, batch_year, subject_name]):
+        return None, f"Row {row_num}: Missing required fields"
+
+    # Validate DOB format (DD-MM-YYYY)
+    if not validate_dob_format(dob):
+        return None, f"Row {row_num}: Invalid date format. Use DD-MM-YYYY (e.g., 15-03-2005)"
+
+    try:
+        semester_number = int(semester_num)
+        int(batch_year)  # academic_year is derived from it
+    except ValueError as e:
+        return None, f"Row {row_num}: {str(e)}"
+
+    # Parse CA marks (REQUIRED)
+    try:
+        ca1 = float(row.get('CA1', 0)) if row.get('CA1') else None
+        ca2 = float(row.get('CA2', 0)) if row.get('CA2') else None
+        ca3 = float(row.get('CA3', 0)) if row.get('CA3') else None
+    except ValueError as e:
+        return None, f"Row {row_num}: Invalid CA marks format - {str(e)}"
+
+    # Parse Semester marks (OPTIONAL - for initial data only, grades entered later)
+    try:
+        sem_marks_str = (row.get('Semester_Marks') or '').strip()
+        semester_marks = float(sem_marks_str) if sem_marks_str else None
+    except ValueError:
+        semester_marks = None
+
+    # Parse SEM Grade (OPTIONAL - only when results published)
+    sem_grade = (row.get('SEM_Grade') or '').strip().upper()
+    if sem_grade and sem_grade not in VALID_SEM_GRADES:
+        return None, f"Row {row_num}: Invalid SEM_Grade '{sem_grade}'. Must be one of: {', '.join(VALID_SEM_GRADES)}"
+    # A grade without marks is stored with the grade's midpoint as the marks
+    if sem_grade and semester_marks is None:
+        semester_marks = get_numeric_from_grade(sem_grade)
+
+    return ParsedRow(
+        row_num=row_num,
+        register_no=register_no,
+        name=student_name,
+        email=email,
+        date_of_birth=dob,
+        batch_year=batch_year,
+        semester_number=semester_number,
+        subject_name=subject_name,
+        ca1=ca1,
+        ca2=ca2,
+        ca3=ca3,
+        semester_marks=semester_marks,
+        sem_grade=sem_grade or None,
+    ), None
+
+
+def _resolve_batches(db: Session, years: set) -> Dict[str, int]:
+    """Map batch_year -> batch id, creating missing batches"""
+    found = {}
+    for chunk in chunked(years):
+        found.update(db.execute(
+            select(Batch.batch_year, Batch.id).where(Batch.batch_year.in_(chunk))
+        ).all())
+
+    missing = [year for year in years if year not in found]
+    if missing:
+        now = datetime.utcnow()
+        curriculum_cache.bump_after_commit(db)
+        stmt = dialect_insert(db, Batch.__table__).on_conflict_do_nothing()
+        db.execute(stmt, [{"batch_year": y, "created_at": now, "updated_at": now} for y in missing])
+        for chunk in chunked(missing):
+            found.update(db.execute(
+                select(Batch.batch_year, Batch.id).where(Batch.batch_year.in_(chunk))
+            ).all())
+    return found
+
+
+def _resolve_subjects(db: Session, names: set) -> Dict[str, int]:
+    """Map subject name -> subject id, creating missing subjects"""
+    found = {}
+    for chunk in chunked(names):
+        found.update(db.execute(
+            select(Subject.name, Subject.id).where(Subject.name.in_(chunk))
+        ).all())
+
+    missing = [name for name in names if name not in found]
+    if missing:
+        now = datetime.utcnow()
+        # DO NOTHING without a target also swallows code collisions; those
+        # subjects stay unresolved and their rows are reported as errors.
+        stmt = dialect_insert(db, Subject.__table__).on_conflict_do_nothing()
+        db.execute(stmt, [
+            {"name": n, "code": n[:10].upper(), "created_at": now, "updated_at": now}
+            for n in missing
+        ])
+        for chunk in chunked(missing):
+            found.update(db.execute(
+                select(Subject.name, Subject.id).where(Subject.name.in_(chunk))
+            ).all())
+    return found
+
+
+def _upsert_students(db: Session, rows: List[ParsedRow], batch_ids: Dict[str, int],
+                     result: IngestResult, upload_id: Optional[int]) -> Tuple[Dict[str, int], set]:
+    """Insert new students and refresh DOB/batch of existing ones
+
+    Name and email come from a student's first row, DOB and batch from the
+    last one, matching what row-by-row processing used to leave behind.
+    Only newly inserted students are stamped with `upload_id`.
+    Returns (register_no -> student id, register numbers rejected).
+    """
+    students = {}
+    for r in rows:
+        entry = students.setdefault(r.register_no, {"name": r.name, "email": r.email})
+        entry["date_of_birth"] = r.date_of_birth
+        entry["batch_id"] = batch_ids[r.batch_year]
+
+    existing = set()
+    for chunk in chunked(students):
+        existing.update(db.scalars(select(Student.register_no).where(Student.register_no.in_(chunk))).all())
+
+    # New students must not reuse an email that belongs to someone else
+    new_emails = {}
+    for register_no, entry in students.items():
+        if register_no not in existing:
+            new_emails.setdefault(entry["email"], []).append(register_no)
+    taken = set()
+    for chunk in chunked(new_emails):
+        taken.update(db.scalars(select(Student.email).where(Student.email.in_(chunk))).all())
+
+    rejected = set()
+    for email, register_nos in new_emails.items():
+        clashes = register_nos if email in taken else register_nos[1:]
+        rejected.update(clashes)
+
+    for r in rows:
+        if r.register_no in rejected:
+            result.errors.append((r.row_num, f"Row {r.row_num}: Email '{r.email}' is already registered to another student"))
+
+    now = datetime.utcnow()
+    payload = [
+        {"register_no": register_no, "upload_id": upload_id, "created_at": now, "updated_at": now, **entry}
+        for register_no, entry in students.items()
+        if register_no not in rejected
+    ]
+    if payload:
+        stmt = dialect_insert(db, Student.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["register_no"],
+            set_={
+                "date_of_birth": stmt.excluded.date_of_birth,
+                "batch_id": stmt.excluded.batch_id,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        db.execute(stmt, payload)
+
+    ids = {}
+    for chunk in chunked([p["register_no"] for p in payload]):
+        ids.update(db.execute(
+            select(Student.register_no, Student.id).where(Student.register_no.in_(chunk))
+        ).all())
+    # The upsert can move a student to another batch
+    invalidate_principals_after_commit(db, STUDENT, ids.values())
+    return ids, rejected
+
+
+def _upsert_marks(db: Session, marks: Dict[Tuple[int, int, int], ParsedRow], upload_id: Optional[int]) -> None:
+    """Write one mark per (student, subject, semester) keyed on unique_student_subject_semester
+
+    New marks are stamped with `upload_id`; updated marks keep their original upload.
+    """
+    if not marks:
+        return
+    now = datetime.utcnow()
+    stmt = dialect_insert(db, Mark.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["student_id", "subject_id", "semester_id"],
+        set_={
+            "ca1": stmt.excluded.ca1,
+            "ca2": stmt.excluded.ca2,
+            "ca3": stmt.excluded.ca3,
+            "semester_marks": stmt.excluded.semester_marks,
+            "sem_grade": stmt.excluded.sem_grade,
+            "sem_published": stmt.excluded.sem_published,
+            "ca_average": stmt.excluded.ca_average,
+            "ca_passed": stmt.excluded.ca_passed,
+            "computed_grade": stmt.excluded.computed_grade,
+            "is_passed": stmt.excluded.is_passed,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    # Core INSERTs skip the Mark hooks, so the derived columns are filled in
+    # here, for the whole chunk in one array pass
+    parsed = list(marks.values())
+    derived = computed_mark_arrays(*(
+        np.array([getattr(r, name) for r in parsed], dtype=np.float64)
+        for name in ("ca1", "ca2", "ca3", "semester_marks")
+    ))
+    averages = [None if math.isnan(a) else a for a in derived["ca_average"].tolist()]
+    db.execute(stmt, [
+        {
+            "student_id": student_id,
+            "subject_id": subject_id,
+            "semester_id": semester_id,
+            "ca1": r.ca1,
+            "ca2": r.ca2,
+            "ca3": r.ca3,
+            "semester_marks": r.semester_marks,
+            "sem_grade": r.sem_grade,
+            # Semester results count as published once semester marks exist
+            "sem_published": r.semester_marks is not None and r.semester_marks > 0,
+            "ca_average": average,
+            "ca_passed": ca_passed,
+            "computed_grade": grade,
+            "is_passed": passed,
+            "upload_id": upload_id,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for ((student_id, subject_id, semester_id), r), average, ca_passed, grade, passed in zip(
+            marks.items(), averages, derived["ca_passed"].tolist(),
+            derived["computed_grade"].tolist(), derived["is_passed"].tolist(),
+        )
+    ])
+
+
+def write_rows(db: Session, rows: List[ParsedRow], result: IngestResult, upload_id: Optional[int] = None) -> None:
+    """Resolve and write a list of parsed rows inside the caller's transaction"""
+    if not rows:
+        return
+
+    batch_ids = _resolve_batches(db, {r.batch_year for r in rows})
+
+    subject_ids = _resolve_subjects(db, {r.subject_name for r in rows})
+    unresolved = {r.subject_name for r in rows} - set(subject_ids)
+    if unresolved:
+        for r in rows:
+            if r.subject_name in unresolved:
+                result.errors.append((
+                    r.row_num,
+                    f"Row {r.row_num}: Could not create subject '{r.subject_name}' (code '{r.subject_name[:10].upper()}' already in use)",
+                ))
+        rows = [r for r in rows if r.subject_name not in unresolved]
+
+    semester_ids = resolve_semesters(db, {
+        (batch_ids[r.batch_year], r.semester_number): r.batch_year for r in rows
+    })
+
+    student_ids, rejected = _upsert_students(db, rows, batch_ids, result, upload_id)
+    rows = [r for r in rows if r.register_no not in rejected]
+
+    # Later rows for the same student/subject/semester overwrite earlier ones
+    marks = {}
+    for r in rows:
+        key = (
+            student_ids[r.register_no],
+            subject_ids[r.subject_name],
+            semester_ids[(batch_ids[r.batch_year], r.semester_number)],
+        )
+        marks[key] = r
+    _upsert_marks(db, marks, upload_id)
+    refresh_student_aggregates(db, student_ids.values())
+
+    result.success_count += len(rows)
+
+
+def ingest_csv_rows(db: Session, reader: Iterable[dict], chunk_rows: Optional[int] = None,
+                    progress: Optional[Callable[[IngestResult], None]] = None,
+                    upload_id: Optional[int] = None) -> IngestResult:
+    """Parse rows from a csv.DictReader and write them in bulk
+
+    Without `chunk_rows` everything is written in the caller's transaction and
+    nothing is committed. With `chunk_rows`, rows are consumed lazily and each
+    chunk of that many rows is committed on its own; a chunk that fails to
+    write is rolled back and reported row by row while earlier chunks stay.
+    `progress` is called with the running result after every chunk, and
+    rows created are stamped with `upload_id` so the upload can be undone.
+    """
+    started = time.perf_counter()
+    result = IngestResult()
+    chunk_rows = chunk_rows if chunk_rows and chunk_rows > 0 else None
+
+    def flush_chunk(parsed: List[ParsedRow]) -> None:
+        if chunk_rows is None:
+            write_rows(db, parsed, result, upload_id)
+            db.flush()
+            return
+        chunk_result = IngestResult()
+        try:
+            write_rows(db, parsed, chunk_result, upload_id)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"CSV ingest: chunk starting at row {parsed[0].row_num} failed: {e}")
+            result.errors.extend((r.row_num, f"Row {r.row_num}: {str(e)}") for r in parsed)
+            return
+        result.success_count += chunk_result.success_count
+        result.errors.extend(chunk_result.errors)
+
+    parsed = []
+    row_num = 1
+    try:
+        for row_num, row in enumerate(reader, start=2):
+            row_data, error = parse_row(row, row_num)
+            if error:
+                result.errors.append((row_num, error))
+            else:
+                parsed.append(row_data)
+            if chunk_rows and len(parsed) >= chunk_rows:
+                flush_chunk(parsed)
+                parsed = []
+                if progress:
+                    result.elapsed = time.perf_counter() - started
+                    progress(result)
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Keep what was read so far; the rest of the file is unreadable
+        result.errors.append((row_num + 1, f"Row {row_num + 1}: Could not read file - {str(e)}"))
+
+    if parsed:
+        flush_chunk(parsed)
+
+    result.elapsed = time.perf_counter() - started
+    logger.info(
+        f"CSV ingest: {result.total_rows} rows ({result.success_count} ok, {len(result.errors)} errors) "
+        f"in {result.elapsed:.2f}s - {result.rows_per_second:.0f} rows/s"
+    )
+    return result
+
+
+def start_upload_log(db: Session, admin_id: int, filename: str) -> CSVUploadLog:
+    """Create the audit row up front so written rows can reference it"""
+    upload_log = CSVUploadLog(
+        admin_id=admin_id,
+        filename=filename,
+        uploaded_records=0,
+        success=False
+    )
+    db.add(upload_log)
+    db.commit()
+    return upload_log
+
+
+def finish_upload_log(db: Session, upload_log: CSVUploadLog, result: IngestResult) -> CSVUploadLog:
+    """Record the outcome of a finished upload and commit it"""
+    error_messages = result.error_messages
+    upload_log.uploaded_records = result.success_count
+    upload_log.success = len(error_messages) == 0
+    upload_log.error_message = "; ".join(error_messages) if error_messages else None
+    db.commit()
+    return upload_log
+
+
+def fail_upload_log(db: Session, upload_log: CSVUploadLog, error: str) -> None:
+    """Mark an upload that aborted part way; chunks already committed stay attributed to it"""
+    upload_log.success = False
+    upload_log.error_message = error
+    db.commit()
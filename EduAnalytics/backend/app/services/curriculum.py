@@ -0,0 +1,162 @@
+"""
+Curriculum: batches, their semesters and the subjects mapped to each
+- Tree (batch → semester → subject) built from one joined query and assembled in memory
+- Cached in process; every write to batches, semesters, subjects or
+  batch_subjects bumps the cache version
+- Reads compare a row count / latest updated_at fingerprint of those tables
+  first, so writes committed by other worker processes are picked up too
+- Set-based semester creation and bulk subject assignment (ON CONFLICT DO NOTHING)
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import and_, func, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.cache import VersionedCache
+from app.db.bulk import chunked, dialect_insert
+from app.db.models import Batch, BatchSubject, Semester, Subject
+
+curriculum_cache = VersionedCache("curriculum")
+
+CURRICULUM_MODELS = (Batch, Semester, Subject, BatchSubject)
+
+
+def build_curriculum_tree(db: Session) -> list:
+    """Every batch with its semesters and the subjects mapped to each semester"""
+    rows = db.execute(
+        select(
+            Batch.id, Batch.batch_year, Batch.created_at, Batch.updated_at,
+            Semester.id, Semester.semester_number, Semester.academic_year,
+            BatchSubject.id, Subject.id, Subject.name, Subject.code,
+        )
+        .select_from(Batch)
+        .outerjoin(Semester, Semester.batch_id == Batch.id)
+        .outerjoin(BatchSubject, and_(
+            BatchSubject.batch_id == Batch.id,
+            BatchSubject.semester_id == Semester.id,
+        ))
+        .outerjoin(Subject, Subject.id == BatchSubject.subject_id)
+        .order_by(Batch.id, Semester.id, BatchSubject.id)
+    ).all()
+
+    batches = {}
+    semesters = {}
+    for (batch_id, batch_year, created_at, updated_at,
+         semester_id, semester_number, academic_year,
+         batch_subject_id, subject_id, subject_name, subject_code) in rows:
+        batch = batches.get(batch_id)
+        if batch is None:
+            batch = batches[batch_id] = {
+                "id": batch_id,
+                "batch_year": batch_year,
+                "semesters": [],
+                "created_at": created_at,
+                "updated_at": updated_at,
+            }
+        if semester_id is None:
+            continue
+        semester = semesters.get(semester_id)
+        if semester is None:
+            semester = semesters[semester_id] = {
+                "id": semester_id,
+                "semester_number": semester_number,
+                "academic_year": academic_year,
+                "subjects": [],
+            }
+            batch["semesters"].append(semester)
+        if batch_subject_id is not None:
+            semester["subjects"].append({
+                "id": subject_id,
+                "name": subject_name,
+                "code": subject_code,
+                "batch_subject_id": batch_subject_id,
+            })
+    return list(batches.values())
+
+
+def curriculum_stamp(db: Session) -> tuple:
+    """Row count and latest updated_at of every curriculum table, in one query
+
+    Inserts and updates move updated_at, deletes move the count.
+    """
+    return tuple(db.execute(select(*(
+        column
+        for model in CURRICULUM_MODELS
+        for column in (
+            select(func.count()).select_from(model).scalar_subquery(),
+            select(func.max(model.updated_at)).scalar_subquery(),
+        )
+    ))).one())
+
+
+def get_curriculum_tree(db: Session) -> list:
+    """Cached build_curriculum_tree(), rebuilt when any process changed the curriculum"""
+    curriculum_cache.check_stamp(curriculum_stamp(db))
+    return curriculum_cache.get("tree", lambda: build_curriculum_tree(db))
+
+
+def resolve_semesters(db: Session, keys: Dict[Tuple[int, int], str]) -> Dict[Tuple[int, int], int]:
+    """Map (batch_id, semester_number) -> semester id, creating missing semesters
+
+    `keys` maps each pair to the batch year used to derive academic_year.
+    """
+    def fetch(pairs):
+        result = {}
+        for chunk in chunked(pairs):
+            result.update({
+                (batch_id, number): sem_id
+                for batch_id, number, sem_id in db.execute(
+                    select(Semester.batch_id, Semester.semester_number, Semester.id)
+                    .where(tuple_(Semester.batch_id, Semester.semester_number).in_(chunk))
+                ).all()
+            })
+        return result
+
+    found = fetch(list(keys))
+    missing = [key for key in keys if key not in found]
+    if missing:
+        now = datetime.utcnow()
+        curriculum_cache.bump_after_commit(db)
+        stmt = dialect_insert(db, Semester.__table__).on_conflict_do_nothing(
+            index_elements=["batch_id", "semester_number"]
+        )
+        db.execute(stmt, [
+            {
+                "batch_id": batch_id,
+                "semester_number": number,
+                "academic_year": f"{keys[(batch_id, number)]}-{int(keys[(batch_id, number)]) + 1}",
+                "created_at": now,
+                "updated_at": now,
+            }
+            for batch_id, number in missing
+        ])
+        found.update(fetch(missing))
+    return found
+
+
+def assign_subjects(db: Session, batch_semesters: Iterable[Tuple[int, int]], subject_ids: Iterable[int]) -> int:
+    """Map every subject to every (batch_id, semester_id); returns rows inserted
+
+    One INSERT ... ON CONFLICT DO NOTHING on unique_batch_semester_subject,
+    so pairs that already exist are skipped by the database.
+    """
+    subject_ids = list(subject_ids)
+    now = datetime.utcnow()
+    rows = [
+        {"batch_id": batch_id, "semester_id": semester_id, "subject_id": subject_id,
+         "created_at": now, "updated_at": now}
+        for batch_id, semester_id in batch_semesters
+        for subject_id in subject_ids
+    ]
+    if not rows:
+        return 0
+    stmt = (
+        dialect_insert(db, BatchSubject.__table__)
+        .on_conflict_do_nothing(index_elements=["batch_id", "semester_id", "subject_id"])
+        .returning(BatchSubject.id)
+    )
+    inserted = len(db.execute(stmt, rows).all())
+    curriculum_cache.bump_after_commit(db)
+    return inserted
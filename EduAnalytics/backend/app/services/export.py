@@ -0,0 +1,189 @@
+"""
+Streaming export of a batch's marks
+- One Core select over marks/students/semesters/subjects, fetched with
+  yield_per so only one chunk of rows is in memory at a time
+- Every chunk is encoded and sent as soon as it arrives (CSV, NDJSON or
+  Parquet row groups), so the first bytes go out before the query finishes
+- CSV uses the upload columns (CSV_COLUMNS) plus a trailing Grade column that
+  upload ignores, so an export can be uploaded again without turning computed
+  grades into entered ones
+- Parquet needs the optional pyarrow package
+"""
+
+import csv
+import io
+import logging
+from typing import Iterator, List, Optional, Sequence
+
+import orjson
+from sqlalchemy import func, select
+
+from app.db.database import SessionLocal
+from app.db.models import Batch, Mark, Semester, Student, Subject
+from app.db.read_models import SHOWN_SEM_GRADE
+from app.services.csv_ingest import CSV_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+CSV = "csv"
+NDJSON = "ndjson"
+PARQUET = "parquet"
+
+MEDIA_TYPES = {
+    CSV: "text/csv",
+    NDJSON: "application/x-ndjson",
+    PARQUET: "application/vnd.apache.parquet",
+}
+
+# Shown grade (entered or computed); not an upload column, parse_row() skips it
+SHOWN_GRADE_FIELD = "Grade"
+EXPORT_FIELDS = CSV_COLUMNS + (SHOWN_GRADE_FIELD,)
+
+# Same order as EXPORT_FIELDS; SEM_Grade is the grade as entered, so a
+# re-upload stores exactly the grades someone entered
+EXPORT_COLUMNS = (
+    Student.register_no,
+    Student.name,
+    func.coalesce(Student.email, ""),
+    Batch.batch_year,
+    Semester.semester_number,
+    Subject.name,
+    Mark.ca1,
+    Mark.ca2,
+    Mark.ca3,
+    Mark.semester_marks,
+    Student.date_of_birth,
+    func.coalesce(Mark.sem_grade, ""),
+    SHOWN_SEM_GRADE,
+)
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def export_query(batch_id: int, semester_number: Optional[int] = None):
+    """Marks of one batch (optionally one semester), grouped by student"""
+    stmt = (
+        select(*EXPORT_COLUMNS)
+        .select_from(Mark)
+        .join(Student, Student.id == Mark.student_id)
+        .join(Batch, Batch.id == Student.batch_id)
+        .join(Semester, Semester.id == Mark.semester_id)
+        .join(Subject, Subject.id == Mark.subject_id)
+        .where(Student.batch_id == batch_id)
+        # The order the student -> marks index join already produces: no sort
+        # step, so the first rows arrive at once however large the batch is
+        .order_by(Student.id, Mark.id)
+    )
+    if semester_number is not None:
+        stmt = stmt.where(Semester.semester_number == semester_number)
+    return stmt
+
+
+def iter_row_chunks(batch_id: int, semester_number: Optional[int], chunk_rows: int) -> Iterator[List[tuple]]:
+    """Rows of export_query() in chunks of `chunk_rows`, on a session of its own
+
+    The request's session is closed before a streamed body is sent, so the
+    generator opens (and on exhaustion or disconnect, closes) its own.
+    """
+    with SessionLocal() as db:
+        result = db.execute(
+            export_query(batch_id, semester_number),
+            execution_options={"yield_per": chunk_rows},
+        )
+        exported = 0
+        for rows in result.partitions():
+            exported += len(rows)
+            yield rows
+        logger.info("Exported %s marks of batch %s", exported, batch_id)
+
+
+def _cell(value) -> str:
+    return "" if value is None else value
+
+
+def iter_csv(chunks: Iterator[Sequence[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue().encode("utf-8")
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([[_cell(value) for value in row] for row in rows])
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_ndjson(chunks: Iterator[Sequence[tuple]]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield b"".join(orjson.dumps(dict(zip(EXPORT_FIELDS, row))) + b"\n" for row in rows)
+
+
+class _DrainSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain()
+
+    pyarrow takes footer offsets from tell(), so the position keeps counting
+    even though the bytes already sent are dropped.
+    """
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _parquet_schema():
+    text, number = pa.string(), pa.float64()
+    types = (text, text, text, text, pa.int32(), text, number, number, number, number, text, text, text)
+    return pa.schema(list(zip(EXPORT_FIELDS, types)))
+
+
+def iter_parquet(chunks: Iterator[Sequence[tuple]]) -> Iterator[bytes]:
+    """One Parquet row group per chunk"""
+    schema = _parquet_schema()
+    sink = _DrainSink()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema) as writer:
+        for rows in chunks:
+            columns = list(zip(*rows)) if rows else [()] * len(EXPORT_FIELDS)
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            yield sink.drain()
+    yield sink.drain()
+
+
+ENCODERS = {
+    CSV: iter_csv,
+    NDJSON: iter_ndjson,
+    PARQUET: iter_parquet,
+}
+
+
+def stream_export(export_format: str, batch_id: int, semester_number: Optional[int],
+                  chunk_rows: int) -> Iterator[bytes]:
+    """Encoded export body, produced chunk by chunk"""
+    return ENCODERS[export_format](iter_row_chunks(batch_id, semester_number, chunk_rows))
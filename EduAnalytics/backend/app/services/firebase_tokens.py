@@ -0,0 +1,181 @@
+"""
+Firebase ID-token verification without a network round trip per login
+- Google's signing keys (JWKS) are held in memory and refreshed in the
+  background on the schedule their Cache-Control max-age sets
+- An unknown key id triggers one early refresh (rate limited), for key rotation
+- Verified tokens are cached until they expire, keyed on their signature
+- FIREBASE_JWKS_FILE swaps the Google endpoint for a local key-set file, so
+  verification can run (and be tested) offline
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+import urllib.request
+from typing import Dict, Optional
+
+from jose import JWTError, jwt
+from jose.exceptions import JOSEError
+
+from app.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_JWKS_URL = "https://www.googleapis.com/service_accounts/v1/jwk/securetoken@system.gserviceaccount.com"
+ISSUER_PREFIX = "https://securetoken.google.com/"
+
+# Never refetch an unknown key id more often than this
+MIN_REFRESH_INTERVAL_SECONDS = 60
+# Tokens issued slightly in the future by a skewed clock are still accepted
+CLOCK_SKEW_SECONDS = 60
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class JWKSKeyStore:
+    """Signing keys by key id, loaded from a JWKS URL or a local file"""
+
+    def __init__(self, url: str = GOOGLE_JWKS_URL, path: Optional[str] = None,
+                 refresh_seconds: int = 3600, fetch_timeout: float = 5.0):
+        self.url = url
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.fetch_timeout = fetch_timeout
+        self.refreshes = 0
+        self.failed_refreshes = 0
+        self._keys: Dict[str, dict] = {}
+        self._expires_at = 0.0
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def source(self) -> str:
+        return self.path or self.url
+
+    def _fetch(self) -> tuple:
+        """(JWKS document, seconds it may be cached)"""
+        if self.path:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f), self.refresh_seconds
+        with urllib.request.urlopen(self.url, timeout=self.fetch_timeout) as response:
+            match = _MAX_AGE.search(response.headers.get("Cache-Control", ""))
+            max_age = int(match.group(1)) if match else self.refresh_seconds
+            return json.loads(response.read()), min(max_age, self.refresh_seconds)
+
+    def refresh(self) -> bool:
+        """Reload the key set; the current keys stay in use if loading fails"""
+        try:
+            document, max_age = self._fetch()
+            keys = {key["kid"]: key for key in document.get("keys", []) if "kid" in key}
+            if not keys:
+                raise ValueError("key set contains no keys")
+        except Exception as e:
+            with self._lock:
+                self.failed_refreshes += 1
+                self._last_refresh = time.monotonic()
+            logger.warning("Firebase key set refresh from %s failed: %s", self.source, e)
+            return False
+        with self._lock:
+            self._keys = keys
+            now = time.monotonic()
+            self._last_refresh = now
+            self._expires_at = now + max_age
+            self.refreshes += 1
+        return True
+
+    def get(self, kid: str) -> Optional[dict]:
+        """Key for `kid`, loading or refreshing the key set only when it has to"""
+        with self._lock:
+            key = self._keys.get(kid)
+            now = time.monotonic()
+            stale = now >= self._expires_at
+            may_refresh = not self._keys or now - self._last_refresh >= MIN_REFRESH_INTERVAL_SECONDS
+        # A known key is used even when stale while the background thread
+        # (or a recent failed attempt) is responsible for refreshing it
+        if key is not None and (not stale or self._thread is not None or not may_refresh):
+            return key
+        if key is None and not may_refresh:
+            return None
+        self.refresh()
+        with self._lock:
+            return self._keys.get(kid, key)
+
+    def start(self) -> None:
+        """Load the keys now and keep them fresh from a daemon thread"""
+        if self._thread is not None:
+            return
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="firebase-jwks-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                # Refresh a little before expiry; retry failures after a minute
+                wait = max(self._expires_at - time.monotonic() - MIN_REFRESH_INTERVAL_SECONDS,
+                           MIN_REFRESH_INTERVAL_SECONDS)
+            if self._stop.wait(wait):
+                return
+            self.refresh()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"source": self.source, "keys": sorted(self._keys),
+                    "expires_in_seconds": round(max(self._expires_at - time.monotonic(), 0), 1),
+                    "refreshes": self.refreshes, "failed_refreshes": self.failed_refreshes,
+                    "background_refresh": self._thread is not None}
+
+
+class FirebaseTokenVerifier:
+    """Verify Firebase ID tokens (RS256) for one project against a JWKSKeyStore"""
+
+    def __init__(self, project_id: str, keys: JWKSKeyStore, cache_size: int = 1000):
+        self.project_id = project_id
+        self.keys = keys
+        # The TTL is capped per entry by the token's own expiry
+        self.verified = TTLCache("firebase_tokens", cache_size, 3600)
+
+    def verify(self, id_token: str) -> Optional[dict]:
+        """Decoded claims of a valid token, None otherwise"""
+        cache_key = id_token.rsplit(".", 1)[-1]
+        claims = self.verified.get(cache_key)
+        if claims is not None:
+            return claims
+
+        try:
+            header = jwt.get_unverified_header(id_token)
+            if header.get("alg") != "RS256":
+                raise JWTError(f"unexpected algorithm {header.get('alg')}")
+            key = self.keys.get(header.get("kid", ""))
+            if key is None:
+                raise JWTError(f"unknown signing key {header.get('kid')}")
+            claims = jwt.decode(
+                id_token, key, algorithms=["RS256"],
+                audience=self.project_id, issuer=ISSUER_PREFIX + self.project_id,
+                options={"leeway": CLOCK_SKEW_SECONDS},
+            )
+            if not claims.get("sub") or "exp" not in claims:
+                raise JWTError("token has no subject or expiry")
+            if claims.get("auth_time", 0) > time.time() + CLOCK_SKEW_SECONDS:
+                raise JWTError("auth_time is in the future")
+        except (JOSEError, ValueError) as e:
+            logger.info("Firebase token rejected: %s", e)
+            return None
+
+        claims.setdefault("uid", claims["sub"])
+        self.verified.set(cache_key, claims, claims["exp"] - time.time())
+        return claims
+
+    def stats(self) -> dict:
+        return {"project_id": self.project_id, "keys": self.keys.stats(), "tokens": self.verified.stats()}
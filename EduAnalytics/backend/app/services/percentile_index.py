@@ -0,0 +1,74 @@
+"""
+In-process percentile index for class performance
+- One sorted array of student CA averages per batch
+- Percentile and class average are answered with bisect in O(log n)
+- Entries are dropped after any commit that changes the batch's aggregates
+- Every lookup also compares batches.marks_version (one primary-key read), so
+  commits made by other worker processes are picked up as well
+"""
+
+import threading
+from bisect import bisect_right
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models import Batch
+from app.services.aggregates import batch_change_listeners, get_batch_ca_averages
+
+
+class BatchAverages:
+    """Sorted CA averages of one batch"""
+
+    __slots__ = ("values", "total")
+
+    def __init__(self, values: List[float]):
+        self.values = sorted(values)
+        self.total = sum(self.values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def class_average(self) -> float:
+        return self.total / len(self.values) if self.values else 0
+
+    def percentile(self, value: float) -> float:
+        """Share of the batch at or below `value`, in percent"""
+        if not self.values:
+            return 0
+        return bisect_right(self.values, value) / len(self.values) * 100
+
+
+class BatchPercentileIndex:
+    """Per-batch BatchAverages cache, keyed on the batch's marks_version"""
+
+    def __init__(self):
+        self._entries: Dict[int, Tuple[int, BatchAverages]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, batch_id: int) -> BatchAverages:
+        # Bumped in the same transaction as any aggregate change, by whichever
+        # process made it; the in-process invalidate() alone misses other workers
+        version = db.scalar(select(Batch.marks_version).where(Batch.id == batch_id)) or 0
+        cached = self._entries.get(batch_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        # Read after the version, so the averages are never older than it
+        entry = BatchAverages(get_batch_ca_averages(db, batch_id))
+        with self._lock:
+            current = self._entries.get(batch_id)
+            if current is None or current[0] <= version:
+                self._entries[batch_id] = (version, entry)
+        return entry
+
+    def invalidate(self, batch_ids) -> None:
+        with self._lock:
+            for batch_id in batch_ids:
+                self._entries.pop(batch_id, None)
+
+
+percentile_index = BatchPercentileIndex()
+batch_change_listeners.append(percentile_index.invalidate)
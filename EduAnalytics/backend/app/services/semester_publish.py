@@ -0,0 +1,168 @@
+"""
+Set-based publishing of one semester's results
+- Register numbers, subject names and mark ids are resolved with a few chunked
+  IN queries instead of one lookup per result
+- The whole payload is validated first; nothing is written unless every
+  entry matches an existing mark and carries valid marks or a valid grade
+- Every result is written by one executemany UPDATE, and sem_published is
+  flipped for the semester by one set-based UPDATE
+- Aggregates, marks versions (ETags) and percentile caches are refreshed once
+"""
+
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+from sqlalchemy import and_, bindparam, select, update
+from sqlalchemy.orm import Session
+
+from app.db.bulk import chunked
+from app.db.models import Mark, Semester, Student, Subject
+from app.services.aggregates import refresh_student_aggregates
+from app.utils.grade_converter import FAIL_GRADE, GRADE_TO_MIDPOINT, MAX_MARKS, grades_from_marks
+
+logger = logging.getLogger(__name__)
+
+# register_no -> subject name -> semester marks or grade
+SemesterResults = Dict[str, Dict[str, Union[float, str]]]
+
+
+@dataclass
+class PublishResult:
+    students: int = 0
+    updated: int = 0
+    published: int = 0
+    errors: List[str] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+
+def _parse_result(value: Union[float, str]):
+    """(semester marks, entered grade or None) for one payload value; ValueError when invalid"""
+    if isinstance(value, str):
+        grade = value.strip().upper()
+        if grade not in GRADE_TO_MIDPOINT:
+            raise ValueError(f"'{value}' is not a grade ({', '.join(GRADE_TO_MIDPOINT)})")
+        # Stored as the grade's midpoint, as parse_row() does for grade-only CSV rows
+        return GRADE_TO_MIDPOINT[grade], grade
+    marks = float(value)
+    if math.isnan(marks) or not 0 <= marks <= MAX_MARKS:
+        raise ValueError(f"semester marks {value} are outside 0-{MAX_MARKS}")
+    return marks, None
+
+
+def _resolve_marks(db: Session, semester: Semester, results: SemesterResults,
+                   result: PublishResult) -> Dict[tuple, Tuple[int, int]]:
+    """(register_no, subject name) -> (mark id, student id); unmatched entries become errors"""
+    students: Dict[str, int] = {}
+    for chunk in chunked(results):
+        students.update(db.execute(
+            select(Student.register_no, Student.id)
+            .where(Student.batch_id == semester.batch_id, Student.register_no.in_(chunk))
+        ).all())
+
+    subject_names = {name for subjects in results.values() for name in subjects}
+    subjects: Dict[str, int] = {}
+    for chunk in chunked(subject_names):
+        subjects.update(db.execute(select(Subject.name, Subject.id).where(Subject.name.in_(chunk))).all())
+
+    marks: Dict[tuple, int] = {}
+    for chunk in chunked(students.values()):
+        for mark_id, student_id, subject_id in db.execute(
+            select(Mark.id, Mark.student_id, Mark.subject_id)
+            .where(Mark.semester_id == semester.id, Mark.student_id.in_(chunk))
+        ):
+            marks[(student_id, subject_id)] = mark_id
+
+    resolved: Dict[tuple, Tuple[int, int]] = {}
+    for register_no, entries in results.items():
+        student_id = students.get(register_no)
+        if student_id is None:
+            result.errors.append(f"{register_no}: no such student in this batch")
+            continue
+        for subject_name in entries:
+            mark_id = marks.get((student_id, subjects.get(subject_name)))
+            if mark_id is None:
+                result.errors.append(f"{register_no}: no {subject_name} mark in semester {semester.semester_number}")
+            else:
+                resolved[(register_no, subject_name)] = (mark_id, student_id)
+    return resolved
+
+
+def publish_semester_results(db: Session, semester: Semester, results: SemesterResults) -> PublishResult:
+    """Write and publish the semester results of one batch in the session's transaction
+
+    Returns with `errors` filled and nothing written when any entry is invalid;
+    the caller commits on success.
+    """
+    started = time.perf_counter()
+    result = PublishResult()
+    resolved = _resolve_marks(db, semester, results, result)
+
+    student_ids = {student_id for _, student_id in resolved.values()}
+    ids: List[int] = []
+    marks: List[float] = []
+    entered_grades: List[str] = []
+    for (register_no, subject_name), (mark_id, _) in resolved.items():
+        try:
+            semester_marks, grade = _parse_result(results[register_no][subject_name])
+        except ValueError as e:
+            result.errors.append(f"{register_no} / {subject_name}: {e}")
+            continue
+        ids.append(mark_id)
+        marks.append(semester_marks)
+        entered_grades.append(grade)
+    if result.errors:
+        return result
+
+    # Grade bands for the whole payload in one array pass; like computed_mark_arrays,
+    # marks that are not above 0 get no grade
+    marks_array = np.array(marks, dtype=np.float64)
+    grades = grades_from_marks(np.where(marks_array > 0, marks_array, np.nan)).tolist()
+    now = datetime.utcnow()
+    params = [
+        {
+            "mark_id": mark_id,
+            "new_marks": semester_marks,
+            # The grade as entered; numeric results clear an earlier one
+            "new_sem_grade": entered,
+            "new_grade": grade,
+            "grade_passed": grade != FAIL_GRADE,
+        }
+        for mark_id, semester_marks, entered, grade in zip(ids, marks, entered_grades, grades)
+    ]
+    table = Mark.__table__
+    # Core UPDATEs skip the Mark hooks; ca_passed is unchanged, so is_passed
+    # is recomputed from the stored column (see computed_mark_values)
+    db.execute(
+        update(table)
+        .where(table.c.id == bindparam("mark_id"))
+        .values(
+            semester_marks=bindparam("new_marks"),
+            sem_grade=bindparam("new_sem_grade"),
+            computed_grade=bindparam("new_grade"),
+            is_passed=and_(table.c.ca_passed, bindparam("grade_passed")),
+            updated_at=now,
+        ),
+        params,
+    )
+    result.updated = len(params)
+
+    # Semester results count as published once semester marks exist
+    pending = and_(table.c.semester_id == semester.id, table.c.semester_marks > 0, table.c.sem_published.isnot(True))
+    flipped_students = set(db.scalars(select(table.c.student_id).where(pending).distinct()))
+    result.published = db.execute(
+        update(table).where(pending).values(sem_published=True, updated_at=now)
+    ).rowcount
+
+    result.students = len(student_ids)
+    refresh_student_aggregates(db, student_ids | flipped_students)
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"Semester publish: semester {semester.id} of batch {semester.batch_id}, {result.updated} results, "
+        f"{result.published} marks published, {result.elapsed_ms:.0f}ms"
+    )
+    return result
@@ -0,0 +1,193 @@
+"""
+Background CSV upload jobs
+- Uploads are spooled to a temp file and handed to a thread pool
+- Each job runs the chunked ingestion engine with its own DB session
+- Progress (rows, rows/s, errors, ETA) is written to the csv_upload_jobs table
+  once per chunk, so any worker process can answer a poll for any job
+- A job runs in the process that took the upload (the spool file is local);
+  if that process dies, its job stays in "running"
+"""
+
+import csv
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import BinaryIO, List, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import CSVUploadJob
+from app.services.csv_ingest import (
+    IngestResult,
+    fail_upload_log,
+    finish_upload_log,
+    ingest_csv_rows,
+    iter_text_lines,
+    start_upload_log,
+)
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept per admin for polling before the oldest are dropped
+MAX_FINISHED_JOBS = 100
+# Row errors stored with a job
+MAX_JOB_ERRORS = 50
+
+
+class _CountingReader:
+    """Wraps a binary file and counts the bytes handed out"""
+
+    def __init__(self, fileobj: BinaryIO):
+        self._fileobj = fileobj
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def _progress_values(result: IngestResult, bytes_read: int) -> dict:
+    error_messages = result.error_messages
+    return {
+        "bytes_processed": bytes_read,
+        "rows_processed": result.total_rows,
+        "success_count": result.success_count,
+        "error_count": len(error_messages),
+        "errors": json.dumps(error_messages[:MAX_JOB_ERRORS]),
+    }
+
+
+def job_to_dict(job: CSVUploadJob) -> dict:
+    """Polling view of a job: rows processed, rows/s, errors and ETA"""
+    elapsed = 0.0
+    if job.started_at:
+        elapsed = ((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds()
+    eta = None
+    if job.finished_at:
+        eta = 0.0
+    elif job.status == "running" and job.bytes_processed and job.total_bytes:
+        # Remaining time extrapolated from the share of the file consumed so far
+        remaining = max(job.total_bytes - job.bytes_processed, 0)
+        eta = round(elapsed * remaining / job.bytes_processed, 1)
+    return {
+        "job_id": job.id,
+        "filename": job.filename,
+        "status": job.status,
+        "rows_processed": job.rows_processed,
+        "success_count": job.success_count,
+        "error_count": job.error_count,
+        "errors": json.loads(job.errors) if job.errors else [],
+        "rows_per_second": round(job.rows_processed / elapsed, 1) if elapsed > 0 else 0.0,
+        "bytes_processed": job.bytes_processed,
+        "total_bytes": job.total_bytes,
+        "eta_seconds": eta,
+        "elapsed_seconds": round(elapsed, 2),
+        "upload_log_id": job.upload_log_id,
+        "error": job.error,
+    }
+
+
+class UploadJobRunner:
+    """Thread-pool backed queue of CSV upload jobs; state lives in csv_upload_jobs"""
+
+    def __init__(self, max_workers: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="csv-upload")
+
+    def submit(self, db: Session, admin_id: int, filename: str, fileobj: BinaryIO, chunk_rows: int) -> CSVUploadJob:
+        """Spool the upload to disk, record the job and queue it; returns immediately"""
+        spool = tempfile.NamedTemporaryFile(prefix="csv-upload-", suffix=".csv", delete=False)
+        with spool:
+            shutil.copyfileobj(fileobj, spool, 1024 * 1024)
+        job = CSVUploadJob(
+            id=uuid.uuid4().hex,
+            admin_id=admin_id,
+            filename=filename,
+            status="queued",
+            total_bytes=os.path.getsize(spool.name),
+        )
+        db.add(job)
+        self._prune(db, admin_id)
+        db.commit()
+        self._executor.submit(self._run, job.id, spool.name, chunk_rows)
+        return job
+
+    def get(self, db: Session, job_id: str) -> Optional[CSVUploadJob]:
+        return db.get(CSVUploadJob, job_id)
+
+    def list_for_admin(self, db: Session, admin_id: int) -> List[CSVUploadJob]:
+        return db.scalars(
+            select(CSVUploadJob)
+            .where(CSVUploadJob.admin_id == admin_id)
+            .order_by(CSVUploadJob.created_at.desc())
+        ).all()
+
+    def _prune(self, db: Session, admin_id: int) -> None:
+        kept = (
+            select(CSVUploadJob.id)
+            .where(CSVUploadJob.admin_id == admin_id, CSVUploadJob.finished_at.isnot(None))
+            .order_by(CSVUploadJob.finished_at.desc())
+            .limit(MAX_FINISHED_JOBS)
+        )
+        db.execute(delete(CSVUploadJob).where(
+            CSVUploadJob.admin_id == admin_id,
+            CSVUploadJob.finished_at.isnot(None),
+            CSVUploadJob.id.not_in(kept),
+        ))
+
+    def _run(self, job_id: str, path: str, chunk_rows: int) -> None:
+        db = SessionLocal()
+        job = db.get(CSVUploadJob, job_id)
+        upload_log = None
+
+        def save(**values) -> None:
+            db.execute(update(CSVUploadJob).where(CSVUploadJob.id == job_id).values(**values))
+            db.commit()
+
+        try:
+            upload_log = start_upload_log(db, job.admin_id, job.filename)
+            save(status="running", started_at=datetime.utcnow(), upload_log_id=upload_log.id)
+            with open(path, "rb") as fh:
+                reader = _CountingReader(fh)
+                # Called after each chunk is committed
+                result = ingest_csv_rows(
+                    db,
+                    csv.DictReader(iter_text_lines(reader)),
+                    chunk_rows=chunk_rows,
+                    progress=lambda progress: save(**_progress_values(progress, reader.bytes_read)),
+                    upload_id=upload_log.id,
+                )
+                bytes_read = reader.bytes_read
+            finish_upload_log(db, upload_log, result)
+            save(
+                status="completed" if result.success_count > 0 else "failed",
+                finished_at=datetime.utcnow(),
+                **_progress_values(result, bytes_read),
+            )
+            logger.info(
+                f"CSV upload job {job_id} ({job.filename}) finished: {result.total_rows} rows, "
+                f"{result.rows_per_second:.0f} rows/s"
+            )
+        except Exception as e:
+            db.rollback()
+            if upload_log is not None:
+                fail_upload_log(db, upload_log, str(e))
+            save(status="failed", error=str(e), finished_at=datetime.utcnow())
+            logger.exception(f"CSV upload job {job_id} failed")
+        finally:
+            db.close()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+upload_jobs = UploadJobRunner(max_workers=settings.CSV_UPLOAD_WORKERS)
@@ -1,28 +1,54 @@
 """
 Grade Conversion Utilities for Semester Examination
 Converts between grades and numeric values according to grading scheme
+- GRADE_BANDS is the one threshold table; every grade rule in the app
+  (Mark columns and their SQL twin, analytics, these helpers) reads it
+- Scalar helpers convert one value; the array helpers convert whole NumPy
+  columns at once with np.searchsorted over the same table
 """
 
-# Grading Scheme Mapping
-GRADE_RANGES = {
-    'O': (91, 100),      # Outstanding
-    'A+': (81, 90),      # Excellent
-    'A': (71, 80),       # Very Good
-    'B+': (61, 70),      # Good
-    'B': (56, 60),       # Average
-    'C': (50, 55),       # Satisfactory
-    'RA': (0, 49)        # Re-Appear
+import math
+
+import numpy as np
+
+# Grading Scheme: (lowest mark, grade), highest band first; anything lower is RA
+GRADE_BANDS = [(91, 'O'), (81, 'A+'), (71, 'A'), (61, 'B+'), (56, 'B'), (50, 'C')]
+FAIL_GRADE = 'RA'
+MAX_MARKS = 100
+
+CA_PASS_MARK = 30      # Minimum CA average to pass
+MIN_CA_EXAMS = 2       # CA average needs at least this many CA marks
+
+# Highest grade first, RA last
+GRADES = [grade for _, grade in GRADE_BANDS] + [FAIL_GRADE]
+
+GRADE_NAMES = {
+    'O': 'Outstanding',
+    'A+': 'Excellent',
+    'A': 'Very Good',
+    'B+': 'Good',
+    'B': 'Average',
+    'C': 'Satisfactory',
+    'RA': 'Re-Appear',
 }
 
-GRADE_TO_MIDPOINT = {
-    'O': 95.5,      # (91+100)/2
-    'A+': 85.5,     # (81+90)/2
-    'A': 75.5,      # (71+80)/2
-    'B+': 65.5,     # (61+70)/2
-    'B': 58,        # (56+60)/2
-    'C': 52.5,      # (50+55)/2
-    'RA': 24.5      # (0+49)/2
+# Derived from GRADE_BANDS: each band runs up to one below the next band's lowest mark
+_BAND_LOWS = [lowest for lowest, _ in GRADE_BANDS] + [0]
+GRADE_RANGES = {
+    grade: (low, (_BAND_LOWS[i - 1] - 1) if i else MAX_MARKS)
+    for i, (grade, low) in enumerate(zip(GRADES, _BAND_LOWS))
 }
+# e.g. O: (91+100)/2 = 95.5, RA: (0+49)/2 = 24.5
+GRADE_TO_MIDPOINT = {grade: (low + high) / 2 for grade, (low, high) in GRADE_RANGES.items()}
+
+# Lookup arrays for np.searchsorted, lowest band first: a mark's index is the
+# number of band thresholds it reaches (0 = RA ... len(GRADE_BANDS) = O)
+_THRESHOLDS = np.array([lowest for lowest, _ in reversed(GRADE_BANDS)], dtype=np.float64)
+_GRADES_ASCENDING = np.array([FAIL_GRADE] + [grade for _, grade in reversed(GRADE_BANDS)], dtype=object)
+# Grade labels sorted as strings, for the reverse lookup
+_LABELS = np.array(sorted(GRADE_TO_MIDPOINT))
+_LABEL_MIDPOINTS = np.array([GRADE_TO_MIDPOINT[label] for label in _LABELS], dtype=np.float64)
+
 
 def get_grade_from_marks(marks: float) -> str:
     """
@@ -32,27 +58,19 @@ def get_grade_from_marks(marks: float) -> str:
         marks: Float value between 0-100
         
     Returns:
-        Letter grade: O, A+, A, B+, B, C, or RA
+        Letter grade: O, A+, A, B+, B, C, or RA (None when marks are missing)
     """
     if marks is None:
         return None
-        
+    
     marks = float(marks)
+    if math.isnan(marks):
+        return None
     
-    if marks >= 91:
-        return 'O'
-    elif marks >= 81:
-        return 'A+'
-    elif marks >= 71:
-        return 'A'
-    elif marks >= 61:
-        return 'B+'
-    elif marks >= 56:
-        return 'B'
-    elif marks >= 50:
-        return 'C'
-    else:
-        return 'RA'
+    for lowest, grade in GRADE_BANDS:
+        if marks >= lowest:
+            return grade
+    return FAIL_GRADE
 
 
 def get_numeric_from_grade(grade: str) -> float:
@@ -68,10 +86,69 @@ def get_numeric_from_grade(grade: str) -> float:
     """
     if grade is None:
         return None
-        
+    
     return GRADE_TO_MIDPOINT.get(grade.upper(), None)
 
 
+def grade_indices_from_marks(marks: np.ndarray) -> np.ndarray:
+    """
+    Band index per mark: 0 = RA, 1 = C ... len(GRADE_BANDS) = O
+    
+    NaN marks get the index one past O; mask them with np.isnan when it matters.
+    """
+    return np.searchsorted(_THRESHOLDS, np.asarray(marks, dtype=np.float64), side='right')
+
+
+def grades_from_marks(marks: np.ndarray) -> np.ndarray:
+    """
+    Array version of get_grade_from_marks
+    
+    Args:
+        marks: Array of numeric marks; NaN for missing
+        
+    Returns:
+        Object array of letter grades, None where the mark is NaN
+    """
+    marks = np.asarray(marks, dtype=np.float64)
+    missing = np.isnan(marks)
+    indices = grade_indices_from_marks(marks)
+    indices[missing] = 0
+    grades = _GRADES_ASCENDING[indices]
+    grades[missing] = None
+    return grades
+
+
+def midpoints_from_grades(grades) -> np.ndarray:
+    """
+    Array version of get_numeric_from_grade
+    
+    Args:
+        grades: Sequence or array of letter grades (any case, None allowed)
+        
+    Returns:
+        Float array of midpoints, NaN for None or unknown grades
+    """
+    labels = np.char.upper(np.asarray(grades, dtype=str))
+    if not labels.size:
+        return np.empty(labels.shape, dtype=np.float64)
+    positions = np.minimum(np.searchsorted(_LABELS, labels), len(_LABELS) - 1)
+    return np.where(_LABELS[positions] == labels, _LABEL_MIDPOINTS[positions], np.nan)
+
+
+def grade_distribution(marks: np.ndarray) -> dict:
+    """
+    Count of each grade over an array of numeric marks (NaN skipped)
+    
+    Returns:
+        Dictionary with counts, highest grade first: {'O': n, 'A+': n, ...}
+    """
+    marks = np.asarray(marks, dtype=np.float64)
+    indices = grade_indices_from_marks(marks[~np.isnan(marks)])
+    counts = np.bincount(indices, minlength=len(_GRADES_ASCENDING))
+    by_grade = dict(zip(_GRADES_ASCENDING.tolist(), counts.tolist()))
+    return {grade: by_grade[grade] for grade in GRADES}
+
+
 def validate_grade(grade: str) -> bool:
     """
     Validate if grade is in accepted format
@@ -84,8 +161,8 @@ def validate_grade(grade: str) -> bool:
     """
     if grade is None:
         return True  # None is valid (not yet published)
-        
-    return grade.upper() in GRADE_RANGES or grade.upper() in GRADE_TO_MIDPOINT
+    
+    return grade.upper() in GRADE_RANGES
 
 
 def get_grade_description(grade: str) -> str:
@@ -98,16 +175,13 @@ def get_grade_description(grade: str) -> str:
     Returns:
         Description string
     """
-    descriptions = {
-        'O': 'Outstanding (91-100)',
-        'A+': 'Excellent (81-90)',
-        'A': 'Very Good (71-80)',
-        'B+': 'Good (61-70)',
-        'B': 'Average (56-60)',
-        'C': 'Satisfactory (50-55)',
-        'RA': 'Re-Appear (<50)'
-    }
-    return descriptions.get(grade.upper(), 'Unknown')
+    grade = grade.upper()
+    if grade not in GRADE_NAMES:
+        return 'Unknown'
+    low, high = GRADE_RANGES[grade]
+    if grade == FAIL_GRADE:
+        return f'{GRADE_NAMES[grade]} (<{high + 1})'
+    return f'{GRADE_NAMES[grade]} ({low}-{high})'
 
 
 def is_pass_grade(grade: str) -> bool:
@@ -122,7 +196,7 @@ def is_pass_grade(grade: str) -> bool:
     """
     if grade is None:
         return None
-    return grade.upper() != 'RA'
+    return grade.upper() != FAIL_GRADE
 
 
 def get_ca_pass_status(ca_total: float) -> bool:
@@ -139,7 +213,7 @@ def get_ca_pass_status(ca_total: float) -> bool:
     """
     if ca_total is None:
         return False
-    return float(ca_total) >= 30
+    return float(ca_total) >= CA_PASS_MARK
 
 
 # Grade distribution helper
@@ -153,15 +227,7 @@ def get_grade_distribution_counts(grades_list: list) -> dict:
     Returns:
         Dictionary with counts: {'O': n, 'A+': n, ...}
     """
-    distribution = {
-        'O': 0,
-        'A+': 0,
-        'A': 0,
-        'B+': 0,
-        'B': 0,
-        'C': 0,
-        'RA': 0
-    }
+    distribution = {grade: 0 for grade in GRADES}
     
     for grade in grades_list:
         if grade and grade.upper() in distribution:
@@ -0,0 +1,159 @@
+"""
+Benchmark: batch comparison statistics, per-student ORM loops vs NumPy analytics.
+Builds a throwaway SQLite database with 100k marks (2 batches x 2500 students
+x 20 subjects) and times the original compare_batches algorithm against
+app.services.analytics for the same figures.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Base, Batch, Mark, Semester, Student, Subject, computed_mark_values
+from app.services import analytics
+
+STUDENTS_PER_BATCH = 2500
+SUBJECTS = 20
+BATCH_YEARS = (2023, 2024)
+
+
+def build_database(url):
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    random.seed(42)
+
+    subjects = [Subject(name=f'Subject {i}', code=f'SUB{i:03d}') for i in range(SUBJECTS)]
+    session.add_all(subjects)
+    batches = []
+    for year in BATCH_YEARS:
+        batch = Batch(batch_year=year)
+        session.add(batch)
+        session.flush()
+        semester = Semester(batch_id=batch.id, semester_number=1, academic_year=f'{year}-{year + 1}')
+        session.add(semester)
+        session.flush()
+        batches.append((batch, semester))
+    session.flush()
+
+    for batch, semester in batches:
+        students = [
+            {'register_no': f'R{batch.batch_year}{i:05d}', 'name': f'Student {i}',
+             'email': f's{batch.batch_year}_{i}@example.com', 'date_of_birth': '01-01-2005',
+             'batch_id': batch.id}
+            for i in range(STUDENTS_PER_BATCH)
+        ]
+        session.execute(Student.__table__.insert(), students)
+        student_ids = [s.id for s in session.query(Student.id).filter(Student.batch_id == batch.id)]
+        marks = [
+            {'student_id': student_id, 'subject_id': subject.id, 'semester_id': semester.id,
+             'ca1': random.randint(10, 60), 'ca2': random.randint(10, 60),
+             'ca3': random.choice([random.randint(10, 60), None]),
+             'semester_marks': random.choice([random.randint(20, 100), None]),
+             'sem_published': False}
+            for student_id in student_ids for subject in subjects
+        ]
+        # Core inserts bypass the Mark hooks; fill in the stored derived columns
+        for mark in marks:
+            mark.update(computed_mark_values(mark['ca1'], mark['ca2'], mark['ca3'], mark['semester_marks']))
+        session.execute(Mark.__table__.insert(), marks)
+    session.commit()
+    return session, [batch.id for batch, _ in batches]
+
+
+def loop_batch_stats(db, batch_id):
+    """compare_batches before the analytics module"""
+    students = db.query(Student).filter(Student.batch_id == batch_id).all()
+    all_marks = []
+    for student in students:
+        all_marks.extend(db.query(Mark).filter(Mark.student_id == student.id).all())
+    ca_values = [(m.ca1 + m.ca2 + m.ca3) / 3 for m in all_marks if m.ca1 and m.ca2 and m.ca3]
+    sem_values = [m.semester_marks for m in all_marks if m.semester_marks]
+    return {
+        'avg_ca': sum(ca_values) / len(ca_values) if ca_values else 0,
+        'avg_sem': sum(sem_values) / len(sem_values) if sem_values else 0,
+        'passed': sum(1 for m in all_marks if m.semester_marks and m.semester_marks >= 40),
+        'total': len(all_marks),
+    }
+
+
+def loop_subject_stats(db, batch_id):
+    """Per-subject mean/std/median/pass rate computed over ORM objects"""
+    marks = db.query(Mark).join(Student).filter(Student.batch_id == batch_id).all()
+    by_subject = {}
+    for m in marks:
+        by_subject.setdefault(m.subject_id, []).append(m)
+    result = {}
+    for subject_id, subject_marks in by_subject.items():
+        averages = [m.ca_average for m in subject_marks if m.ca_average is not None]
+        result[subject_id] = {
+            'mean': statistics.fmean(averages),
+            'std': statistics.pstdev(averages),
+            'median': statistics.median(averages),
+            'passed': sum(1 for m in subject_marks if m.is_passed),
+        }
+    return result
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, time.perf_counter() - start
+
+
+def main():
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        print('=' * 70)
+        print(f'Building {len(BATCH_YEARS) * STUDENTS_PER_BATCH * SUBJECTS:,} marks...')
+        db, batch_ids = build_database(f'sqlite:///{path}')
+        print('=' * 70)
+
+        total_loop = total_numpy = 0.0
+        for batch_id in batch_ids:
+            db.expunge_all()
+            old, old_time = timed(loop_batch_stats, db, batch_id)
+            db.expunge_all()
+            marks, load_time = timed(analytics.load_marks, db, batch_id)
+            new, calc_time = timed(analytics.legacy_batch_stats, marks)
+            same = all(abs(old[key] - new[key]) < 1e-9 for key in old)
+            total_loop += old_time
+            total_numpy += load_time + calc_time
+            print(f'\nBatch {batch_id}: {new["total"]:,} marks')
+            print(f'  loop:  {old_time * 1000:8.1f} ms')
+            print(f'  numpy: {(load_time + calc_time) * 1000:8.1f} ms '
+                  f'(query {load_time * 1000:.1f} ms, stats {calc_time * 1000:.1f} ms)')
+            print(f'  {"✅" if same else "❌"} same avg_ca / avg_sem / passed / total')
+
+            db.expunge_all()
+            old_subjects, old_time = timed(loop_subject_stats, db, batch_id)
+            new_subjects, new_time = timed(analytics.summarize_by, marks, 'subject_id')
+            same = all(
+                abs(old_subjects[s]['mean'] - new_subjects[s]['ca_average']['mean']) < 1e-9
+                and old_subjects[s]['passed'] == new_subjects[s]['passed']
+                for s in old_subjects
+            )
+            print(f'  per-subject loop:  {old_time * 1000:8.1f} ms')
+            print(f'  per-subject numpy: {new_time * 1000:8.1f} ms (full summaries)')
+            print(f'  {"✅" if same else "❌"} same per-subject means and pass counts')
+
+        print('\n' + '=' * 70)
+        print(f'compare_batches total: loop {total_loop * 1000:.1f} ms, '
+              f'numpy {total_numpy * 1000:.1f} ms ({total_loop / total_numpy:.1f}x faster)')
+        print('=' * 70)
+        db.close()
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: streaming batch export (CSV / NDJSON / Parquet) over a large batch.
+Seeds a throwaway SQLite database with MARKS marks in one batch, then drains
+stream_export() for each format and reports:
+- time to the first chunk of rows and to the last byte
+- growth of the process's peak RSS while streaming, which should stay near one
+  chunk of rows regardless of the batch size
+Usage: python scripts/benchmark_export.py [marks]   (default 1,000,000)
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import os
+import random
+import resource
+import tempfile
+import time
+
+DB_FD, DB_PATH = tempfile.mkstemp(suffix='.db')
+os.close(DB_FD)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['DEBUG'] = 'false'
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.database import SessionLocal, init_db
+from app.db.models import Batch, Mark, Semester, Student, Subject, computed_mark_values
+from app.services import export
+
+MARKS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+SUBJECTS = 10
+SEMESTERS = 4
+INSERT_CHUNK = 50_000
+
+
+def seed() -> int:
+    init_db()
+    students = max(MARKS // (SUBJECTS * SEMESTERS), 1)
+    with SessionLocal() as db:
+        batch = Batch(batch_year='2024')
+        db.add(batch)
+        db.flush()
+        semesters = [Semester(batch_id=batch.id, semester_number=n, academic_year='2024-2025')
+                     for n in range(1, SEMESTERS + 1)]
+        subjects = [Subject(name=f'Subject {i}', code=f'SUB{i}') for i in range(SUBJECTS)]
+        db.add_all(semesters + subjects)
+        db.flush()
+        db.execute(Student.__table__.insert(), [
+            {'register_no': f'R2024{i:06d}', 'name': f'Student {i}', 'email': f's{i}@example.com',
+             'date_of_birth': '01-02-2005', 'batch_id': batch.id}
+            for i in range(students)
+        ])
+        student_ids = db.scalars(select(Student.id)).all()
+        rows = []
+        for sid in student_ids:
+            for semester in semesters:
+                for subject in subjects:
+                    ca1, ca2 = random.randint(10, 60), random.randint(10, 60)
+                    ca3, semester_marks = random.choice([None, random.randint(10, 60)]), random.randint(20, 100)
+                    rows.append({
+                        'student_id': sid, 'subject_id': subject.id, 'semester_id': semester.id,
+                        'ca1': ca1, 'ca2': ca2, 'ca3': ca3, 'semester_marks': semester_marks,
+                        **computed_mark_values(ca1, ca2, ca3, semester_marks),
+                    })
+                    if len(rows) == INSERT_CHUNK:
+                        db.execute(Mark.__table__.insert(), rows)
+                        rows = []
+        if rows:
+            db.execute(Mark.__table__.insert(), rows)
+        db.commit()
+        return batch.id
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(export_format: str, batch_id: int) -> None:
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    first_rows = None
+    size = 0
+    # The CSV header is sent before the query runs; time the first rows instead
+    for i, chunk in enumerate(export.stream_export(export_format, batch_id, None, settings.EXPORT_CHUNK_ROWS)):
+        if first_rows is None and (i > 0 or export_format != export.CSV) and chunk:
+            first_rows = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    print(f'{export_format:8s}: first rows {first_rows * 1000:7.1f} ms   total {total:6.2f}s   '
+          f'{size / 1e6:7.1f} MB   peak RSS +{peak_rss_mb() - rss_before:5.1f} MB')
+
+
+def main():
+    random.seed(21)
+    print(f'Seeding {MARKS:,} marks...')
+    batch_id = seed()
+    print('=' * 70)
+    print(f'Batch export: {MARKS:,} marks, chunks of {settings.EXPORT_CHUNK_ROWS}')
+    print('=' * 70)
+    formats = [export.CSV, export.NDJSON]
+    if export.parquet_available():
+        formats.append(export.PARQUET)
+    else:
+        print('(pyarrow not installed: Parquet skipped)')
+    for export_format in formats:
+        run(export_format, batch_id)
+    print('=' * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        os.remove(DB_PATH)
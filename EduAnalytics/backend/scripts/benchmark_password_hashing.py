@@ -0,0 +1,112 @@
+"""
+Benchmark: onboarding an intake through POST /api/v1/admin/students/bulk.
+Runs the app in-process against a throwaway SQLite database. Compares
+hashing a sample of passwords one by one (the old per-request cost) with the
+worker pool, then creates the whole intake while a probe keeps hitting a
+cheap endpoint, to show the event loop stays responsive during hashing.
+Scale with BCRYPT_ROUNDS / PASSWORD_HASH_WORKERS / INTAKE.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+DB_FD, DB_PATH = tempfile.mkstemp(suffix='.db')
+os.close(DB_FD)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['DEBUG'] = 'false'
+
+import httpx
+
+from app.core.config import settings
+from app.core.security import create_access_token, get_password_hash, hash_passwords, shutdown_password_pool
+from app.db.database import init_db, SessionLocal
+from app.db.models import Admin, Batch
+from app.main import app
+
+INTAKE = int(os.getenv('INTAKE', '1000'))
+SERIAL_SAMPLE = 20
+
+
+def serial_rate():
+    """Passwords per second hashed on one thread"""
+    start = time.perf_counter()
+    for i in range(SERIAL_SAMPLE):
+        get_password_hash(f'password-{i}')
+    return SERIAL_SAMPLE / (time.perf_counter() - start)
+
+
+async def probe(client, stop, latencies):
+    """Hit the health endpoint until told to stop"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get('/api/v1/health')
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+
+async def onboard(headers, batch_id):
+    students = [
+        {
+            'register_no': f'NEW{i:06d}', 'name': f'New Student {i}', 'email': f'new{i}@example.com',
+            'batch_id': batch_id, 'date_of_birth': '01-02-2006', 'password': f'intake-password-{i}',
+        }
+        for i in range(INTAKE)
+    ]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test', timeout=None) as client:
+        stop = asyncio.Event()
+        latencies = []
+        probe_task = asyncio.create_task(probe(client, stop, latencies))
+        start = time.perf_counter()
+        response = await client.post('/api/v1/admin/students/bulk', headers=headers, json={'students': students})
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe_task
+    response.raise_for_status()
+    return response.json(), elapsed, latencies
+
+
+def main():
+    init_db()
+    with SessionLocal() as db:
+        admin = Admin(email='bench@example.com', name='Bench', role='admin')
+        batch = Batch(batch_year='2026')
+        db.add_all([admin, batch])
+        db.commit()
+        headers = {'Authorization': 'Bearer ' + create_access_token({'sub': str(admin.id), 'role': 'admin'})}
+        batch_id = batch.id
+
+    print('=' * 70)
+    print(f'bcrypt rounds {settings.BCRYPT_ROUNDS}, workers {settings.PASSWORD_HASH_WORKERS or os.cpu_count()}, intake {INTAKE}')
+    print('=' * 70)
+
+    rate = serial_rate()
+    print(f'One at a time : {rate:8.1f} hashes/s  → {INTAKE / rate:7.1f}s for the intake')
+
+    hash_passwords(['warm-up'])  # start the worker processes
+    start = time.perf_counter()
+    hash_passwords([f'password-{i}' for i in range(SERIAL_SAMPLE * 4)])
+    pool_rate = SERIAL_SAMPLE * 4 / (time.perf_counter() - start)
+    print(f'Worker pool   : {pool_rate:8.1f} hashes/s  ({pool_rate / rate:.1f}x)')
+
+    result, elapsed, latencies = asyncio.run(onboard(headers, batch_id))
+    print(f"\nBulk endpoint : {result['created']} created, {result['skipped']} skipped in {elapsed:.1f}s "
+          f"(hashing {result['hashing_ms'] / 1000:.1f}s)")
+    if latencies:
+        print(f'Health probe during onboarding: {len(latencies)} requests, '
+              f'median {statistics.median(latencies) * 1000:.1f}ms, max {max(latencies) * 1000:.1f}ms')
+    print('=' * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        shutdown_password_pool()
+        os.remove(DB_PATH)
@@ -0,0 +1,138 @@
+"""
+Micro-benchmark: cost per row of serving marks, ORM + default JSON vs Core rows + orjson.
+Seeds a throwaway SQLite database with 50k marks, then builds the marks-edit
+row shape for all of them both ways, including the JSON encoding FastAPI does
+for each style of route:
+- before: ORM Mark objects with joinedload, dicts, jsonable_encoder + JSONResponse
+- after: Core select of the needed columns (EDIT_MARK_COLUMNS), dicts, ORJSONResponse
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import os
+import random
+import tempfile
+import time
+
+DB_FD, DB_PATH = tempfile.mkstemp(suffix='.db')
+os.close(DB_FD)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['DEBUG'] = 'false'
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from app.db.database import SessionLocal, init_db
+from app.db.models import Batch, Mark, Semester, Student, Subject, computed_mark_values
+from app.db.read_models import EDIT_MARK_COLUMNS
+
+STUDENTS = 5000
+SUBJECTS = 10
+ROUNDS = 3
+
+
+def seed():
+    init_db()
+    with SessionLocal() as db:
+        batch = Batch(batch_year='2024')
+        db.add(batch)
+        db.flush()
+        semester = Semester(batch_id=batch.id, semester_number=1, academic_year='2024-2025')
+        subjects = [Subject(name=f'Subject {i}', code=f'SUB{i}') for i in range(SUBJECTS)]
+        db.add(semester)
+        db.add_all(subjects)
+        db.flush()
+        db.execute(Student.__table__.insert(), [
+            {'register_no': f'R2024{i:05d}', 'name': f'Student {i}', 'email': f's{i}@example.com',
+             'date_of_birth': '01-02-2005', 'batch_id': batch.id}
+            for i in range(STUDENTS)
+        ])
+        student_ids = db.scalars(select(Student.id)).all()
+        marks = [
+            {'student_id': sid, 'subject_id': subject.id, 'semester_id': semester.id,
+             'ca1': random.randint(10, 60), 'ca2': random.randint(10, 60),
+             'ca3': random.choice([None, random.randint(10, 60)]),
+             'semester_marks': random.randint(20, 100)}
+            for sid in student_ids for subject in subjects
+        ]
+        for mark in marks:
+            mark.update(computed_mark_values(mark['ca1'], mark['ca2'], mark['ca3'], mark['semester_marks']))
+        db.execute(Mark.__table__.insert(), marks)
+        db.commit()
+
+
+def before(db):
+    marks = db.query(Mark).options(joinedload(Mark.subject), joinedload(Mark.semester)).all()
+    content = [
+        {
+            "mark_id": m.id,
+            "subject_id": m.subject_id,
+            "subject_name": m.subject.name if m.subject else "Unknown",
+            "semester": m.semester.semester_number if m.semester else 1,
+            "ca1": float(m.ca1) if m.ca1 else None,
+            "ca2": float(m.ca2) if m.ca2 else None,
+            "ca3": float(m.ca3) if m.ca3 else None,
+            "semester_marks": float(m.semester_marks) if m.semester_marks else None,
+            "sem_grade": m.computed_grade
+        }
+        for m in marks
+    ]
+    return JSONResponse(jsonable_encoder({"marks": content})).body
+
+
+def after(db):
+    marks = db.execute(
+        select(*EDIT_MARK_COLUMNS)
+        .outerjoin(Subject, Subject.id == Mark.subject_id)
+        .outerjoin(Semester, Semester.id == Mark.semester_id)
+    ).all()
+    content = [
+        {
+            "mark_id": mark_id,
+            "subject_id": subject_id,
+            "subject_name": subject_name,
+            "semester": semester,
+            "ca1": float(ca1) if ca1 else None,
+            "ca2": float(ca2) if ca2 else None,
+            "ca3": float(ca3) if ca3 else None,
+            "semester_marks": float(semester_marks) if semester_marks else None,
+            "sem_grade": sem_grade
+        }
+        for mark_id, subject_id, subject_name, semester, ca1, ca2, ca3, semester_marks, sem_grade in marks
+    ]
+    return ORJSONResponse({"marks": content}).body
+
+
+def best_of(fn):
+    times = []
+    for _ in range(ROUNDS):
+        with SessionLocal() as db:
+            start = time.perf_counter()
+            body = fn(db)
+            times.append(time.perf_counter() - start)
+    return min(times), body
+
+
+def main():
+    random.seed(20)
+    seed()
+    rows = STUDENTS * SUBJECTS
+    print('=' * 70)
+    print(f'Marks export: {rows} rows, best of {ROUNDS}')
+    print('=' * 70)
+    before_time, before_body = best_of(before)
+    after_time, after_body = best_of(after)
+    print(f'Before (ORM + jsonable_encoder) : {before_time:6.3f}s  {before_time / rows * 1e6:6.2f} µs/row  {len(before_body) / 1e6:.1f} MB')
+    print(f'After  (Core rows + orjson)     : {after_time:6.3f}s  {after_time / rows * 1e6:6.2f} µs/row  {len(after_body) / 1e6:.1f} MB')
+    print(f'Speedup: {before_time / after_time:.1f}x')
+    print('=' * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        os.remove(DB_PATH)
@@ -0,0 +1,103 @@
+"""
+Benchmark: publishing one semester's results for a large batch.
+Seeds a throwaway SQLite database with RESULTS marks (SUBJECTS per student) and
+no semester marks, then publishes a mix of marks and grades for all of them
+with publish_semester_results() in one transaction and reports:
+- time for the whole publish, commit included (target: a few seconds for 30k)
+- that every mark was written and flipped to sem_published
+Usage: python scripts/benchmark_semester_publish.py [results]   (default 30,000)
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import os
+import random
+import tempfile
+import time
+
+DB_FD, DB_PATH = tempfile.mkstemp(suffix='.db')
+os.close(DB_FD)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['DEBUG'] = 'false'
+
+from sqlalchemy import func, select
+
+from app.db.database import SessionLocal, init_db
+from app.db.models import Batch, Mark, Semester, Student, Subject, computed_mark_values
+from app.services.aggregates import rebuild_student_aggregates
+from app.services.semester_publish import publish_semester_results
+from app.utils.grade_converter import GRADES
+
+RESULTS = int(sys.argv[1]) if len(sys.argv) > 1 else 30_000
+SUBJECTS = 10
+
+
+def seed() -> int:
+    init_db()
+    students = max(RESULTS // SUBJECTS, 1)
+    with SessionLocal() as db:
+        batch = Batch(batch_year='2024')
+        db.add(batch)
+        db.flush()
+        semester = Semester(batch_id=batch.id, semester_number=1, academic_year='2024-2025')
+        subjects = [Subject(name=f'Subject {i}', code=f'SUB{i}') for i in range(SUBJECTS)]
+        db.add_all([semester] + subjects)
+        db.flush()
+        db.execute(Student.__table__.insert(), [
+            {'register_no': f'R2024{i:06d}', 'name': f'Student {i}', 'email': f's{i}@example.com',
+             'date_of_birth': '01-02-2005', 'batch_id': batch.id}
+            for i in range(students)
+        ])
+        rows = []
+        for sid in db.scalars(select(Student.id)).all():
+            for subject in subjects:
+                ca1, ca2, ca3 = random.randint(10, 60), random.randint(10, 60), random.randint(10, 60)
+                rows.append({
+                    'student_id': sid, 'subject_id': subject.id, 'semester_id': semester.id,
+                    'ca1': ca1, 'ca2': ca2, 'ca3': ca3, 'semester_marks': None,
+                    **computed_mark_values(ca1, ca2, ca3, None),
+                })
+        db.execute(Mark.__table__.insert(), rows)
+        rebuild_student_aggregates(db)
+        db.commit()
+        return semester.id
+
+
+def payload() -> dict:
+    # Every fourth result is entered as a grade, the rest as marks
+    return {
+        f'R2024{i:06d}': {
+            f'Subject {s}': random.choice(GRADES) if s % 4 == 0 else random.randint(1, 100)
+            for s in range(SUBJECTS)
+        }
+        for i in range(max(RESULTS // SUBJECTS, 1))
+    }
+
+
+def main():
+    random.seed(24)
+    print(f'Seeding {RESULTS:,} unpublished marks...')
+    semester_id = seed()
+    results = payload()
+    print('=' * 70)
+    print(f'Semester publish: {RESULTS:,} results ({len(results):,} students x {SUBJECTS} subjects)')
+    print('=' * 70)
+    with SessionLocal() as db:
+        semester = db.get(Semester, semester_id)
+        start = time.perf_counter()
+        result = publish_semester_results(db, semester, results)
+        db.commit()
+        total = time.perf_counter() - start
+        published = db.scalar(select(func.count()).where(Mark.sem_published.is_(True)))
+    print(f'errors {len(result.errors)}   updated {result.updated:,}   published {result.published:,}')
+    print(f'publish {result.elapsed_ms:7.0f} ms   with commit {total * 1000:7.0f} ms')
+    print(f'{"✅" if published == RESULTS and not result.errors else "❌"} {published:,}/{RESULTS:,} marks published')
+    print('=' * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        os.remove(DB_PATH)
@@ -0,0 +1,112 @@
+"""
+Benchmark: result-day refreshes of the student dashboard and marks pages.
+Runs the app in-process against a throwaway SQLite database. Each student
+loads both pages once, then keeps refreshing: first as a client without a
+cache (full 200 served from the ETag-keyed LRU), then as a browser sending
+If-None-Match (304 after a single version lookup). SQL statements and
+latency per request are reported for each phase.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import os
+import random
+import statistics
+import tempfile
+import time
+
+DB_FD, DB_PATH = tempfile.mkstemp(suffix='.db')
+os.close(DB_FD)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['DEBUG'] = 'false'
+os.environ['AUTH_LOG_ENABLED'] = 'false'
+
+from fastapi.testclient import TestClient
+
+from app.core.security import create_access_token
+from app.db.database import init_db, SessionLocal
+from app.db.models import Admin, Student
+from app.main import app
+from app.routes.student import student_response_cache
+
+STUDENTS = 300
+SUBJECTS = ('Maths', 'Physics', 'Chemistry', 'English', 'Biology', 'History')
+REFRESHES = 5
+PAGES = ('/api/v1/student/dashboard', '/api/v1/student/marks')
+HEADER = 'Register_No,Student_Name,Email,Batch_Year,Semester,Subject_Name,CA1,CA2,CA3,Semester_Marks,Date_of_Birth\n'
+
+client = TestClient(app)
+
+
+def seed():
+    init_db()
+    with SessionLocal() as db:
+        admin = Admin(email='bench@example.com', name='Bench', role='admin')
+        db.add(admin)
+        db.commit()
+        admin_headers = {'Authorization': 'Bearer ' + create_access_token({'sub': str(admin.id), 'role': 'admin'})}
+    lines = [HEADER]
+    for i in range(STUDENTS):
+        for subject in SUBJECTS:
+            lines.append(
+                f'R2024{i:05d},Student {i},s{i}@example.com,2024,1,{subject},'
+                f'{random.randint(10, 60)},{random.randint(10, 60)},{random.randint(10, 60)},'
+                f'{random.randint(20, 100)},01-02-2005\n'
+            )
+    response = client.post('/api/v1/admin/csv-upload', headers=admin_headers,
+                           files={'file': ('bench.csv', ''.join(lines), 'text/csv')})
+    assert response.json()['status'] == 'success', response.json()
+    with SessionLocal() as db:
+        return [
+            {'Authorization': 'Bearer ' + create_access_token({'sub': str(sid), 'role': 'student'})}
+            for (sid,) in db.query(Student.id).order_by(Student.id)
+        ]
+
+
+def phase(name, requests):
+    """Run (path, headers) requests; returns the responses"""
+    statuses, queries, latencies, responses = {}, [], [], []
+    for path, headers in requests:
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        queries.append(int(response.headers['X-DB-Query-Count']))
+        responses.append(response)
+    print(f'{name:34} {statistics.mean(queries):5.2f} queries/req  '
+          f'{statistics.mean(latencies) * 1000:6.2f} ms/req  {statuses}')
+    return responses
+
+
+def main():
+    random.seed(19)
+    students = seed()
+    print('=' * 90)
+    print(f'{STUDENTS} students × {len(PAGES)} pages, {REFRESHES} refreshes each')
+    print('=' * 90)
+
+    first = phase('First load (computed)', [(p, h) for h in students for p in PAGES])
+    etags = [r.headers['ETag'] for r in first]
+
+    phase('Refresh without a browser cache', [(p, h) for _ in range(REFRESHES) for h in students for p in PAGES])
+
+    conditional = []
+    for _ in range(REFRESHES):
+        i = 0
+        for h in students:
+            for p in PAGES:
+                conditional.append((p, dict(h, **{'If-None-Match': etags[i]})))
+                i += 1
+    phase('Refresh with If-None-Match (304)', conditional)
+
+    stats = student_response_cache.stats()
+    print(f"\nResponse LRU: {stats['entries']} entries, {stats['hits']} hits, {stats['misses']} misses")
+    print('=' * 90)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        os.remove(DB_PATH)
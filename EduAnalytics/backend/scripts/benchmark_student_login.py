@@ -0,0 +1,144 @@
+"""
+Benchmark: student logins per second on result day.
+Runs the app in-process against a throwaway SQLite database and fires
+concurrent logins at POST /api/v1/auth/student/login in three modes:
+- legacy: full ORM load of Student plus the old debug print() calls
+- lean: Core select of the login columns, structured logging on
+- lean, logging off (AUTH_LOG_ENABLED=false)
+A final burst of wrong dates of birth shows the failed-attempt limiter
+answering 429 without a database round trip.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import tempfile
+import time
+
+DB_FD, DB_PATH = tempfile.mkstemp(suffix='.db')
+os.close(DB_FD)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['DEBUG'] = 'false'
+os.environ['QUERY_METRICS_ENABLED'] = 'false'
+
+import httpx
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal, SessionLocal, init_db
+from app.db.models import Batch, Student
+from app.main import app
+from app.routes import auth as auth_routes
+from app.services.auth_service import authenticate_student_async
+
+STUDENTS = 2000
+LOGINS = 4000
+CONCURRENCY = 50
+
+
+async def legacy_authenticate(db, register_no, dob, password=None):
+    """The login check before the lean path: ORM load and five print() calls"""
+    student = await db.scalar(select(Student).where(Student.register_no == register_no))
+    if not student:
+        print(f"[AUTH DEBUG] Student not found: {register_no}")
+        return None
+    student_dob = (student.date_of_birth or "").strip()
+    dob_input = (dob or "").strip()
+    print(f"[AUTH DEBUG] Comparing:")
+    print(f"  Input DOB: '{dob_input}' (len={len(dob_input)})")
+    print(f"  DB DOB:    '{student_dob}' (len={len(student_dob)})")
+    if student_dob == dob_input:
+        print(f"[AUTH DEBUG] ✓ Authentication successful for {register_no}")
+        return student
+    print(f"[AUTH DEBUG] ✗ DOB mismatch for {register_no}")
+    return None
+
+
+def seed():
+    init_db()
+    with SessionLocal() as db:
+        batch = Batch(batch_year='2024')
+        db.add(batch)
+        db.flush()
+        db.add_all([
+            Student(register_no=f'R2024{i:05d}', name=f'Student {i}', email=f's{i}@example.com',
+                    date_of_birth='01-02-2005', batch_id=batch.id)
+            for i in range(STUDENTS)
+        ])
+        db.commit()
+
+
+async def time_check(authenticate, count):
+    """Login checks per second for one authenticate function, without HTTP"""
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        for i in range(count):
+            await authenticate(db, f'R2024{i % STUDENTS:05d}', '01-02-2005')
+        return count / (time.perf_counter() - start)
+
+
+async def run_logins(count, dob='01-02-2005', register_no=None):
+    """Fire `count` logins with CONCURRENCY in flight; returns (logins/s, status counts)"""
+    statuses = {}
+    queue = iter(range(count))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        async def worker():
+            for i in queue:
+                response = await client.post('/api/v1/auth/student/login', json={
+                    'register_no': register_no or f'R2024{i % STUDENTS:05d}', 'date_of_birth': dob
+                })
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+        elapsed = time.perf_counter() - start
+    return count / elapsed, statuses
+
+
+def main():
+    seed()
+    # Log to a buffer so terminal speed does not skew the numbers (the old prints included)
+    logging.basicConfig(level=logging.INFO, stream=io.StringIO())
+
+    print('=' * 70)
+    print(f'{STUDENTS} students, {LOGINS} logins, {CONCURRENCY} concurrent clients')
+    print('=' * 70)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy_check = asyncio.run(time_check(legacy_authenticate, LOGINS))
+    lean_check = asyncio.run(time_check(authenticate_student_async, LOGINS))
+    print('Login check alone (one session, no HTTP)')
+    print(f'  legacy (ORM + print)        : {legacy_check:8.1f} checks/s')
+    print(f'  lean (Core select + logging): {lean_check:8.1f} checks/s  ({lean_check / legacy_check:.2f}x)')
+
+    auth_routes.authenticate_student_async = legacy_authenticate
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy_rate, _ = asyncio.run(run_logins(LOGINS))
+    auth_routes.authenticate_student_async = authenticate_student_async
+    print('\nFull endpoint (JWT, ASGI and session setup included)')
+    print(f'  legacy (ORM + print)        : {legacy_rate:8.1f} logins/s')
+
+    lean_rate, _ = asyncio.run(run_logins(LOGINS))
+    print(f'  lean, logging on            : {lean_rate:8.1f} logins/s  ({lean_rate / legacy_rate:.2f}x)')
+
+    settings.AUTH_LOG_ENABLED = False
+    quiet_rate, _ = asyncio.run(run_logins(LOGINS))
+    print(f'  lean, logging off           : {quiet_rate:8.1f} logins/s  ({quiet_rate / legacy_rate:.2f}x)')
+
+    attempts = settings.LOGIN_MAX_FAILED_ATTEMPTS * 20
+    brute_rate, statuses = asyncio.run(run_logins(attempts, dob='31-12-1999', register_no='R202400001'))
+    print(f'\nWrong-DOB burst on one account: {brute_rate:8.1f} attempts/s, status codes {statuses}')
+    print('=' * 70)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        os.remove(DB_PATH)
@@ -0,0 +1,132 @@
+"""
+Load test: student logins and dashboards while a large CSV upload runs.
+Runs the app in-process against a throwaway SQLite database. Logins and
+dashboards use the async session, so they keep answering while the upload
+(a sync route in the threadpool) is writing; before, every request queued
+behind it on the event loop.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+DB_FD, DB_PATH = tempfile.mkstemp(suffix='.db')
+os.close(DB_FD)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['DEBUG'] = 'false'
+
+import httpx
+
+from app.core.security import create_access_token
+from app.db.database import init_db, SessionLocal
+from app.db.models import Admin
+from app.main import app
+
+STUDENTS = 200
+UPLOAD_STUDENTS = 4000
+CONCURRENT_USERS = 50
+SUBJECTS = ('Maths', 'Physics', 'Chemistry', 'English', 'Biology')
+HEADER = 'Register_No,Student_Name,Email,Batch_Year,Semester,Subject_Name,CA1,CA2,CA3,Semester_Marks,Date_of_Birth\n'
+
+
+def make_csv(start, count, year):
+    lines = [HEADER]
+    for i in range(start, start + count):
+        for subject in SUBJECTS:
+            lines.append(
+                f'R{year}{i:05d},Student {i},s{year}_{i}@example.com,{year},1,{subject},'
+                f'{random.randint(10, 60)},{random.randint(10, 60)},{random.randint(10, 60)},'
+                f'{random.randint(20, 100)},01-02-2005\n'
+            )
+    return ''.join(lines)
+
+
+async def student_session(client, i):
+    """Login then dashboard; returns the latency of each"""
+    start = time.perf_counter()
+    response = await client.post('/api/v1/auth/student/login', json={
+        'register_no': f'R2024{i:05d}', 'date_of_birth': '01-02-2005'
+    })
+    login_time = time.perf_counter() - start
+    response.raise_for_status()
+    headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+
+    start = time.perf_counter()
+    response = await client.get('/api/v1/student/dashboard', headers=headers)
+    response.raise_for_status()
+    return login_time, time.perf_counter() - start
+
+
+async def burst(client):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        student_session(client, i % STUDENTS) for i in range(CONCURRENT_USERS)
+    ))
+    wall = time.perf_counter() - start
+    latencies = [t for pair in results for t in pair]
+    return wall, latencies
+
+
+def report(label, wall, latencies):
+    print(f'\n{label}')
+    print(f'  {len(latencies)} requests in {wall * 1000:.0f} ms wall time '
+          f'(sum of latencies {sum(latencies) * 1000:.0f} ms)')
+    print(f'  median {statistics.median(latencies) * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms')
+
+
+async def main():
+    random.seed(7)
+    init_db()
+    with SessionLocal() as db:
+        admin = Admin(email='loadtest@example.com', name='Load Test', role='admin')
+        db.add(admin)
+        db.commit()
+        admin_headers = {'Authorization': 'Bearer ' + create_access_token({'sub': str(admin.id), 'role': 'admin'})}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://loadtest', timeout=120) as client:
+        print('=' * 70)
+        print(f'Seeding {STUDENTS} students...')
+        response = await client.post(
+            '/api/v1/admin/csv-upload', headers=admin_headers,
+            files={'file': ('seed.csv', make_csv(0, STUDENTS, 2024), 'text/csv')},
+        )
+        response.raise_for_status()
+        print('=' * 70)
+
+        wall, latencies = await burst(client)
+        report(f'{CONCURRENT_USERS} users, idle server', wall, latencies)
+
+        upload_csv = make_csv(0, UPLOAD_STUDENTS, 2023)
+        upload_start = time.perf_counter()
+        upload = asyncio.create_task(client.post(
+            '/api/v1/admin/csv-upload', headers=admin_headers,
+            files={'file': ('big.csv', upload_csv, 'text/csv')},
+            params={'chunk_size': 2000},
+        ))
+        await asyncio.sleep(0.2)
+        wall, latencies = await burst(client)
+        response = await upload
+        upload_time = time.perf_counter() - upload_start
+        report(f'{CONCURRENT_USERS} users during a {UPLOAD_STUDENTS * len(SUBJECTS):,}-row upload', wall, latencies)
+        print(f'  upload: {response.json()["success_count"]:,} rows in {upload_time * 1000:.0f} ms')
+
+        print('\n' + '=' * 70)
+        if wall < upload_time:
+            print('✅ Logins and dashboards finished while the upload was still running')
+        else:
+            print('❌ Requests waited for the upload to finish')
+        print('=' * 70)
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    finally:
+        os.remove(DB_PATH)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Migration script to store the derived mark columns
+Adds marks.ca_average, ca_passed, computed_grade and is_passed, backfills them
+for every existing mark with the same rules the app uses on writes
+(computed_mark_values), and replaces the single-column subject/semester
+indexes with (semester_id, is_passed) and (subject_id, computed_grade)
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import sqlite3
+from pathlib import Path
+
+from app.db.models import computed_mark_values
+
+NEW_COLUMNS = {
+    'ca_average': 'FLOAT',
+    'ca_passed': 'BOOLEAN NOT NULL DEFAULT 0',
+    'computed_grade': 'VARCHAR(2)',
+    'is_passed': 'BOOLEAN NOT NULL DEFAULT 0',
+}
+# The composite indexes also serve lookups on their leading column
+NEW_INDEXES = {
+    'idx_mark_semester_passed': '(semester_id, is_passed)',
+    'idx_mark_subject_grade': '(subject_id, computed_grade)',
+}
+OLD_INDEXES = ('idx_mark_semester', 'idx_mark_subject')
+
+BACKFILL_CHUNK = 10000
+
+
+def backfill(cursor) -> int:
+    """Recompute the derived columns of every mark, in id order and fixed-size chunks"""
+    updated = 0
+    last_id = 0
+    while True:
+        cursor.execute(
+            "SELECT id, ca1, ca2, ca3, semester_marks FROM marks WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, BACKFILL_CHUNK),
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            return updated
+        params = []
+        for mark_id, ca1, ca2, ca3, semester_marks in rows:
+            values = computed_mark_values(ca1, ca2, ca3, semester_marks)
+            params.append((values['ca_average'], values['ca_passed'], values['computed_grade'],
+                           values['is_passed'], mark_id))
+        cursor.executemany(
+            "UPDATE marks SET ca_average = ?, ca_passed = ?, computed_grade = ?, is_passed = ? WHERE id = ?",
+            params,
+        )
+        updated += len(rows)
+        last_id = rows[-1][0]
+
+
+def migrate_database():
+    """Add, backfill and index the derived mark columns"""
+    db_path = Path('eduanalytics.db')
+
+    if not db_path.exists():
+        print("❌ Database not found. Run init_database.py first.")
+        return False
+
+    conn = sqlite3.connect('eduanalytics.db')
+    try:
+        cursor = conn.cursor()
+
+        print("Starting migration...")
+        print("=" * 50)
+
+        cursor.execute("PRAGMA table_info(marks)")
+        columns = {col[1] for col in cursor.fetchall()}
+        for column, ddl in NEW_COLUMNS.items():
+            if column not in columns:
+                print(f"\n→ Adding marks.{column} column...")
+                cursor.execute(f"ALTER TABLE marks ADD COLUMN {column} {ddl}")
+                print(f"  ✅ marks.{column} column added")
+            else:
+                print(f"\n  ✓ marks.{column} column already exists")
+
+        # Always recomputed, so re-running also repairs rows written by older code
+        print("\n→ Backfilling derived columns...")
+        updated = backfill(cursor)
+        print(f"  ✅ {updated} marks updated")
+
+        for index, columns_ddl in NEW_INDEXES.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index} ON marks {columns_ddl}")
+            print(f"\n  ✓ {index} index present")
+        for index in OLD_INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {index}")
+            print(f"  ✓ {index} index dropped (covered by a composite index)")
+
+        # Refresh planner statistics so the new indexes are picked up
+        cursor.execute("ANALYZE marks")
+
+        conn.commit()
+
+        print("\n" + "=" * 50)
+        print("✅ Migration successful!")
+        return True
+
+    except sqlite3.OperationalError as e:
+        print(f"\n❌ Database error: {str(e)}")
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = migrate_database()
+    sys.exit(0 if success else 1)
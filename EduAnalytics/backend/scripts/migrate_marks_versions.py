@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Migration script to add marks version counters to students and batches
+Every write to a student's marks bumps students.marks_version (and the
+batch's counter, since ranks move); the student dashboard and marks routes
+build their ETags from them
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import sqlite3
+from pathlib import Path
+
+TABLES = ('students', 'batches')
+
+
+def migrate_database():
+    """Add marks_version columns to students and batches"""
+    db_path = Path('eduanalytics.db')
+
+    if not db_path.exists():
+        print("❌ Database not found. Run init_database.py first.")
+        return False
+
+    conn = sqlite3.connect('eduanalytics.db')
+    try:
+        cursor = conn.cursor()
+
+        print("Starting migration...")
+        print("=" * 50)
+
+        for table in TABLES:
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns = {col[1] for col in cursor.fetchall()}
+
+            if 'marks_version' not in columns:
+                print(f"\n→ Adding {table}.marks_version column...")
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN marks_version INTEGER NOT NULL DEFAULT 0")
+                print(f"  ✅ {table}.marks_version column added")
+            else:
+                print(f"\n  ✓ {table}.marks_version column already exists")
+
+        conn.commit()
+
+        print("\n" + "=" * 50)
+        print("✅ Migration successful!")
+        return True
+
+    except sqlite3.OperationalError as e:
+        print(f"\n❌ Database error: {str(e)}")
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = migrate_database()
+    sys.exit(0 if success else 1)
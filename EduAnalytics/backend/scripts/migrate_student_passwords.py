@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Migration script to add an optional bcrypt password to students
+Accounts created through the admin API (single or bulk) may carry a password;
+students created by CSV upload keep logging in with their date of birth
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import sqlite3
+from pathlib import Path
+
+
+def migrate_database():
+    """Add the students.password_hash column"""
+    db_path = Path('eduanalytics.db')
+
+    if not db_path.exists():
+        print("❌ Database not found. Run init_database.py first.")
+        return False
+
+    conn = sqlite3.connect('eduanalytics.db')
+    try:
+        cursor = conn.cursor()
+
+        print("Starting migration...")
+        print("=" * 50)
+
+        cursor.execute("PRAGMA table_info(students)")
+        columns = {col[1] for col in cursor.fetchall()}
+
+        if 'password_hash' not in columns:
+            print("\n→ Adding students.password_hash column...")
+            cursor.execute("ALTER TABLE students ADD COLUMN password_hash VARCHAR(255) DEFAULT NULL")
+            print("  ✅ students.password_hash column added")
+        else:
+            print("\n  ✓ students.password_hash column already exists")
+
+        conn.commit()
+
+        print("\n" + "=" * 50)
+        print("✅ Migration successful!")
+        return True
+
+    except sqlite3.OperationalError as e:
+        print(f"\n❌ Database error: {str(e)}")
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = migrate_database()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Migration script to add upload provenance (upload_id) to students and marks
+Rows written by a CSV upload point back at its csv_upload_logs entry so the
+upload can be undone with a single indexed delete
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import sqlite3
+from pathlib import Path
+
+NEW_COLUMNS = {
+    'students': 'idx_student_upload',
+    'marks': 'idx_mark_upload',
+}
+
+
+def migrate_database():
+    """Add upload_id columns and indexes to students and marks"""
+    db_path = Path('eduanalytics.db')
+
+    if not db_path.exists():
+        print("❌ Database not found. Run init_database.py first.")
+        return False
+
+    conn = sqlite3.connect('eduanalytics.db')
+    try:
+        cursor = conn.cursor()
+
+        print("Starting migration...")
+        print("=" * 50)
+
+        for table, index_name in NEW_COLUMNS.items():
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns = {col[1] for col in cursor.fetchall()}
+
+            if 'upload_id' not in columns:
+                print(f"\n→ Adding {table}.upload_id column...")
+                cursor.execute(
+                    f"ALTER TABLE {table} ADD COLUMN upload_id INTEGER DEFAULT NULL "
+                    f"REFERENCES csv_upload_logs(id) ON DELETE CASCADE"
+                )
+                print(f"  ✅ {table}.upload_id column added")
+            else:
+                print(f"\n  ✓ {table}.upload_id column already exists")
+
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} (upload_id)")
+            print(f"  ✓ {index_name} index present")
+
+        conn.commit()
+
+        print("\n" + "=" * 50)
+        print("✅ Migration successful!")
+        print("\nNote: rows uploaded before this migration have no upload_id,")
+        print("so 'delete last upload' only removes uploads made afterwards.")
+        return True
+
+    except sqlite3.OperationalError as e:
+        print(f"\n❌ Database error: {str(e)}")
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = migrate_database()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,23 @@
+"""
+Rebuild the student_aggregates table from raw marks
+Run this after restoring a backup or editing marks directly in the database
+"""
+import sys
+sys.path.insert(0, '.')
+
+from app.db.database import init_db, SessionLocal
+from app.services.aggregates import rebuild_student_aggregates
+
+if __name__ == "__main__":
+    try:
+        print("🔄 Rebuilding student aggregates...")
+        init_db()
+        db = SessionLocal()
+        try:
+            rows = rebuild_student_aggregates(db)
+        finally:
+            db.close()
+        print(f"✅ Rebuilt {rows} aggregate rows")
+    except Exception as e:
+        print(f"❌ Error rebuilding aggregates: {e}")
+        sys.exit(1)
@@ -0,0 +1,122 @@
+"""
+Round-trip test for the batch CSV export.
+Seeds a throwaway SQLite database with marks that have entered grades,
+grade-only results, numeric results, 0 and missing marks, exports the batch
+as CSV and uploads the file again through ingest_csv_rows(). Every mark must
+come back unchanged; in particular computed grades must not be stored as
+entered SEM_Grades.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import csv
+import io
+import os
+import random
+import tempfile
+
+DB_FD, DB_PATH = tempfile.mkstemp(suffix='.db')
+os.close(DB_FD)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['DEBUG'] = 'false'
+
+from sqlalchemy import select
+
+from app.db.database import SessionLocal, init_db
+from app.db.models import Batch, Mark, Semester, Student, Subject
+from app.services import export
+from app.services.csv_ingest import ingest_csv_rows, iter_text_lines
+from app.utils.grade_converter import GRADE_TO_MIDPOINT
+
+STUDENTS = 40
+SUBJECTS = 5
+SNAPSHOT_COLUMNS = (
+    Mark.student_id, Mark.subject_id, Mark.semester_id, Mark.ca1, Mark.ca2, Mark.ca3,
+    Mark.semester_marks, Mark.sem_grade, Mark.sem_published, Mark.ca_average,
+    Mark.ca_passed, Mark.computed_grade, Mark.is_passed,
+)
+
+
+def random_result():
+    """(semester_marks, sem_grade): numeric, grade-only, 0 or missing"""
+    roll = random.random()
+    if roll < 0.3:
+        grade = random.choice(list(GRADE_TO_MIDPOINT))
+        return GRADE_TO_MIDPOINT[grade], grade
+    if roll < 0.4:
+        return 0.0, None
+    if roll < 0.5:
+        return None, None
+    return round(random.uniform(1, 100), random.choice([0, 1])), None
+
+
+def seed() -> int:
+    init_db()
+    with SessionLocal() as db:
+        batch = Batch(batch_year='2024')
+        db.add(batch)
+        db.flush()
+        semesters = [Semester(batch_id=batch.id, semester_number=n, academic_year='2024-2025') for n in (1, 2)]
+        subjects = [Subject(name=f'Subject {i}', code=f'SUB{i}') for i in range(SUBJECTS)]
+        students = [
+            Student(register_no=f'R2024{i:04d}', name=f'Student {i}', email=f's{i}@example.com',
+                    date_of_birth='01-02-2005', batch_id=batch.id)
+            for i in range(STUDENTS)
+        ]
+        db.add_all(semesters + subjects + students)
+        db.flush()
+        for student in students:
+            for semester in semesters:
+                for subject in subjects:
+                    semester_marks, sem_grade = random_result()
+                    db.add(Mark(
+                        student_id=student.id, subject_id=subject.id, semester_id=semester.id,
+                        ca1=random.randint(0, 60), ca2=random.randint(0, 60),
+                        ca3=random.choice([None, random.randint(0, 60)]),
+                        semester_marks=semester_marks, sem_grade=sem_grade,
+                        sem_published=semester_marks is not None and semester_marks > 0,
+                    ))
+        db.commit()
+        return batch.id
+
+
+def snapshot() -> list:
+    with SessionLocal() as db:
+        return db.execute(select(*SNAPSHOT_COLUMNS).order_by(Mark.id)).all()
+
+
+def main() -> bool:
+    random.seed(21)
+    batch_id = seed()
+    before = snapshot()
+    print(f'Seeded {len(before)} marks, {sum(1 for row in before if row.sem_grade)} with entered grades')
+
+    body = b''.join(export.stream_export(export.CSV, batch_id, None, 64))
+    reader = csv.DictReader(iter_text_lines(io.BytesIO(body)))
+    print(f'Exported columns: {", ".join(reader.fieldnames)}')
+    with SessionLocal() as db:
+        result = ingest_csv_rows(db, reader)
+        db.commit()
+    print(f'Re-uploaded {result.success_count} rows, {len(result.errors)} errors')
+    for message in result.error_messages[:5]:
+        print(f'  {message}')
+
+    after = snapshot()
+    changed = [(old, new) for old, new in zip(before, after) if old != new]
+    for old, new in changed[:5]:
+        print(f'  before {tuple(old)}')
+        print(f'  after  {tuple(new)}')
+
+    ok = not result.errors and len(after) == len(before) and not changed
+    print('=' * 60)
+    print('✅ Export round-trips through upload' if ok else f'❌ {len(changed)} marks changed on re-upload')
+    return ok
+
+
+if __name__ == '__main__':
+    try:
+        ok = main()
+    finally:
+        os.remove(DB_PATH)
+    sys.exit(0 if ok else 1)
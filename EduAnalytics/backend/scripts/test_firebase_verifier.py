@@ -0,0 +1,146 @@
+"""
+Offline test of the Firebase ID-token verifier.
+Signs tokens with throwaway RSA keys published through a local JWKS file
+(FIREBASE_JWKS_FILE), with outbound HTTP disabled, and checks: valid tokens,
+the verified-token cache, rejection of bad audience/issuer/expiry/signature,
+key rotation via an unknown key id, and the admin Google login route.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import json
+import os
+import tempfile
+import time
+import urllib.request
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+PROJECT_ID = 'eduanalytics-test'
+WORK_DIR = tempfile.mkdtemp()
+JWKS_PATH = os.path.join(WORK_DIR, 'jwks.json')
+DB_PATH = os.path.join(WORK_DIR, 'test.db')
+
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['DEBUG'] = 'false'
+os.environ['FIREBASE_PROJECT_ID'] = PROJECT_ID
+os.environ['FIREBASE_JWKS_FILE'] = JWKS_PATH
+
+
+def new_key(kid):
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public = private.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    public_jwk = jwk.construct(public, 'RS256').to_dict()
+    public_jwk.update({'kid': kid, 'use': 'sig', 'alg': 'RS256'})
+    return pem, public_jwk
+
+
+def write_jwks(*public_jwks):
+    with open(JWKS_PATH, 'w') as f:
+        json.dump({'keys': list(public_jwks)}, f)
+
+
+def make_token(pem, kid, **overrides):
+    now = int(time.time())
+    claims = {
+        'iss': f'https://securetoken.google.com/{PROJECT_ID}', 'aud': PROJECT_ID,
+        'sub': 'firebase-uid-1', 'auth_time': now, 'iat': now, 'exp': now + 3600,
+        'email': 'teacher@example.com', 'name': 'Test Teacher',
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, pem, algorithm='RS256', headers={'kid': kid})
+
+
+PEM_1, JWK_1 = new_key('key-1')
+write_jwks(JWK_1)
+
+
+def no_network(*args, **kwargs):
+    raise AssertionError('verification must not reach the network')
+
+
+urllib.request.urlopen = no_network
+
+from fastapi.testclient import TestClient
+
+from app.db.database import init_db
+from app.main import app
+from app.services.auth_service import firebase_verifier, verify_google_token
+
+results = []
+
+
+def check(name, condition):
+    results.append(condition)
+    print(f"{'✅' if condition else '❌'} {name}")
+
+
+def main():
+    init_db()
+    check('verifier built from FIREBASE_PROJECT_ID + FIREBASE_JWKS_FILE', firebase_verifier is not None)
+    keys, cache = firebase_verifier.keys, firebase_verifier.verified
+
+    token = make_token(PEM_1, 'key-1')
+    start = time.perf_counter()
+    user = verify_google_token(token)
+    first = time.perf_counter() - start
+    check('valid token accepted', user is not None and user['uid'] == 'firebase-uid-1'
+          and user['email'] == 'teacher@example.com')
+
+    hits = cache.hits
+    start = time.perf_counter()
+    verify_google_token(token)
+    second = time.perf_counter() - start
+    check(f'repeat verification served from cache ({first * 1000:.2f}ms → {second * 1000:.3f}ms)',
+          cache.hits == hits + 1)
+
+    check('wrong audience rejected', verify_google_token(make_token(PEM_1, 'key-1', aud='other-project')) is None)
+    check('wrong issuer rejected', verify_google_token(
+        make_token(PEM_1, 'key-1', iss='https://securetoken.google.com/other-project')) is None)
+    check('expired token rejected', verify_google_token(
+        make_token(PEM_1, 'key-1', iat=int(time.time()) - 7200, exp=int(time.time()) - 3600)) is None)
+    check('missing subject rejected', verify_google_token(make_token(PEM_1, 'key-1', sub='')) is None)
+
+    other_pem, _ = new_key('key-1')
+    check('signature from another key rejected', verify_google_token(make_token(other_pem, 'key-1')) is None)
+
+    # Rotation: Google publishes a new key; the first token signed with it
+    # triggers one refresh of the key set
+    pem_2, jwk_2 = new_key('key-2')
+    write_jwks(JWK_1, jwk_2)
+    refreshes = keys.refreshes
+    keys._last_refresh -= 120
+    check('token signed with a rotated-in key accepted', verify_google_token(make_token(pem_2, 'key-2')) is not None)
+    check('rotation cost exactly one key-set refresh', keys.refreshes == refreshes + 1)
+
+    refreshes = keys.refreshes
+    check('unknown key id rejected', verify_google_token(make_token(pem_2, 'key-3')) is None)
+    check('unknown key ids do not refetch within the refresh interval', keys.refreshes == refreshes)
+
+    client = TestClient(app)
+    response = client.post('/api/v1/auth/admin/google-login', json={'id_token': make_token(PEM_1, 'key-1')})
+    check('admin Google login succeeds offline', response.status_code == 200 and response.json()['role'] == 'teacher')
+    response = client.post('/api/v1/auth/admin/google-login', json={'id_token': make_token(PEM_1, 'key-1', aud='x')})
+    check('admin Google login rejects a bad token', response.status_code == 401)
+
+    print('=' * 70)
+    print(f'{sum(results)}/{len(results)} checks passed')
+    return all(results)
+
+
+if __name__ == '__main__':
+    try:
+        success = main()
+    finally:
+        for name in os.listdir(WORK_DIR):
+            os.remove(os.path.join(WORK_DIR, name))
+        os.rmdir(WORK_DIR)
+    sys.exit(0 if success else 1)
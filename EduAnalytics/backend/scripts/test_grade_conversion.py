@@ -1,14 +1,31 @@
 #!/usr/bin/env python3
-"""Test grade conversion utilities"""
+"""Test grade conversion utilities, and parity of the array versions with the scalar ones"""
 
+import sys
+sys.path.insert(0, '.')
+
+import random
+import time
+
+import numpy as np
+
+from app.db.models import computed_mark_arrays, computed_mark_values
 from app.utils.grade_converter import (
+    GRADE_BANDS,
+    get_grade_distribution_counts,
     get_grade_from_marks, 
     get_numeric_from_grade, 
+    grade_distribution,
+    grades_from_marks,
+    midpoints_from_grades,
     validate_grade,
     get_ca_pass_status,
     is_pass_grade
 )
 
+PARITY_ROWS = 200_000
+BENCHMARK_ROWS = 1_000_000
+
 print('Testing Grade Conversion Utility')
 print('=' * 50)
 
@@ -38,5 +55,77 @@ for grade in ['O', 'A+', 'A', 'B+', 'B', 'C', 'RA']:
     status = '✓ PASS' if passed else '✗ FAIL'
     print(f'  Grade {grade:3s} → {status}')
 
+
+def random_marks(n, seed=23):
+    """Uniform marks plus NaNs, zeros, negatives and every band edge (and just below it)"""
+    rng = np.random.default_rng(seed)
+    marks = np.round(rng.uniform(-5, 100, n), rng.integers(0, 3))
+    edges = [lowest for lowest, _ in GRADE_BANDS] + [0, 100]
+    specials = edges + [edge - 0.01 for edge in edges] + [np.nan]
+    picks = rng.random(n) < 0.3
+    marks[picks] = rng.choice(specials, picks.sum())
+    return marks
+
+
+print('\nArray / scalar parity:')
+failures = 0
+marks = random_marks(PARITY_ROWS)
+
+grades = grades_from_marks(marks)
+expected = [get_grade_from_marks(None if np.isnan(m) else m) for m in marks.tolist()]
+bad = sum(1 for got, want in zip(grades.tolist(), expected) if got != want)
+failures += bad
+print(f"  {'✓' if not bad else '✗'} grades_from_marks: {bad} mismatches over {PARITY_ROWS} marks")
+
+labels = random.Random(23).choices(['O', 'a+', 'A', 'B+', 'b', 'C', 'RA', 'X', '', None], k=PARITY_ROWS)
+midpoints = midpoints_from_grades(labels)
+bad = 0
+for got, label in zip(midpoints.tolist(), labels):
+    want = get_numeric_from_grade(label) if label else None
+    if (want is None) != np.isnan(got) or (want is not None and got != want):
+        bad += 1
+failures += bad
+print(f"  {'✓' if not bad else '✗'} midpoints_from_grades: {bad} mismatches over {PARITY_ROWS} grades")
+
+same = grade_distribution(marks) == get_grade_distribution_counts([g for g in expected if g])
+failures += not same
+print(f"  {'✓' if same else '✗'} grade_distribution matches get_grade_distribution_counts")
+
+cas = [random_marks(PARITY_ROWS, seed) for seed in (1, 2, 3)]
+arrays = computed_mark_arrays(*cas, marks)
+bad = 0
+for i, row in enumerate(zip(*(c.tolist() for c in cas), marks.tolist())):
+    want = computed_mark_values(*(None if np.isnan(v) else v for v in row))
+    average = arrays['ca_average'][i]
+    got = {
+        'ca_average': None if np.isnan(average) else float(average),
+        'ca_passed': bool(arrays['ca_passed'][i]),
+        'computed_grade': arrays['computed_grade'][i],
+        'is_passed': bool(arrays['is_passed'][i]),
+    }
+    bad += got != want
+failures += bad
+print(f"  {'✓' if not bad else '✗'} computed_mark_arrays: {bad} mismatches over {PARITY_ROWS} marks")
+
+print(f'\nConverting {BENCHMARK_ROWS:,} marks:')
+marks = random_marks(BENCHMARK_ROWS)
+sample = marks[:100_000].tolist()
+start = time.perf_counter()
+for m in sample:
+    get_grade_from_marks(m)
+scalar_time = (time.perf_counter() - start) * BENCHMARK_ROWS / len(sample)
+start = time.perf_counter()
+grades_from_marks(marks)
+array_time = time.perf_counter() - start
+start = time.perf_counter()
+grade_distribution(marks)
+histogram_time = time.perf_counter() - start
+print(f'  scalar loop (extrapolated): {scalar_time * 1000:8.1f} ms')
+print(f'  grades_from_marks:          {array_time * 1000:8.1f} ms  ({scalar_time / array_time:.0f}x)')
+print(f'  grade_distribution:         {histogram_time * 1000:8.1f} ms')
+
 print('\n' + '=' * 50)
+if failures:
+    print(f'❌ {failures} parity failures')
+    sys.exit(1)
 print('✅ All tests completed successfully!')
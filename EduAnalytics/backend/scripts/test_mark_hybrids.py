@@ -0,0 +1,143 @@
+"""
+Parity test for the stored Mark columns (ca_average, ca_passed,
+computed_grade, is_passed).
+Random marks are written through the ORM hooks, then edited; the stored
+values must match the Python rules and their SQL twin for every row, and
+filters on them must use the composite indexes.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import random
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Base, Batch, Mark, Semester, Student, Subject, computed_mark_expressions, computed_mark_values
+
+ROWS = 5000
+random.seed(2024)
+
+engine = create_engine('sqlite:///:memory:')
+Base.metadata.create_all(engine)
+Session = sessionmaker(bind=engine)
+session = Session()
+
+batch = Batch(batch_year=2024)
+session.add(batch)
+session.flush()
+semester = Semester(batch_id=batch.id, semester_number=1, academic_year='2024-2025')
+session.add(semester)
+session.flush()
+
+
+def random_score():
+    """Mostly random floats, plus NULLs and every grade boundary"""
+    roll = random.random()
+    if roll < 0.2:
+        return None
+    if roll < 0.4:
+        return float(random.choice([0, 29, 29.99, 30, 49, 49.5, 50, 55, 56, 60, 61, 70, 71, 80, 81, 90, 91, 100]))
+    return round(random.uniform(0, 100), random.choice([0, 1, 2]))
+
+
+subjects = [Subject(name=f'Subject {i}', code=f'SUB{i:04d}') for i in range(ROWS // 50)]
+students = [
+    Student(register_no=f'P{i:05d}', name=f'Student {i}', email=f'p{i}@example.com',
+            date_of_birth='01-01-2005', batch_id=batch.id)
+    for i in range(50)
+]
+session.add_all(subjects + students)
+session.flush()
+
+for student in students:
+    for subject in subjects:
+        session.add(Mark(
+            student_id=student.id, subject_id=subject.id, semester_id=semester.id,
+            ca1=random_score(), ca2=random_score(), ca3=random_score(),
+            semester_marks=random_score(),
+        ))
+session.commit()
+
+# Edit a third of them so the before_update hook is exercised too
+for mark in session.scalars(select(Mark).where(Mark.id % 3 == 0)):
+    mark.ca2 = random_score()
+    mark.semester_marks = random_score()
+session.commit()
+session.expire_all()
+
+print("=" * 70)
+print(f"Stored mark column parity over {ROWS} random marks")
+print("=" * 70)
+
+sql = computed_mark_expressions(Mark.ca1, Mark.ca2, Mark.ca3, Mark.semester_marks)
+rows = session.execute(
+    select(Mark, sql["ca_average"], sql["ca_passed"], sql["computed_grade"], sql["is_passed"], Mark.ca_status)
+).all()
+
+mismatches = 0
+for mark, sql_avg, sql_ca_passed, sql_grade, sql_passed, sql_status in rows:
+    expected = computed_mark_values(mark.ca1, mark.ca2, mark.ca3, mark.semester_marks)
+    py_avg = expected['ca_average']
+    same_avg = all(
+        (py_avg is None and avg is None) or (py_avg is not None and avg is not None and abs(py_avg - avg) < 1e-9)
+        for avg in (mark.ca_average, sql_avg)
+    )
+    checks = [
+        ('ca_average', same_avg, py_avg, (mark.ca_average, sql_avg)),
+        ('ca_passed', mark.ca_passed == bool(sql_ca_passed) == expected['ca_passed'],
+         expected['ca_passed'], (mark.ca_passed, sql_ca_passed)),
+        ('computed_grade', mark.computed_grade == sql_grade == expected['computed_grade'],
+         expected['computed_grade'], (mark.computed_grade, sql_grade)),
+        ('is_passed', mark.is_passed == bool(sql_passed) == expected['is_passed'],
+         expected['is_passed'], (mark.is_passed, sql_passed)),
+        ('ca_status', mark.ca_status == sql_status, mark.ca_status, sql_status),
+    ]
+    for name, ok, py_value, sql_value in checks:
+        if not ok:
+            mismatches += 1
+            print(f"❌ {name} mismatch for CA={mark.ca1},{mark.ca2},{mark.ca3} "
+                  f"SEM={mark.semester_marks}: expected={py_value!r} stored/sql={sql_value!r}")
+
+# Filters, counts and GROUP BY run in the database and must match Python too
+sql_passed_count = session.scalar(select(func.count()).select_from(Mark).where(Mark.is_passed))
+sql_failed_count = session.scalar(select(func.count()).select_from(Mark).where(~Mark.is_passed))
+py_passed_count = sum(1 for mark, *_ in rows if mark.is_passed)
+
+sql_grades = dict(session.execute(select(Mark.computed_grade, func.count()).group_by(Mark.computed_grade)).all())
+py_grades = {}
+for mark, *_ in rows:
+    py_grades[mark.computed_grade] = py_grades.get(mark.computed_grade, 0) + 1
+
+
+def uses_index(criteria, index):
+    """True when SQLite plans the filtered count with `index`"""
+    query = select(func.count()).select_from(Mark).where(*criteria)
+    compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+    plan = session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return any(index in step[-1] for step in plan)
+
+
+aggregate_checks = [
+    ('passed count', sql_passed_count == py_passed_count),
+    ('failed count', sql_failed_count == len(rows) - py_passed_count),
+    ('grade distribution', sql_grades == py_grades),
+    ('(semester_id, is_passed) index scan',
+     uses_index((Mark.semester_id == semester.id, Mark.is_passed), 'idx_mark_semester_passed')),
+    ('(subject_id, computed_grade) index scan',
+     uses_index((Mark.subject_id == subjects[0].id, Mark.computed_grade == 'O'), 'idx_mark_subject_grade')),
+]
+for name, ok in aggregate_checks:
+    if not ok:
+        mismatches += 1
+    print(f"{'✅' if ok else '❌'} {name}")
+
+print(f"\nPassed: {py_passed_count}  Failed: {len(rows) - py_passed_count}")
+print(f"Grades: {py_grades}")
+print("\n" + "=" * 70)
+if mismatches:
+    print(f"❌ {mismatches} mismatches")
+    sys.exit(1)
+print(f"✅ Python and SQL agree on all {len(rows)} marks")
+print("=" * 70)
@@ -0,0 +1,145 @@
+"""
+N+1 detector: every read route must run the same number of SQL statements
+whatever the amount of data behind it.
+Each route is called against a small data set, the data is grown (more
+batches, students, subjects per student and curriculum entries) and the route
+is called again. A route whose statement count changed fails.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import os
+import random
+import tempfile
+
+DB_FD, DB_PATH = tempfile.mkstemp(suffix='.db')
+os.close(DB_FD)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['DEBUG'] = 'false'
+
+from fastapi.testclient import TestClient
+
+from app.core.security import create_access_token
+from app.db.database import init_db, SessionLocal
+from app.db.models import Admin, Batch, Semester, Subject
+from app.main import app
+
+# Routes that still load rows one by one; remove an entry once it is fixed
+KNOWN_N_PLUS_ONE = set()
+
+HEADER = 'Register_No,Student_Name,Email,Batch_Year,Semester,Subject_Name,CA1,CA2,CA3,Semester_Marks,Date_of_Birth\n'
+
+client = TestClient(app)
+
+
+def make_csv(students, subjects, year):
+    lines = [HEADER]
+    for i in range(students):
+        for s in range(subjects):
+            lines.append(
+                f'R{year}{i:05d},Student {i},s{year}_{i}@example.com,{year},1,Subject {s},'
+                f'{random.randint(10, 60)},{random.randint(10, 60)},{random.randint(10, 60)},'
+                f'{random.randint(20, 100)},01-02-2005\n'
+            )
+    return ''.join(lines)
+
+
+def seed(students, subjects, years, admin_headers):
+    for year in years:
+        response = client.post(
+            '/api/v1/admin/csv-upload', headers=admin_headers,
+            files={'file': (f'{year}.csv', make_csv(students, subjects, year), 'text/csv')},
+        )
+        assert response.json()['status'] == 'success', response.json()
+    with SessionLocal() as db:
+        for semester in db.query(Semester).all():
+            for subject in db.query(Subject).all():
+                client.post('/api/v1/admin/batch-subjects/add-subject', headers=admin_headers, params={
+                    'batch_id': semester.batch_id, 'semester_id': semester.id, 'subject_id': subject.id
+                })
+
+
+def routes(admin_headers, student_headers, auth_query, ids):
+    batch1, batch2, semester, subject, student1, student2 = ids
+    return [
+        ('/api/v1/student/dashboard', student_headers, None),
+        ('/api/v1/student/marks', student_headers, None),
+        ('/api/v1/student/class-performance', student_headers, None),
+        (f'/api/v1/compare/students/{student1}/{student2}', None, auth_query),
+        (f'/api/v1/compare/batches/{batch1}/{batch2}', None, auth_query),
+        (f'/api/v1/compare/batch-subjects/{batch1}', None, auth_query),
+        (f'/api/v1/compare/subject/{subject}', None, auth_query),
+        ('/api/v1/admin/students', admin_headers, None),
+        (f'/api/v1/admin/marks/student/{student1}', admin_headers, None),
+        (f'/api/v1/admin/students/{student1}/marks', admin_headers, None),
+        ('/api/v1/admin/all-students', admin_headers, None),
+        ('/api/v1/admin/batches', admin_headers, None),
+        ('/api/v1/admin/upload-history', admin_headers, None),
+        ('/api/v1/admin/batch-subjects/batches', admin_headers, None),
+        (f'/api/v1/admin/batch-subjects/batch/{batch1}/semester/{semester}', admin_headers, None),
+        ('/api/v1/admin/batch-subjects/subjects/available', admin_headers, None),
+    ]
+
+
+def measure(route_list):
+    counts = {}
+    for path, headers, params in route_list:
+        response = client.get(path, headers=headers, params=params)
+        counts[path.split('?')[0]] = (response.status_code, int(response.headers['X-DB-Query-Count']))
+    return counts
+
+
+def main():
+    random.seed(11)
+    init_db()
+    with SessionLocal() as db:
+        admin = Admin(email='querycount@example.com', name='Query Count', role='admin')
+        db.add(admin)
+        db.commit()
+        admin_token = create_access_token({'sub': str(admin.id), 'role': 'admin'})
+    admin_headers = {'Authorization': f'Bearer {admin_token}'}
+    auth_query = {'authorization': f'Bearer {admin_token}'}
+
+    seed(5, 3, (2023, 2024), admin_headers)
+    with SessionLocal() as db:
+        batch1, batch2 = [b.id for b in db.query(Batch).order_by(Batch.id)]
+        semester = db.query(Semester).filter(Semester.batch_id == batch1).first().id
+        subject = db.query(Subject).order_by(Subject.id).first().id
+    student_headers = {'Authorization': 'Bearer ' + create_access_token(
+        {'sub': '1', 'register_no': 'R202300000', 'role': 'student'})}
+    route_list = routes(admin_headers, student_headers, auth_query, (batch1, batch2, semester, subject, 1, 2))
+
+    small = measure(route_list)
+    seed(20, 8, (2021, 2022, 2023, 2024), admin_headers)
+    large = measure(route_list)
+
+    print('=' * 78)
+    print(f"{'route':55} {'small':>6} {'large':>6}")
+    print('=' * 78)
+    failures = []
+    for path, (status, count) in small.items():
+        large_status, large_count = large[path]
+        grows = count != large_count
+        known = path in KNOWN_N_PLUS_ONE
+        marker = '✅' if not grows else ('⚠️ ' if known else '❌')
+        print(f'{marker} {path:52} {count:>6} {large_count:>6}  (HTTP {status}/{large_status})')
+        if grows and not known:
+            failures.append(path)
+        if known and not grows:
+            print(f'   → no longer grows; remove it from KNOWN_N_PLUS_ONE')
+
+    print('=' * 78)
+    if failures:
+        print(f'❌ Query count grows with data on {len(failures)} route(s)')
+        return False
+    print('✅ No new N+1 query patterns')
+    return True
+
+
+if __name__ == '__main__':
+    try:
+        success = main()
+    finally:
+        os.remove(DB_PATH)
+    sys.exit(0 if success else 1)